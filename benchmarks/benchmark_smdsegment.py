@@ -0,0 +1,107 @@
+"""
+Compare decoding and encoding of segment block data, block by block versus vectorized with numpy.
+
+    python benchmarks/benchmark_smdsegment.py [fill ratio] [repeats]
+"""
+import os
+import sys
+import random
+import timeit
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smlib.utils.blockconfig import block_config
+from smlib.utils.blocklist import BlockList
+from smlib.utils.smbinarystream import SMBinaryStream
+from smlib.smblueprint.smdblock.blockpool import block_pool
+from smlib.smblueprint.smd3.smdsegment import SmdSegment, np
+
+__author__ = 'Peter Hofmann'
+
+
+def get_segment_stream(fill_ratio, block_ids=(5, 598, 599, 600, 601, 602, 2)):
+    """
+    Create a single segment, with a fraction of its positions filled, as byte stream.
+
+    @type fill_ratio: float
+    @type block_ids: tuple[int]
+
+    @rtype: SMBinaryStream
+    """
+    random.seed(0)
+    segment = SmdSegment()
+    segment.set_position((0, 0, 0))
+    for block_index in range(32768):
+        if random.random() >= fill_ratio:
+            continue
+        block = block_pool(random.choice(block_ids))
+        segment.add(segment.get_block_position_by_block_index(block_index), block)
+    output_stream = SMBinaryStream(BytesIO())
+    segment.write(output_stream)
+    output_stream.seek(0)
+    return output_stream
+
+
+def read_segment(input_stream, vectorized):
+    """
+    @type input_stream: SMBinaryStream
+    @type vectorized: bool
+
+    @rtype: BlockList
+    """
+    block_list = BlockList()
+    input_stream.seek(0)
+    segment = SmdSegment()
+    segment.vectorized = vectorized
+    segment.read(block_list, input_stream)
+    return block_list
+
+
+def write_segment(segment, vectorized):
+    """
+    @type segment: SmdSegment
+    @type vectorized: bool
+
+    @rtype: bytes
+    """
+    byte_stream = BytesIO()
+    segment.vectorized = vectorized
+    segment.write(SMBinaryStream(byte_stream))
+    return byte_stream.getvalue()
+
+
+def main():
+    fill_ratio = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    block_config.from_hard_coded()
+    input_stream = get_segment_stream(fill_ratio)
+    number_of_blocks = len(read_segment(input_stream, False))
+    print("Segment with {} blocks ({:.0%} filled), {} repeats".format(number_of_blocks, fill_ratio, repeats))
+
+    segment = SmdSegment()
+    segment.set_position((0, 0, 0))
+    for position, block in read_segment(input_stream, False).items():
+        segment.add(position, block)
+
+    print("Decoding")
+    time_loop = timeit.timeit(lambda: read_segment(input_stream, False), number=repeats) / repeats
+    print("block by block: {:.2f} ms per segment".format(time_loop * 1000))
+    if np is not None:
+        assert sorted(read_segment(input_stream, True).keys()) == sorted(read_segment(input_stream, False).keys())
+        time_vectorized = timeit.timeit(lambda: read_segment(input_stream, True), number=repeats) / repeats
+        print("vectorized:     {:.2f} ms per segment ({:.1f}x)".format(
+            time_vectorized * 1000, time_loop / time_vectorized))
+
+    print("Encoding")
+    time_loop = timeit.timeit(lambda: write_segment(segment, False), number=repeats) / repeats
+    print("block by block: {:.2f} ms per segment".format(time_loop * 1000))
+    if np is not None:
+        assert write_segment(segment, True) == write_segment(segment, False)
+        time_vectorized = timeit.timeit(lambda: write_segment(segment, True), number=repeats) / repeats
+        print("vectorized:     {:.2f} ms per segment ({:.1f}x)".format(
+            time_vectorized * 1000, time_loop / time_vectorized))
+
+
+if __name__ == "__main__":
+    main()
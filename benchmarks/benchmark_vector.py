@@ -0,0 +1,84 @@
+"""
+Compare encoding and decoding of position indexes, struct based versus bit arithmetic and batched with numpy.
+
+    python benchmarks/benchmark_vector.py [number of positions] [repeats]
+"""
+import os
+import sys
+import random
+import struct
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smlib.utils.vector import Vector, np
+
+__author__ = 'Peter Hofmann'
+
+
+def get_index_struct(position):
+    """
+    @type position: (int, int, int)
+
+    @rtype: int
+    """
+    tmp = struct.pack("<hhhh", position[0], position[1], position[2], 0)
+    return struct.unpack("<q", tmp)[0]
+
+
+def get_position_struct(position_index):
+    """
+    @type position_index: int
+
+    @rtype: (int, int, int)
+    """
+    tmp = struct.pack("<q", position_index)
+    return tuple(struct.unpack("<hhhh", tmp)[:3])
+
+
+def report(name, time_reference, time_result):
+    """
+    @type name: str
+    @type time_reference: float
+    @type time_result: float
+    """
+    print("{:<16}{:.1f} ms ({:.1f}x)".format(name, time_result * 1000, time_reference / time_result))
+
+
+def main():
+    number_of_positions = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    random.seed(0)
+    positions = [tuple(random.randint(-32768, 32767) for _ in range(3)) for _ in range(number_of_positions)]
+    position_indexes = [get_index_struct(position) for position in positions]
+    assert [Vector.get_index(position) for position in positions] == position_indexes
+    assert [Vector.get_position(position_index) for position_index in position_indexes] == positions
+    print("{} positions, {} repeats".format(number_of_positions, repeats))
+
+    print("Encoding")
+    time_struct = timeit.timeit(lambda: [get_index_struct(position) for position in positions], number=repeats) / repeats
+    print("{:<16}{:.1f} ms".format("struct:", time_struct * 1000))
+    time_arithmetic = timeit.timeit(lambda: [Vector.get_index(position) for position in positions], number=repeats) / repeats
+    report("arithmetic:", time_struct, time_arithmetic)
+    if np is not None:
+        array_positions = np.array(positions, dtype=np.int64)
+        assert Vector.get_indexes(array_positions).tolist() == position_indexes
+        time_batch = timeit.timeit(lambda: Vector.get_indexes(array_positions), number=repeats) / repeats
+        report("numpy batch:", time_struct, time_batch)
+
+    print("Decoding")
+    time_struct = timeit.timeit(
+        lambda: [get_position_struct(position_index) for position_index in position_indexes], number=repeats) / repeats
+    print("{:<16}{:.1f} ms".format("struct:", time_struct * 1000))
+    time_arithmetic = timeit.timeit(
+        lambda: [Vector.get_position(position_index) for position_index in position_indexes], number=repeats) / repeats
+    report("arithmetic:", time_struct, time_arithmetic)
+    if np is not None:
+        array_position_indexes = np.array(position_indexes, dtype=np.int64)
+        assert Vector.get_positions(array_position_indexes).tolist() == [list(position) for position in positions]
+        time_batch = timeit.timeit(lambda: Vector.get_positions(array_position_indexes), number=repeats) / repeats
+        report("numpy batch:", time_struct, time_batch)
+
+
+if __name__ == "__main__":
+    main()
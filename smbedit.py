@@ -10,6 +10,10 @@ from smlib import __version__ as version
 from smlib.common.argumenthandler import ArgumentHandler
 from smlib.utils.blockconfig import block_config
 from smlib.blueprint import Blueprint
+from smlib.utils.transform import Transform
+from smlib.utils.vector import Vector
+from smlib.utils.replace import ReplaceRules
+from smlib.utils.selection import Selection
 
 
 class SMBEdit(ArgumentHandler):
@@ -40,6 +44,9 @@ class SMBEdit(ArgumentHandler):
             logfile=logfile,
             verbose=verbose,
             debug=debug)
+        # compiled on first use, shared by all entities of a run
+        self._replace_rules = None
+        self._selection = None
 
     @staticmethod
     def get_label():
@@ -69,9 +76,10 @@ class SMBEdit(ArgumentHandler):
                 relative_path = os.path.relpath(file_path, root_path)
                 output_stream.write(file_path, arcname=relative_path)
 
-    def _move_center_or_core(self, blueprint):
+    def _move_center_or_core(self, blueprint, transform):
         """
         @type blueprint: Blueprint
+        @type transform: Transform
         """
         if ',' in self._move_center:  # vector
             direction_vector = [0, 0, 0]
@@ -81,23 +89,41 @@ class SMBEdit(ArgumentHandler):
                 assert isinstance(value, str)
                 # assert value.isdigit(), "Bad vector: '{}'".format(move_center)
                 direction_vector[index] = int(value)
-            blueprint.move_center_by_vector(tuple(direction_vector))
+            transform.move_center(tuple(direction_vector))
         else:  # block id
             assert self._move_center.isdigit(), "Bad block id: '{}'".format(self._move_center)
-            blueprint.move_center_by_block_id(int(self._move_center))
+            position = blueprint.smd3.search(int(self._move_center))
+            assert position is not None, "Block id not found: {}".format(self._move_center)
+            transform.move_center(Vector.get_direction_vector_to_center(position))
+
+    def _get_selection(self):
+        """
+        Selection operations are limited to, parsed on first use
+
+        @return: None if all blocks are selected
+        @rtype: Selection | None
+        """
+        if self._select_box is None and self._select_chunks is None and self._select_block_ids is None:
+            return None
+        if self._selection is None:
+            self._selection = Selection.from_strings(
+                box=self._select_box, chunks=self._select_chunks, block_ids=self._select_block_ids)
+            self._logger.info("Operations are limited to {}".format(self._selection))
+        return self._selection
 
     def _replace_blocks(self, blueprint):
         """
         @type blueprint: Blueprint
         """
-        assert isinstance(self._replace, str)
-        assert ':' in self._replace, "Bad replace: '{}'".format(self._replace)
-        old_block_id, replace_id = self._replace.split(':')
-        assert old_block_id.isdigit(), "Bad old block id: '{}'".format(old_block_id)
-        assert replace_id.isdigit(), "Bad replace block id: '{}'".format(replace_id)
-        old_block_id = int(old_block_id)
-        replace_id = int(replace_id)
-        blueprint.replace_blocks(old_block_id, replace_id)
+        if self._replace_rules is None:
+            self._replace_rules = ReplaceRules()
+            if self._replace is not None:
+                assert ':' in self._replace, "Bad replace: '{}'".format(self._replace)
+                self._replace_rules.from_string(self._replace)
+            if self._replace_file is not None:
+                assert os.path.isfile(self._replace_file), "Replace file not found: '{}'".format(self._replace_file)
+                self._replace_rules.from_file(self._replace_file)
+        blueprint.replace_by_rules(self._replace_rules, self._get_selection())
 
     def _replace_hull_and_armor(self, blueprint):
         """
@@ -113,7 +139,23 @@ class SMBEdit(ArgumentHandler):
             old_hull_type = self._char_to_hull_type[old_hull_type]
         else:
             old_hull_type = None
-        blueprint.replace_blocks_hull(new_hull_type, old_hull_type)
+        blueprint.replace_blocks_hull(new_hull_type, old_hull_type, self._get_selection())
+
+    def _is_summary_only(self):
+        """
+        Returns true if the summary is requested and no block is to be read or modified otherwise
+
+        @rtype: bool
+        """
+        if not self._summary or self._debug or self._memory:
+            return False
+        modifications = [
+            self._remove_blocks, self._move_center, self._mirror_axis, self._replace, self._replace_file,
+            self._replace_hull,
+            self._index_turn_tilt, self._entity_type, self._entity_class]
+        if any(modification is not None for modification in modifications):
+            return False
+        return not (self._reset_hull_shape or True in self._auto_hull_shape or self._link_salvage or self._update)
 
     def run_commands(self, directory_input=None, directory_output=None, blueprint_path=None, entity_name=None):
         is_docked_entity = True
@@ -161,11 +203,18 @@ class SMBEdit(ArgumentHandler):
             logfile=self._logfile,
             verbose=self._verbose,
             debug=self._debug,
+            track_memory=self._memory,
         )
 
         blueprint_name = os.path.basename(directory_input)
+        if directory_output is None and self._is_summary_only() and (self._docked_entities or not is_docked_entity):
+            self._logger.info("Summary of blueprint '{}' to stdout".format(blueprint_name))
+            blueprint.summary_to_stream(directory_input, docked_entity_name_prefix, is_docked_entity)
+            return
+
         self._logger.info("Reading blueprint '{}' ...".format(blueprint_name))
-        blueprint.read(directory_input)
+        blueprint.read(
+            directory_input, jobs=self._jobs, lazy=self._lazy, dense=self._dense, index_block_ids=self._index_block_ids)
 
         blueprint.replace_outdated_docker_modules(docked_entity_name_prefix, is_docked_entity)
 
@@ -173,23 +222,33 @@ class SMBEdit(ArgumentHandler):
 
             if self._remove_blocks is not None:
                 self._logger.info("Removing blocks...")
-                blueprint.remove_blocks(self._remove_blocks)
+                blueprint.remove_blocks(self._remove_blocks, self._get_selection())
 
+            # moving the center and mirroring are applied in a single pass, unless only a selection is mirrored
+            transform = Transform()
             if not is_docked_entity and self._move_center is not None:
                 self._logger.info("Moving center/core of blueprint...")
-                self._move_center_or_core(blueprint)
+                self._move_center_or_core(blueprint, transform)
 
             if not is_docked_entity and self._mirror_axis is not None:
                 self._logger.info("Mirror at axis...")
-                blueprint.mirror_axis(axis_index=self._mirror_axis[0], reverse=self._mirror_axis[1])
+                if self._get_selection() is None:
+                    transform.mirror(axis_index=self._mirror_axis[0], reverse=self._mirror_axis[1])
+                else:
+                    if transform.is_moving_blocks():
+                        blueprint.apply_transform(transform)
+                    transform = Transform().mirror(axis_index=self._mirror_axis[0], reverse=self._mirror_axis[1])
 
-            if self._replace is not None:
+            if transform.is_moving_blocks():
+                blueprint.apply_transform(transform, self._get_selection() if transform.has_mirror() else None)
+
+            if self._replace is not None or self._replace_file is not None:
                 self._logger.info("Replacing blocks...")
                 self._replace_blocks(blueprint)
 
             if self._reset_hull_shape:
                 self._logger.info("Set outside hull to cube shape.")
-                blueprint.reset_ship_hull_shape()
+                blueprint.reset_ship_hull_shape(self._get_selection())
 
             if self._replace_hull is not None:
                 self._logger.info("Replacing hull...")
@@ -201,7 +260,8 @@ class SMBEdit(ArgumentHandler):
                     auto_wedge=self._auto_hull_shape[0],
                     auto_tetra=self._auto_hull_shape[1],
                     auto_corner=self._auto_hull_shape[2],
-                    auto_hepta=self._auto_hull_shape[3]
+                    auto_hepta=self._auto_hull_shape[3],
+                    selection=self._get_selection()
                 )
 
             if self._index_turn_tilt is not None:
@@ -226,10 +286,14 @@ class SMBEdit(ArgumentHandler):
         if directory_output is not None:
             self._logger.debug("Saving blueprint to:\n{}".format(directory_output))
             if blueprint_path is None:
-                blueprint.write(directory_output)
-                return
-            relative_path = os.path.relpath(directory_output, os.path.dirname(blueprint_path))
-            blueprint.write(directory_output, relative_path=relative_path)
+                blueprint.write(directory_output, jobs=self._jobs)
+            else:
+                relative_path = os.path.relpath(directory_output, os.path.dirname(blueprint_path))
+                blueprint.write(directory_output, relative_path=relative_path, jobs=self._jobs)
+
+        if self._memory and (self._docked_entities or not is_docked_entity):
+            self._logger.info("Memory footprint of blueprint '{}' to stdout".format(blueprint_name))
+            blueprint.get_memory_footprint().to_stream()
 
     def run(self):
         """
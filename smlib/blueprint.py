@@ -10,6 +10,8 @@ from .utils.periphery import Periphery
 from .utils.annotate import Annotate
 from .utils.replace import Replace
 from .utils.vector import Vector
+from .utils.transform import Transform
+from .utils.footprint import get_size, PeakMemory, MemoryFootprint
 from .smblueprint.header import Header
 from .smblueprint.logic import Logic
 from .smblueprint.meta.meta import Meta
@@ -27,10 +29,12 @@ class Blueprint(DefaultLogging):
     @type smd3: Smd
     @type _annotate: Annotate
     @type _entity_name: str
+    @type _track_memory: bool
+    @type _stage_to_peak: dict[str, int]
 
     """
 
-    def __init__(self, entity_name, logfile=None, verbose=False, debug=False):
+    def __init__(self, entity_name, logfile=None, verbose=False, debug=False, track_memory=False):
         """
         Constructor
 
@@ -40,6 +44,8 @@ class Blueprint(DefaultLogging):
         @type verbose: bool
         @param debug: Display debug messages
         @type debug: bool
+        @param track_memory: record the peak of memory allocated while reading and writing, slows both down
+        @type track_memory: bool
 
         @rtype: None
         """
@@ -50,6 +56,8 @@ class Blueprint(DefaultLogging):
         self.smd3 = Smd(logfile=logfile, verbose=verbose, debug=debug)
         self._annotate = None
         self._entity_name = entity_name
+        self._track_memory = track_memory
+        self._stage_to_peak = dict()
         return
 
     def __del__(self):
@@ -62,41 +70,128 @@ class Blueprint(DefaultLogging):
     # ###  Read
     # #######################################
 
-    def read(self, directory_blueprint):
+    def read(self, directory_blueprint, jobs=1, lazy=False, dense=False, index_block_ids=False):
         """
         Read blueprint from a directory
 
         @param directory_blueprint: /../StarMade/blueprints/blueprint_name/
         @type directory_blueprint: str
+        @param jobs: number of worker processes decoding smd region files in parallel
+        @type jobs: int
+        @param lazy: decode smd segments only once blocks within them are accessed
+        @type lazy: bool
+        @param dense: keep smd blocks as states in dense chunks, using less memory
+        @type dense: bool
+        @param index_block_ids: keep positions of each block id, for quick searches and removals by id
+        @type index_block_ids: bool
         """
         self.header = Header(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
         self.logic = Logic(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
         self.meta = Meta(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
         self.smd3 = Smd(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
 
-        self.header.read(directory_blueprint)
-        self.logic.read(directory_blueprint)
-        self.meta.read(directory_blueprint)
-        self.smd3.read(directory_blueprint)
+        with PeakMemory(self._track_memory) as peak_memory:
+            self.header.read(directory_blueprint)
+            self.logic.read(directory_blueprint)
+            self.meta.read(directory_blueprint)
+            self.smd3.read(directory_blueprint, jobs=jobs, lazy=lazy, dense=dense)
+            if index_block_ids:
+                self.smd3.index_block_ids()
+        if peak_memory.peak is not None:
+            self._stage_to_peak["read"] = peak_memory.peak
 
     # #######################################
     # ###  Write
     # #######################################
 
-    def write(self, directory_blueprint, relative_path=None):
+    def write(self, directory_blueprint, relative_path=None, jobs=1):
         """
         Save blueprint to a directory
 
         @param directory_blueprint: /../StarMade/blueprints/blueprint_name
         @type directory_blueprint: str
+        @param jobs: number of threads compressing smd segments in parallel
+        @type jobs: int
         """
         assert os.path.exists(directory_blueprint), "Output directory failed to be created."
         blueprint_name = os.path.basename(directory_blueprint)
 
-        self.header.write(directory_blueprint)
-        self.logic.write(directory_blueprint)
-        self.meta.write(directory_blueprint, relative_path=relative_path)
-        self.smd3.write(directory_blueprint, blueprint_name)
+        with PeakMemory(self._track_memory) as peak_memory:
+            self.header.write(directory_blueprint)
+            self.logic.write(directory_blueprint)
+            self.meta.write(directory_blueprint, relative_path=relative_path)
+            self.smd3.write(directory_blueprint, blueprint_name, threads=jobs)
+        if peak_memory.peak is not None:
+            self._stage_to_peak["write"] = peak_memory.peak
+
+    # #######################################
+    # ###  Memory
+    # #######################################
+
+    def get_memory_footprint(self):
+        """
+        Bytes used by each component, and peaks recorded while reading and writing.
+        Pooled blocks are shared by all blueprints and counted once, as 'block pool'.
+        Takes time proportional to the number of objects, a few seconds for millions of blocks.
+
+        @rtype: MemoryFootprint
+        """
+        block_list = self.smd3.get_block_list()
+        footprint = MemoryFootprint(number_of_blocks=len(block_list), number_of_states=len(block_pool))
+        seen = set()
+        footprint.component_to_size["block pool"] = sum(get_size(block, seen) for block in block_pool)
+        footprint.component_to_size["block list"] = get_size(block_list, seen)
+        footprint.component_to_size["segments"] = get_size(self.smd3.position_to_region, seen)
+        footprint.component_to_size["header"] = get_size(self.header, seen)
+        footprint.component_to_size["logic"] = get_size(self.logic, seen)
+        footprint.component_to_size["meta"] = get_size(self.meta, seen)
+        footprint.stage_to_peak.update(self._stage_to_peak)
+        return footprint
+
+    # #######################################
+    # ###  Streaming
+    # #######################################
+
+    def transform(self, directory_blueprint, directory_output, transforms, relative_path=None, jobs=1):
+        """
+        Transform a blueprint region by region, without keeping all of its blocks in memory.
+        Header block quantities and box, and logic links to removed blocks, are updated accordingly.
+        The output directory must not contain smd data already, it is not overwritten.
+
+        @param directory_blueprint: /../StarMade/blueprints/blueprint_name/
+        @type directory_blueprint: str
+        @param directory_output: /../StarMade/blueprints/blueprint_name
+        @type directory_output: str
+        @param transforms: functions modifying the block list of a region in place, like 'Replace' methods
+        @type transforms: list[(BlockList) -> None]
+        @param jobs: number of threads compressing smd segments in parallel
+        @type jobs: int
+        """
+        assert os.path.exists(directory_output), "Output directory failed to be created."
+        directory_output_data = os.path.join(directory_output, "DATA")
+        assert not os.path.exists(directory_output_data) or len(os.listdir(directory_output_data)) == 0, \
+            "Output smd directory is not empty: '{}'".format(directory_output_data)
+        blueprint_name = os.path.basename(directory_output)
+        self.header = Header(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        self.logic = Logic(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        self.meta = Meta(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        self.smd3 = Smd(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+
+        self.header.read(directory_blueprint)
+        self.logic.read(directory_blueprint)
+        self.meta.read(directory_blueprint)
+        block_id_to_quantity, min_vector, max_vector = self.smd3.transform(
+            directory_blueprint, directory_output, blueprint_name, transforms, threads=jobs)
+        self.header.set_quantities(block_id_to_quantity)
+        self.header.set_box(min_vector, max_vector)
+        if len(block_id_to_quantity) > 0:
+            # only segments with linked blocks are decoded
+            self.smd3.read(directory_output, lazy=True)
+        self.logic.update(self.smd3)
+
+        self.header.write(directory_output)
+        self.logic.write(directory_output)
+        self.meta.write(directory_output, relative_path=relative_path)
 
     # #######################################
     # ###  Else
@@ -186,18 +281,26 @@ class Blueprint(DefaultLogging):
         self.logic.update(self.smd3)
         self.header.update(self.smd3)
 
-    def remove_blocks(self, block_ids):
+    def remove_blocks(self, block_ids, selection=None):
         """
         Removing all blocks of a specific id
 
         @param block_ids:
         @type block_ids: set[int]
+        @param selection: only blocks of a selection, all blocks if None
+        @type selection: Selection | None
         """
-        self.smd3.remove_blocks(block_ids)
+        self.smd3.remove_blocks(block_ids, selection)
         self.logic.update(self.smd3)
         self.header.update(self.smd3)
 
-    def reset_ship_hull_shape(self):
+    def reset_ship_hull_shape(self, selection=None):
+        """
+        Turn shape of armor blocks of ship hull to cubes
+
+        @param selection: only blocks of a selection, all blocks if None
+        @type selection: Selection | None
+        """
         periphery = Periphery(self.smd3.get_block_list())
         if self._annotate is None:
             self._logger.info("Tracing entity boundary, this can take some time...")
@@ -209,11 +312,11 @@ class Blueprint(DefaultLogging):
             self._logger.info("Tracing done.")
         marked, border = self._annotate.get_data()
         periphery.set_annotation(marked=marked, border=border)
-        replace = Replace(self.smd3.get_block_list())
+        replace = Replace(self.smd3.get_block_list(), selection)
         replace.reset_hull_shape(border)
         self.header.update(self.smd3)
 
-    def replace_blocks_hull(self, new_hull_type, hull_type=None):
+    def replace_blocks_hull(self, new_hull_type, hull_type=None, selection=None):
         """
         Replace all blocks of a specific hull type or all hull
 
@@ -221,23 +324,45 @@ class Blueprint(DefaultLogging):
         @type new_hull_type: int
         @param hull_type:
         @type hull_type: int | None
+        @param selection: only blocks of a selection, all blocks if None
+        @type selection: Selection | None
         """
-        replace = Replace(self.smd3.get_block_list())
+        replace = Replace(self.smd3.get_block_list(), selection)
         replace.replace_hull(new_hull_type, hull_type)
         self.header.update(self.smd3)
 
-    def replace_blocks(self, block_id, replace_id):
+    def replace_blocks(self, block_id, replace_id, selection=None):
         """
         Replace all blocks of a specific id
 
         @type block_id: int
         @type replace_id: int
+        @param selection: only blocks of a selection, all blocks if None
+        @type selection: Selection | None
         """
         compatible = block_config[block_id].block_style == block_config[replace_id].block_style
-        replace = Replace(self.smd3.get_block_list())
+        replace = Replace(self.smd3.get_block_list(), selection)
         replace.replace_blocks(block_id, replace_id, compatible)
         self.header.update(self.smd3)
 
+    def replace_by_rules(self, rules, selection=None):
+        """
+        Replace blocks by any number of rules in a single pass
+
+        @type rules: ReplaceRules
+        @param selection: only blocks of a selection, all blocks if None
+        @type selection: Selection | None
+
+        @return: number of blocks each rule applied to
+        @rtype: list[int]
+        """
+        replace = Replace(self.smd3.get_block_list(), selection)
+        quantities = replace.replace_by_rules(rules)
+        for rule_index, quantity in enumerate(quantities):
+            self._logger.info("Replace rule '{}': {} blocks".format(rules.to_string(rule_index), quantity))
+        self.header.update(self.smd3)
+        return quantities
+
     def update(self):
         """
         Remove invalid/outdated blocks and exchange docking modules with rails
@@ -246,7 +371,17 @@ class Blueprint(DefaultLogging):
         self.logic.update(self.smd3)
         self.header.update(self.smd3)
 
-    def auto_hull_shape(self, auto_wedge=False, auto_tetra=False, auto_corner=False, auto_hepta=False):
+    def auto_hull_shape(self, auto_wedge=False, auto_tetra=False, auto_corner=False, auto_hepta=False, selection=None):
+        """
+        Automatically set shapes to hull blocks on edges and corners
+
+        @type auto_wedge: bool
+        @type auto_tetra: bool
+        @type auto_corner: bool
+        @type auto_hepta: bool
+        @param selection: only blocks of a selection, all blocks if None
+        @type selection: Selection | None
+        """
         # if self._debug:
         #     self.smd3.auto_hepta_debug()
         #     # self.smd3.auto_wedge_debug()
@@ -262,7 +397,7 @@ class Blueprint(DefaultLogging):
             self._logger.info("Tracing done.")
         marked, border = self._annotate.get_data()
         periphery.set_annotation(marked=marked, border=border)
-        auto_shape = AutoShape(self.smd3.get_block_list(), periphery)
+        auto_shape = AutoShape(self.smd3.get_block_list(), periphery, selection)
         auto_shape.auto_hull_shape(
             auto_wedge=auto_wedge, auto_tetra=auto_tetra, auto_corner=auto_corner, auto_hepta=auto_hepta)
         self.header.update(self.smd3)
@@ -291,14 +426,9 @@ class Blueprint(DefaultLogging):
         @type direction_vector: tuple[int]
         """
         assert isinstance(direction_vector, tuple)
-        self.smd3.move_center(direction_vector)
-        min_vector, max_vector = self.smd3.get_min_max_vector()
-        self.logic.move_center(direction_vector, self.header.type)
-        self.header.set_box(min_vector, max_vector)
-        self.header.update(self.smd3)
-        self.meta.move_center_by_vector(direction_vector)
+        self.apply_transform(Transform().move_center(direction_vector))
 
-    def mirror_axis(self, axis_index=0, reverse=False):
+    def mirror_axis(self, axis_index=0, reverse=False, selection=None):
         """
         Relocate center/core in a direction
 
@@ -308,14 +438,10 @@ class Blueprint(DefaultLogging):
         @type axis_index: int
         @param reverse: reverse mirror direction
         @type reverse: bool
+        @param selection: only blocks of a selection, all blocks if None
+        @type selection: Selection | None
         """
-        self.smd3.mirror(axis_index=axis_index, reverse=reverse)
-        self.logic.mirror(axis_index=axis_index, reverse=reverse)
-        min_vector, max_vector = self.smd3.get_min_max_vector()
-        self.header.set_box(min_vector, max_vector)
-        self.header.update(self.smd3)
-        self.logic.update(self.smd3)
-        # self.meta.mirror(axis_index=axis_index, reverse=reverse)
+        self.apply_transform(Transform().mirror(axis_index, reverse), selection)
 
     def turn_tilt(self, index_turn_tilt):
         """
@@ -330,12 +456,29 @@ class Blueprint(DefaultLogging):
         @type index_turn_tilt: int
         """
         assert 0 <= index_turn_tilt <= 5
-        self.logic.tilt_turn(index_turn_tilt)
-        self.smd3.tilt_turn(index_turn_tilt)
+        self.apply_transform(Transform().tilt_turn(index_turn_tilt))
+
+    def apply_transform(self, transform, selection=None):
+        """
+        Move center, mirror and turn blocks and logic in a single pass, the box is updated once at the end.
+        Docked entities are only moved, they are neither mirrored nor turned.
+
+        Blocks transformed onto unselected blocks replace them, like mirrored copies outside of a selection.
+        The selection is compared with positions before the transformation, after a previous move it is read in
+        moved coordinates.
+
+        @type transform: Transform
+        @param selection: only blocks of a selection are transformed, docked entities stay where they are
+        @type selection: Selection | None
+        """
+        self.logic.apply_transform(transform, self.header.type, selection, self.smd3)
+        self.smd3.apply_transform(transform, selection)
         min_vector, max_vector = self.smd3.get_min_max_vector()
         self.header.set_box(min_vector, max_vector)
         self.header.update(self.smd3)
         self.logic.update(self.smd3)
+        if selection is None and transform.get_move_offset() != (0, 0, 0):
+            self.meta.move_positions(transform.get_move_offset(), main_only=True)
 
     def link_salvage_modules(self):
         """
@@ -361,6 +504,47 @@ class Blueprint(DefaultLogging):
         for group_index in groups:
             self.logic.set_link(position_salvage_computers[group_index], 24, groups[group_index])
 
+    def summary_to_stream(
+            self, directory_blueprint, rail_docked_label_prefix=None, is_docked_entity=False,
+            output_stream=sys.stdout):
+        """
+        Read a blueprint and stream its summary, block quantities and box are taken from smd data without creating blocks
+
+        If docker modules need to be replaced, the whole blueprint is read instead.
+
+        @param directory_blueprint: /../StarMade/blueprints/blueprint_name/
+        @type directory_blueprint: str
+        @param rail_docked_label_prefix: Prefix of docked entity names
+        @type rail_docked_label_prefix: str | None
+        @param is_docked_entity: True if blueprint is a docked entity
+        @type is_docked_entity: bool
+        @param output_stream: Output stream
+        @type output_stream: fileIO
+        """
+        self.header = Header(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        self.logic = Logic(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        self.meta = Meta(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        self.smd3 = Smd(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+
+        self.header.read(directory_blueprint)
+        self.logic.read(directory_blueprint)
+        self.meta.read(directory_blueprint)
+        block_statistics = self.smd3.read_statistics(directory_blueprint)
+        rail_docker_id = 663
+        is_missing_rail_docker = is_docked_entity and rail_docker_id not in block_statistics.get_block_id_to_quantity()
+        if is_missing_rail_docker or self.meta.has_old_docked_entities():
+            # placing docker modules requires the blocks
+            self.read(directory_blueprint)
+            self.replace_outdated_docker_modules(rail_docked_label_prefix, is_docked_entity)
+            self.to_stream(output_stream)
+            return
+        self.header.set_statistics(block_statistics)
+
+        self.header.to_stream(output_stream)
+        self.logic.to_stream(output_stream)
+        self.meta.to_stream(output_stream)
+        self.smd3.to_stream(output_stream, block_statistics=block_statistics)
+
     def to_stream(self, output_stream=sys.stdout):
         """
         Stream blueprint values
@@ -53,6 +53,10 @@ class ArgumentHandler(Validator):
         self._reset_hull_shape = options.reset_hull_shape
         self._replace_hull = options.replace_hull_blocks
         self._replace = options.replace
+        self._replace_file = options.replace_file
+        self._select_box = options.select_box
+        self._select_chunks = options.select_chunks
+        self._select_block_ids = options.select_block_ids
         self._remove_blocks = None
         remove_blocks = options.remove_blocks
         self._move_center = options.move_center
@@ -63,6 +67,11 @@ class ArgumentHandler(Validator):
         self._entity_type = options.entity_type
         self._entity_class = options.entity_class
         self._summary = options.summary
+        self._jobs = options.jobs
+        self._lazy = options.lazy
+        self._dense = options.dense
+        self._index_block_ids = options.index_block_ids
+        self._memory = options.memory
         temp_directory = options.tmp_dir
         if self._path_input is not None:
             self._path_input = self.get_full_path(self._path_input)
@@ -136,6 +145,8 @@ class ArgumentHandler(Validator):
             self._directory_output_tmp = os.path.join(tempfile.mkdtemp(dir=self._tmp_dir), blueprint_name)
 
         # deal with something else
+        assert self._jobs > 0, "Invalid number of jobs: '{}'".format(self._jobs)
+        assert not (self._lazy and self._dense), "Options '-lazy' and '-dense' can not be combined"
         if remove_blocks is not None:
             try:
                 self._remove_blocks = list(map(int, remove_blocks.split(',')))
@@ -230,6 +241,31 @@ class ArgumentHandler(Validator):
             default=None,
             type=str,
             help="Directory for temporary data in case of 'sment' files.")
+        parser.add_argument(
+            "-j", "--jobs",
+            default=1,
+            type=int,
+            help="Number of processes reading, and threads writing, smd files in parallel.")
+        parser.add_argument(
+            "-lazy", "--lazy",
+            action='store_true',
+            default=False,
+            help="Decode blocks only once they are accessed, for quick edits of large blueprints.")
+        parser.add_argument(
+            "-dense", "--dense",
+            action='store_true',
+            default=False,
+            help="Keep blocks in dense chunks of integer states, using less memory for large blueprints.")
+        parser.add_argument(
+            "-index", "--index_block_ids",
+            action='store_true',
+            default=False,
+            help="Keep positions of each block id, for quick searches and removals by id at the cost of memory.")
+        parser.add_argument(
+            "-mem", "--memory",
+            action='store_true',
+            default=False,
+            help="Report memory used by each part of a blueprint, and its peak while reading and writing.")
 
         group_input = parser.add_argument_group('Optional arguments')
         group_input.add_argument(
@@ -371,9 +407,18 @@ class ArgumentHandler(Validator):
             "-r", "--replace",
             default=None,
             type=str,
-            help="""'old_id:new_id'
+            help="""'old_id:new_id', several separated by ','
             Use '-sm' argument to ensure correct hit point for replaced block.""")
 
+        group_replace.add_argument(
+            "-rf", "--replace_file",
+            default=None,
+            type=str,
+            help="""File with replace rules, one per line, applied in order:
+            old_id:new_id
+            hull {h,s,a,c,z}:{h,s,a,c,z}
+            color old_color:new_color""")
+
         group_replace.add_argument(
             "-rh", "--replace_hull_blocks",
             default=None,
@@ -385,6 +430,29 @@ class ArgumentHandler(Validator):
             c: Crystal Armor
             z: Hazard Armor''')
 
+        group_select = parser.add_argument_group('Selection')
+        group_select.add_argument(
+            "-sb", "--select_box",
+            default=None,
+            type=str,
+            help="""Limit removing, replacing, auto shape and mirroring to blocks within a box.
+            Lowest and highest corner like '0,0,0:31,31,31'.
+            Positions are after moving the center. Mirrored copies replace unselected blocks in their way.""")
+
+        group_select.add_argument(
+            "-sc", "--select_chunks",
+            default=None,
+            type=str,
+            help="""Limit removing, replacing, auto shape and mirroring to chunks of 32 x 32 x 32 blocks.
+            Positions divided by 32, several separated by ';', like '0,0,0;1,0,0'.
+            Positions are after moving the center. Mirrored copies replace unselected blocks in their way.""")
+
+        group_select.add_argument(
+            "-sid", "--select_block_ids",
+            default=None,
+            type=str,
+            help="Limit removing, replacing, auto shape and mirroring to blocks of ids, separated by ','")
+
         if args is None:
             return parser.parse_args()
         else:
@@ -387,6 +387,21 @@ class Header(DefaultLogging):
                 self.block_id_to_quantity[updated_block_id] = quantity
         self._clean_up()
 
+    def set_statistics(self, block_statistics):
+        """
+        Set block quantities and box from statistics of smd data
+
+        @param block_statistics: statistics of smd data
+        @type block_statistics: BlockStatistics
+        """
+        self.set_quantities(block_statistics.get_block_id_to_quantity())
+        min_vector, max_vector = block_statistics.get_min_max_vector()
+        self.set_box(min_vector=min_vector, max_vector=max_vector)
+        # floats, as read from a header file
+        self.box_min = tuple(float(value) for value in self.box_min)
+        self.box_max = tuple(float(value) for value in self.box_max)
+        self._clean_up()
+
     def _clean_up(self):
         """
         Remove empty links
@@ -8,6 +8,7 @@ from ..utils.smbinarystream import SMBinaryStream
 from ..utils.blockconfig import block_config
 from ..utils.blueprintentity import BlueprintEntity
 from ..utils.vector import Vector
+from ..utils.transform import Transform
 
 
 # #######################################
@@ -210,16 +211,7 @@ class Logic(DefaultLogging):
         @type index_turn_tilt: int
 
         """
-        new_data = {}
-        for controller_position, groups in self._controller_position_to_block_id_to_block_positions.items():
-            new_controller_position = Vector.tilt_turn_position(controller_position, index_turn_tilt)
-            new_data[new_controller_position] = {}
-            for block_id, positions in groups.items():
-                new_data[new_controller_position][block_id] = set()
-                for position in positions:
-                    new_position = Vector.tilt_turn_position(position, index_turn_tilt)
-                    new_data[new_controller_position][block_id].add(new_position)
-        self._controller_position_to_block_id_to_block_positions = new_data
+        self.apply_transform(Transform().tilt_turn(index_turn_tilt))
 
     # #######################################
     # ###  Else
@@ -253,29 +245,7 @@ class Logic(DefaultLogging):
         @param direction_vector: (x,y,z)
         @type direction_vector: tuple[int]
         """
-        new_dict = {}
-        for controller_position, groups in self._controller_position_to_block_id_to_block_positions.items():
-            new_controller_position = Vector.subtraction(controller_position, direction_vector)
-            if entity_type == 0 and new_controller_position == (16, 16, 16):  # replaced block
-                continue
-            if entity_type == 0 and controller_position == (16, 16, 16):  # core
-                new_controller_position = controller_position
-            if new_controller_position not in new_dict:
-                new_dict[new_controller_position] = {}
-            for block_id, positions in groups.items():
-                if block_id not in new_dict[new_controller_position]:
-                    new_dict[new_controller_position][block_id] = set()
-                for block_position in positions:
-                    new_block_position = Vector.subtraction(block_position, direction_vector)
-                    if entity_type == 0 and new_block_position == (16, 16, 16):  # replaced block
-                        continue
-                    new_dict[new_controller_position][block_id].add(new_block_position)
-                if len(new_dict[new_controller_position][block_id]) == 0:
-                    new_dict[new_controller_position].pop(block_id)
-            if len(new_dict[new_controller_position]) == 0:
-                new_dict.pop(new_controller_position)
-        del self._controller_position_to_block_id_to_block_positions
-        self._controller_position_to_block_id_to_block_positions = new_dict
+        self.apply_transform(Transform().move_center(direction_vector), entity_type)
 
     def mirror(self, axis_index, reverse=False):
         """
@@ -287,34 +257,74 @@ class Logic(DefaultLogging):
         @type axis_index: int
         @type reverse: bool
         """
+        self.apply_transform(Transform().mirror(axis_index, reverse))
+
+    def apply_transform(self, transform, entity_type=0, selection=None, smd=None):
+        """
+        Move, mirror and turn all controllers and linked positions in a single pass.
+        The core of a ship keeps its position, links to a block moved to the position of the core are removed.
+
+        @type transform: Transform
+        @param entity_type: 0 for ships, which have a core
+        @type entity_type: int
+        @param selection: only positions of a selection are transformed, the others stay where they are
+        @type selection: Selection | None
+        @param smd: blocks before they are transformed, for the ids of selected controllers
+        @type smd: Smd | None
+        """
+        def is_selected(position, block_id=None):
+            if selection is None:
+                return True
+            if not selection.contains_position(position):
+                return False
+            if block_id is None:
+                if not smd.has_block_at(position):
+                    return False
+                block_id = smd.get_block_at_position(position).get_id()
+            return selection.contains_block_id(block_id)
+
+        assert selection is None or smd is not None, "Selected controllers require the blocks they are part of"
         position_core = (16, 16, 16)
-        new_dict = {}  # mirror_position
+        new_dict = {}
         for controller_position, groups in self._controller_position_to_block_id_to_block_positions.items():
-            if reverse:
-                mirror = controller_position[axis_index] <= position_core[axis_index]
+            is_kept = not is_selected(controller_position)
+            if is_kept or (entity_type == 0 and controller_position == position_core):  # core
+                new_controller_position = controller_position
             else:
-                mirror = controller_position[axis_index] >= position_core[axis_index]
-            if not mirror:
+                new_controller_position = transform.get_position(controller_position)
+                if entity_type == 0 and new_controller_position == position_core:  # replaced block
+                    continue
+            side = 0 if is_kept else transform.get_side(new_controller_position)
+            if side < 0:
                 continue
-            new_dict[controller_position] = {}
-            new_controller_position = Vector.mirror_position(controller_position, axis_index, position_mirror=position_core)
-            new_dict[new_controller_position] = {}
-
+            new_controller_positions = [new_controller_position]
+            if side > 0:
+                new_controller_positions.append(transform.get_mirrored_position(new_controller_position))
             for block_id, positions in groups.items():
+                new_positions = set()
                 for block_position in positions:
-                    if reverse:
-                        mirror = block_position[axis_index] <= position_core[axis_index]
-                    else:
-                        mirror = block_position[axis_index] >= position_core[axis_index]
-                    if not mirror:
+                    if not is_selected(block_position, block_id):
+                        new_positions.add(block_position)
                         continue
-                    if block_id not in new_dict[controller_position]:
-                        new_dict[controller_position][block_id] = set()
-                        new_dict[new_controller_position][block_id] = set()
-                    new_block_position = Vector.mirror_position(block_position, axis_index, position_mirror=position_core)
-                    new_dict[controller_position][block_id].add(block_position)
-                    new_dict[new_controller_position][block_id].add(new_block_position)
-
+                    new_block_position = transform.get_position(block_position)
+                    if entity_type == 0 and new_block_position == position_core and block_position != position_core:
+                        continue  # replaced block
+                    if transform.get_side(new_block_position) < 0:
+                        continue
+                    new_positions.add(new_block_position)
+                if len(new_positions) == 0:
+                    continue
+                if side == 0 and not is_kept and transform.has_mirror():  # controller on the mirror plane
+                    new_positions.update([transform.get_mirrored_position(position) for position in new_positions])
+                for index, position in enumerate(new_controller_positions):
+                    if index > 0:
+                        new_positions = set(
+                            transform.get_mirrored_position(new_position) for new_position in new_positions)
+                    if position not in new_dict:
+                        new_dict[position] = {}
+                    if block_id not in new_dict[position]:
+                        new_dict[position][block_id] = set()
+                    new_dict[position][block_id].update(new_positions)
         del self._controller_position_to_block_id_to_block_positions
         self._controller_position_to_block_id_to_block_positions = new_dict
 
@@ -276,8 +276,9 @@ class Meta(DefaultLogging):
         @param direction_vector: vector
         @type direction_vector: tuple[int]
         """
-        direction_vector = Vector.subtraction((0, 0, 0), direction_vector)
-        self.move_positions(direction_vector, main_only=True)
+        # the same offset blocks and logic are moved by
+        offset = Vector.multiplication((-1, -1, -1), direction_vector)
+        self.move_positions(offset, main_only=True)
 
     def to_stream(self, output_stream=sys.stdout):
         """
@@ -4,9 +4,15 @@ import sys
 import zlib
 import datetime
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from ...common.loggingwrapper import DefaultLogging
 from ...utils.smbinarystream import SMBinaryStream
-from ..smdblock.blockpool import block_pool, StyleBasic
+from ...utils.vector import Vector
+from ..smdblock.blockpool import StyleBasic
 
 
 class SmdSegment(DefaultLogging):
@@ -18,8 +24,12 @@ class SmdSegment(DefaultLogging):
 
     @type block_index_to_block: dict[int, StyleBasic]
     @type _position: tuple[int]
+    @type vectorized: bool
     """
 
+    # decode and encode block data as a whole with numpy, instead of block by block
+    vectorized = np is not None
+
     def __init__(self, version, blocks_in_a_line=16, logfile=None, verbose=False, debug=False):
         super(SmdSegment, self).__init__(
             label="SmdSegment",
@@ -71,14 +81,43 @@ class SmdSegment(DefaultLogging):
         """
         decompressed_data = zlib.decompress(input_stream.read(self._compressed_size))
         self.block_index_to_block = {}
+        if self.vectorized:
+            self._decode_block_data_vectorized(block_list, decompressed_data)
+        else:
+            self._decode_block_data(block_list, decompressed_data)
+        input_stream.seek(self._data_size-self._compressed_size, 1)  # skip unused bytes
+
+    def _decode_block_data(self, block_list, decompressed_data):
+        """
+        Decode block data one block at a time
+
+        @type block_list: BlockList
+        @param decompressed_data: 3 byte for each block of the segment
+        @type decompressed_data: bytes
+        """
+        position_indexes = []
+        states = []
         for block_index in range(0, int(len(decompressed_data) / 3)):
             position = block_index * 3
             int_24bit = SMBinaryStream.unpack_int24(decompressed_data[position:position+3])
-            block = block_pool(int_24bit, version=self._version)
-            if block is None:
+            if int_24bit == 0:
                 continue
-            block_list[self.get_block_position_by_block_index(block_index)] = block
-        input_stream.seek(self._data_size-self._compressed_size, 1)  # skip unused bytes
+            position_indexes.append(Vector.get_index(self.get_block_position_by_block_index(block_index)))
+            states.append(int_24bit)
+        block_list.set_states(position_indexes, states, version=self._version)
+
+    def _decode_block_data_vectorized(self, block_list, decompressed_data):
+        """
+        Decode block data of the whole segment at once, only non-empty blocks are passed on to the block list.
+
+        @type block_list: BlockList
+        @param decompressed_data: 3 byte for each block of the segment
+        @type decompressed_data: bytes
+        """
+        states = SMBinaryStream.unpack_int24_array(decompressed_data)
+        block_indexes = np.flatnonzero(states)
+        position_indexes = self.get_position_indexes_by_block_indexes(block_indexes)
+        block_list.set_states(position_indexes, states[block_indexes], version=self._version)
 
     def read(self, block_list, input_stream):
         """
@@ -102,6 +141,28 @@ class SmdSegment(DefaultLogging):
     # ###  Write
     # #######################################
 
+    def _encode_block_data(self):
+        """
+        Turn blocks into uncompressed segment block data, 3 byte for each position of the segment.
+        Empty positions are zero.
+
+        @rtype: bytes
+        """
+        number_of_blocks = len(self.block_index_to_block)
+        if self.vectorized:
+            block_indexes = np.fromiter(self.block_index_to_block.keys(), dtype=np.int64, count=number_of_blocks)
+            states = np.fromiter(
+                (block.get_int_24() for block in self.block_index_to_block.values()),
+                dtype=np.int32, count=number_of_blocks)
+            data = np.zeros((self._blocks_in_a_cube, 3), dtype=np.uint8)
+            data[block_indexes] = SMBinaryStream.pack_int24_array(states, by_byte=False)
+            return data.tobytes()
+        byte_string = bytearray(self._blocks_in_a_cube * 3)
+        for block_index, block in self.block_index_to_block.items():
+            position = block_index * 3
+            byte_string[position:position+3] = SMBinaryStream.pack_int24(block.get_int_24())
+        return bytes(byte_string)
+
     def _write_block_data(self, output_stream):
         """
         Write segment block data to a byte stream.
@@ -114,15 +175,7 @@ class SmdSegment(DefaultLogging):
             self._compressed_size = 0
             output_stream.write_int32_unassigned(self._compressed_size)   # 4 byte
         else:
-            byte_string = b""
-            set_of_valid_block_index = set(self.block_index_to_block.keys())
-            for block_index in range(0, self._blocks_in_a_cube):
-                if block_index in set_of_valid_block_index:
-                    block_int_24 = self.block_index_to_block[block_index].get_int_24()
-                    byte_string += SMBinaryStream.pack_int24(block_int_24)
-                    continue
-                byte_string += b"\0" * 3
-            compressed_data = zlib.compress(byte_string)
+            compressed_data = zlib.compress(self._encode_block_data())
             self._compressed_size = len(compressed_data)
             output_stream.write_int32_unassigned(self._compressed_size)   # 4 byte
             output_stream.write(compressed_data)
@@ -179,6 +232,24 @@ class SmdSegment(DefaultLogging):
         x = rest % self._blocks_in_a_line
         return x+self._position[0], y+self._position[1], z+self._position[2]
 
+    def get_position_indexes_by_block_indexes(self, block_indexes):
+        """
+        Get global position indexes based on an array of local indexes
+
+        @attention: requires numpy
+
+        @param block_indexes: indexes of blocks of this segment 0:4095
+        @type block_indexes: numpy.ndarray
+
+        @return: position indexes, as returned by Vector.get_index
+        @rtype: numpy.ndarray
+        """
+        block_indexes = block_indexes.astype(np.int64)
+        z = block_indexes // self._blocks_in_an_area + self._position[2]
+        y = (block_indexes % self._blocks_in_an_area) // self._blocks_in_a_line + self._position[1]
+        x = block_indexes % self._blocks_in_a_line + self._position[0]
+        return (x & 0xFFFF) | ((y & 0xFFFF) << 16) | ((z & 0xFFFF) << 32)
+
     def get_block_index_by_block_position(self, position):
         """
         Get block index of position in this segment
@@ -0,0 +1,552 @@
+__author__ = 'Peter Hofmann'
+
+from collections import OrderedDict
+
+from ...utils.blocklist import BlockList
+from ...utils.vector import Vector
+from ...utils.smbinarystream import SMBinaryStream
+from ..smdblock.blockpool import block_pool, StyleBasic
+from .smdsegment import SmdSegment
+
+
+class LazyBlockList(BlockList):
+    """
+    Block list of smd3 region files that decodes a segment the first time a position within it is accessed.
+    Decoded segments are kept in a bounded cache, least recently used first, and decoded again after eviction.
+    Segments with modified blocks are kept in memory until popped.
+
+    @type _segment_to_source: dict[(int, int, int), (str, int)]
+    @type _segment_to_position_indexes: dict[(int, int, int), set[int]]
+    @type _segment_to_quantity: dict[(int, int, int), int]
+    @type _segment_to_block_ids: dict[(int, int, int), set[int]]
+    @type _cache: OrderedDict[(int, int, int), None]
+    """
+
+    def __init__(self, cache_size=64, blocks_in_a_line=32):
+        """
+        @param cache_size: maximum number of unmodified decoded segments kept in memory
+        @type cache_size: int
+        @param blocks_in_a_line: The number of blocks that fit beside each other within a segment
+        @type blocks_in_a_line: int
+        """
+        super(LazyBlockList, self).__init__()
+        assert cache_size > 0, "Bad cache size: {}".format(cache_size)
+        self._cache_size = cache_size
+        self._blocks_in_a_line = blocks_in_a_line
+        # segments in a region file, that were not modified
+        self._segment_to_source = dict()
+        # segments in memory
+        self._segment_to_position_indexes = dict()
+        # number of blocks of segments in a region file, once they were decoded
+        self._segment_to_quantity = dict()
+        # block ids of segments in a region file, once they were decoded, to skip segments when searching
+        self._segment_to_block_ids = dict()
+        # unmodified segments in memory
+        self._cache = OrderedDict()
+
+    def add_source(self, segment_position, file_path, offset):
+        """
+        Register a segment that can be decoded once needed
+
+        @param segment_position: x,y,z position of segment
+        @type segment_position: (int, int, int)
+        @param file_path: region file path
+        @type file_path: str
+        @param offset: offset of segment within the file
+        @type offset: int
+        """
+        self._segment_to_source[segment_position] = (file_path, offset)
+
+    def pop_sources(self):
+        """
+        Remove segments that were not modified since they were read and return where to find them in their region file.
+        Their blocks are no longer part of the list.
+
+        @return: segment position, region file path and offset of segment within the file
+        @rtype: list[((int, int, int), str, int)]
+        """
+        sources = []
+        for segment_position, (file_path, offset) in self._segment_to_source.items():
+            if segment_position in self._cache:
+                self._evict(segment_position)
+            sources.append((segment_position, file_path, offset))
+        self._segment_to_source = dict()
+        self._segment_to_quantity = dict()
+        self._segment_to_block_ids = dict()
+        self._cache = OrderedDict()
+        return sources
+
+    # #######################################
+    # ###  Segments
+    # #######################################
+
+    def _get_segment_position(self, position_index):
+        """
+        @type position_index: int
+
+        @rtype: (int, int, int)
+        """
+        line = self._blocks_in_a_line
+        x, y, z = Vector.get_position(position_index)
+        return x // line * line, y // line * line, z // line * line
+
+    def _get_segments(self):
+        """
+        @rtype: list[(int, int, int)]
+        """
+        return list(set(self._segment_to_source) | set(self._segment_to_position_indexes))
+
+    def _decode(self, segment_position):
+        """
+        Decode segment from its region file and put it into the cache
+
+        @type segment_position: (int, int, int)
+
+        @rtype: set[int]
+        """
+        file_path, offset = self._segment_to_source[segment_position]
+        block_list = BlockList()
+        segment = SmdSegment(blocks_in_a_line=self._blocks_in_a_line)
+        with open(file_path, 'rb') as input_stream:
+            input_stream.seek(offset)
+            segment.read(block_list, SMBinaryStream(input_stream))
+        assert not segment.has_valid_data or tuple(segment.position) == segment_position, \
+            "Unexpected segment position {} in '{}'".format(segment.position, file_path)
+        position_indexes = set(block_list.keys())
+        block_ids = set()
+        for position_index, block in block_list.pop_position_indexes():
+            self._position_index_to_instance[position_index] = block
+            block_ids.add(block.get_id())
+        self._segment_to_position_indexes[segment_position] = position_indexes
+        self._segment_to_quantity[segment_position] = len(position_indexes)
+        self._segment_to_block_ids[segment_position] = block_ids
+        self._cache[segment_position] = None
+        while len(self._cache) > self._cache_size:
+            self._evict(self._cache.popitem(last=False)[0])
+        return position_indexes
+
+    def _evict(self, segment_position):
+        """
+        Remove blocks of an unmodified segment from memory
+
+        @type segment_position: (int, int, int)
+        """
+        for position_index in self._segment_to_position_indexes.pop(segment_position):
+            del self._position_index_to_instance[position_index]
+
+    def _load(self, segment_position):
+        """
+        Get position indexes of blocks of a segment, decode segment if needed
+
+        @type segment_position: (int, int, int)
+
+        @rtype: set[int]
+        """
+        position_indexes = self._segment_to_position_indexes.get(segment_position)
+        if position_indexes is not None:
+            if segment_position in self._cache:
+                self._cache[segment_position] = self._cache.pop(segment_position)
+            return position_indexes
+        if segment_position in self._segment_to_source:
+            return self._decode(segment_position)
+        return set()
+
+    def _load_modifiable(self, segment_position):
+        """
+        Get position indexes of blocks of a segment, that is kept in memory from now on
+
+        @type segment_position: (int, int, int)
+
+        @rtype: set[int]
+        """
+        position_indexes = self._load(segment_position)
+        if segment_position not in self._segment_to_position_indexes:
+            self._segment_to_position_indexes[segment_position] = position_indexes
+        self._cache.pop(segment_position, None)
+        self._segment_to_source.pop(segment_position, None)
+        self._segment_to_quantity.pop(segment_position, None)
+        self._segment_to_block_ids.pop(segment_position, None)
+        return position_indexes
+
+    def _iter_position_index_block(self, block_ids=None):
+        """
+        Segment by segment, with a bounded number of segments in memory
+
+        @param block_ids: skip segments known to have no block of any of these ids
+        @type block_ids: set[int] | None
+
+        @rtype: Iterable[(int, StyleBasic)]
+        """
+        for segment_position in self._get_segments():
+            if block_ids is not None and segment_position in self._segment_to_block_ids:
+                if block_ids.isdisjoint(self._segment_to_block_ids[segment_position]):
+                    continue
+            position_indexes = self._load(segment_position)
+            blocks = [(position_index, self._position_index_to_instance[position_index])
+                      for position_index in position_indexes]
+            for position_index, block in blocks:
+                yield position_index, block
+
+    # #######################################
+    # ###  BlockList
+    # #######################################
+
+    def __iter__(self):
+        """
+        @rtype: Iterable[(int, int, int)]
+        """
+        for position_index, _ in self._iter_position_index_block():
+            yield Vector.get_position(position_index)
+
+    def items(self):
+        """
+        @rtype: Iterable[((int, int, int), StyleBasic)]
+        """
+        for position_index, block in self._iter_position_index_block():
+            yield Vector.get_position(position_index), block
+
+    def keys(self):
+        """
+        @rtype: Iterable[int]
+        """
+        for position_index, _ in self._iter_position_index_block():
+            yield position_index
+
+    def iter_states(self, block_ids=None):
+        """
+        @type block_ids: set[int] | None
+
+        @rtype: Iterable[(int, int)]
+        """
+        if block_ids is not None:
+            block_ids = set(block_ids)
+        for position_index, block in self._iter_position_index_block(block_ids):
+            if block_ids is None or block.get_id() in block_ids:
+                yield position_index, block.get_int_24()
+
+    def __setitem__(self, position, block):
+        """
+        @param position:
+        @type position: (int, int, int) | int
+        @param block:
+        @type block: StyleBasic
+        """
+        if isinstance(position, int):
+            position_index = position
+        else:
+            assert Vector.is_in_range(position), "Position out of range: {}".format(position)
+            position_index = Vector.get_index(position)
+        assert isinstance(block, StyleBasic), block
+        self._load_modifiable(self._get_segment_position(position_index)).add(position_index)
+        self._position_index_to_instance[position_index] = block
+
+    def set_states(self, position_indexes, states, version=None):
+        """
+        Set blocks by their integer state.
+        States that do not resolve to a block, like those of id 0, are skipped.
+
+        @type position_indexes: Iterable[int] | numpy.ndarray
+        @type states: Iterable[int] | numpy.ndarray
+        @type version: int | None
+        """
+        block_list = BlockList()
+        block_list.set_states(position_indexes, states, version=version)
+        for position_index, block in block_list.pop_position_indexes():
+            self[position_index] = block
+
+    def __getitem__(self, position):
+        """
+        Get a block at a specific position
+
+        @param position:
+        @type position: (int, int, int) | int
+
+        @rtype: StyleBasic
+        """
+        if isinstance(position, int):
+            position_index = position
+        else:
+            position_index = Vector.get_index(position)
+        self._load(self._get_segment_position(position_index))
+        return super(LazyBlockList, self).__getitem__(position_index)
+
+    def __len__(self):
+        """
+        Get number of blocks of blueprint, segments not decoded so far are decoded to count them.
+
+        @rtype: int
+        """
+        quantity = 0
+        for segment_position in self._get_segments():
+            if segment_position in self._segment_to_position_indexes:
+                quantity += len(self._segment_to_position_indexes[segment_position])
+            elif segment_position in self._segment_to_quantity:
+                quantity += self._segment_to_quantity[segment_position]
+            else:
+                quantity += len(self._decode(segment_position))
+        return quantity
+
+    def pop_position_indexes(self):
+        """
+        @rtype: Iterable[int, StyleBasic]
+        """
+        blocks = dict(self._iter_position_index_block())
+        self._position_index_to_instance = dict()
+        self._segment_to_source = dict()
+        self._segment_to_position_indexes = dict()
+        self._segment_to_quantity = dict()
+        self._segment_to_block_ids = dict()
+        self._cache = OrderedDict()
+        while len(blocks) > 0:
+            position_index, block = blocks.popitem()
+            yield position_index, block
+
+    def pop_positions(self):
+        """
+        @rtype: Iterable[(int, int, int), StyleBasic]
+        """
+        for position_index, block in self.pop_position_indexes():
+            yield Vector.get_position(position_index), block
+
+    def _pop_index(self, position_index):
+        """
+        @type position_index: int
+
+        @rtype: StyleBasic
+        """
+        self._load_modifiable(self._get_segment_position(position_index)).remove(position_index)
+        return self._position_index_to_instance.pop(position_index)
+
+    def pop(self, position):
+        """
+        Remove Block at specific position.
+
+        @param position: x,z,y position of a block
+        @type position: (int, int, int)
+
+        @rtype: StyleBasic
+        """
+        assert isinstance(position, tuple)
+        assert self.has_block_at(position), "No block at position: {}".format(position)
+        return self._pop_index(Vector.get_index(position))
+
+    def has_block_at(self, position):
+        """
+        Returns true if a block exists at a position
+
+        @param position: (x,y,z)
+        @type position: (int, int, int)
+
+        @rtype: bool
+        """
+        position_index = Vector.get_index(position)
+        return position_index in self._load(self._get_segment_position(position_index))
+
+    def get_block_ids(self):
+        """
+        Ids of all blocks, segments not decoded so far are decoded
+
+        @rtype: set[int]
+        """
+        block_ids = set()
+        for _, block in self._iter_position_index_block():
+            block_ids.add(block.get_id())
+        return block_ids
+
+    def get_block_id_to_quantity(self):
+        """
+        Quantity of each block id, segments not decoded so far are decoded
+
+        @rtype: dict[int, int]
+        """
+        block_id_to_quantity = {}
+        for _, block in self._iter_position_index_block():
+            block_id_to_quantity[block.get_id()] = block_id_to_quantity.get(block.get_id(), 0) + 1
+        return block_id_to_quantity
+
+    def get_min_max_vector(self, position_core=(16, 16, 16)):
+        """
+        Get the minimum and maximum coordinates of blocks, segments not decoded so far are decoded
+
+        @type position_core: (int, int, int)
+
+        @rtype: tuple[int,int,int], tuple[int,int,int]
+        """
+        min_vector = list(position_core)
+        max_vector = list(position_core)
+        for position_index, _ in self._iter_position_index_block():
+            for index, value in enumerate(Vector.get_position(position_index)):
+                if value < min_vector[index]:
+                    min_vector[index] = value
+                if value > max_vector[index]:
+                    max_vector[index] = value
+        return tuple(min_vector), tuple(max_vector)
+
+    def index_block_ids(self):
+        """
+        Not kept, segments without blocks of an id are skipped when searching instead
+        """
+        pass
+
+    def remove_blocks(self, block_ids):
+        """
+        Removing all blocks of a specific id
+
+        @type block_ids: set[int]
+        """
+        for position_index in self.search_all(block_ids):
+            self._pop_index(position_index)
+
+    def search_all(self, block_ids):
+        """
+        Search and return the global position of block positions
+
+        @type block_ids: set[int]
+
+        @rtype: set[int]
+        """
+        block_ids = set(block_ids)
+        position_indexes = set()
+        for position_index, block in self._iter_position_index_block(block_ids):
+            if block.get_id() in block_ids:
+                position_indexes.add(position_index)
+        return position_indexes
+
+    def search_positions(self, block_ids):
+        """
+        Search and return the global position of block positions
+
+        @type block_ids: set[int]
+
+        @rtype: set[int]
+        """
+        return self.search_all(block_ids)
+
+    def search(self, block_id):
+        """
+        Search and return the global position of the first occurrence of a block
+        If no block is found, return None
+
+        @type block_id: int
+
+        @rtype: None | tuple[int]
+        """
+        for position_index, block in self._iter_position_index_block({block_id}):
+            if block.get_id() == block_id:
+                return Vector.get_position(position_index)
+        return None
+
+    def set_many(self, position_indexes, blocks):
+        """
+        @type position_indexes: Iterable[int] | numpy.ndarray
+        @type blocks: Iterable[StyleBasic]
+        """
+        if hasattr(position_indexes, "tolist"):
+            position_indexes = position_indexes.tolist()
+        for position_index, block in zip(position_indexes, blocks):
+            self[position_index] = block
+
+    def pop_many(self, position_indexes):
+        """
+        @type position_indexes: Iterable[int] | numpy.ndarray
+
+        @rtype: list[StyleBasic]
+        """
+        if hasattr(position_indexes, "tolist"):
+            position_indexes = position_indexes.tolist()
+        return [self._pop_index(position_index) for position_index in position_indexes]
+
+    def get_distinct_states(self, block_ids=None):
+        """
+        @type block_ids: set[int] | None
+
+        @rtype: set[int]
+        """
+        return set(state for _, state in self.iter_states(block_ids))
+
+    def map_states(self, table):
+        """
+        Only segments with blocks of ids in the table are decoded, changed segments are kept in memory
+
+        @type table: dict[int, int]
+        """
+        block_ids = set(state & 0x7FF for state in table)
+        changes = [(position_index, table[state])
+                   for position_index, state in self.iter_states(block_ids) if state in table]
+        for position_index, state in changes:
+            block = block_pool(state)
+            if block is None:
+                self._pop_index(position_index)
+                continue
+            self[position_index] = block
+
+    def get_box_occupancy(self, min_vector, max_vector):
+        """
+        Which positions of a box hold a block, looked up position by position
+
+        @type min_vector: (int, int, int)
+        @type max_vector: (int, int, int)
+
+        @rtype: int
+        """
+        occupancy = 0
+        bit = 1
+        for x in range(min_vector[0], max_vector[0] + 1):
+            for y in range(min_vector[1], max_vector[1] + 1):
+                for z in range(min_vector[2], max_vector[2] + 1):
+                    if self.has_block_at((x, y, z)):
+                        occupancy |= bit
+                    bit <<= 1
+        return occupancy
+
+    def get_neighbourhood(self, position):
+        """
+        Which positions of the 3x3x3 cube around a position hold a block, looked up position by position.
+        The bit of offset (x, y, z) is (x + 1) * 9 + (y + 1) * 3 + (z + 1), the position itself is bit 13.
+
+        @type position: (int, int, int) | int
+
+        @rtype: int
+        """
+        if isinstance(position, int):
+            position = Vector.get_position(position)
+        x, y, z = position
+        return self.get_box_occupancy((x - 1, y - 1, z - 1), (x + 1, y + 1, z + 1))
+
+    def blocks_in_box(self, min_vector, max_vector):
+        """
+        Blocks within a box, only segments overlapping the box are decoded
+
+        @type min_vector: (int, int, int)
+        @type max_vector: (int, int, int)
+
+        @rtype: Iterable[(int, StyleBasic)]
+        """
+        line = self._blocks_in_a_line
+        for segment_position in self._get_segments():
+            if any(value + line <= low or value > high
+                   for value, low, high in zip(segment_position, min_vector, max_vector)):
+                continue
+            blocks = []
+            for position_index in self._load(segment_position):
+                position = Vector.get_position(position_index)
+                if all(low <= value <= high for value, low, high in zip(position, min_vector, max_vector)):
+                    blocks.append((position_index, self._position_index_to_instance[position_index]))
+            for position_index, block in blocks:
+                yield position_index, block
+
+    def snapshot(self):
+        """
+        Not supported, segments not in memory could not be kept unchanged
+        """
+        raise RuntimeError("Snapshots are not supported by lazily loaded block lists")
+
+    def move_positions(self, vector_direction):
+        """
+        Move all positions in a direction, all segments end up in memory
+
+        @type vector_direction: (int, int, int)
+        """
+        self._assert_move_in_range(vector_direction)
+        for position_index, block in self.pop_position_indexes():
+            self[Vector.shift_position_index(position_index, vector_direction)] = block
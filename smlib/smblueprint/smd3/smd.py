@@ -3,15 +3,22 @@ __author__ = 'Peter Hofmann'
 import sys
 import os
 import math
+import time
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 from ...common.loggingwrapper import DefaultLogging
 from ...utils.blockconfig import block_config
-from ...utils.blocklist import BlockList
+from ...utils.blocklist import BlockList, BlockStatistics
+from ...utils.chunkedblocklist import ChunkedBlockList
 from ...utils.vector import Vector
+from ...utils.transform import Transform
+from ...utils.smbinarystream import SMBinaryStream
 from ...utils.blueprintentity import BlueprintEntity
 from ..smdblock.blockpool import block_pool, StyleBasic
 from ..smd2.smd import Smd as Smd2
-from .smdregion import SmdRegion
+from .smdregion import SmdRegion, read_region_states
+from .lazyblocklist import LazyBlockList
 
 
 class Smd(DefaultLogging):
@@ -55,25 +62,33 @@ class Smd(DefaultLogging):
     # ###  Read
     # #######################################
 
-    def read(self, directory_blueprint):
+    def read(self, directory_blueprint, jobs=1, lazy=False, dense=False):
         """
         Read smd data from files in the blueprint/data/ directory
 
         @param directory_blueprint: input directory path
         @type directory_blueprint: str
-        """
+        @param jobs: number of worker processes decoding smd3 region files in parallel
+        @type jobs: int
+        @param lazy: read only smd3 region headers, segments are decoded once accessed
+        @type lazy: bool
+        @param dense: keep blocks as states in dense chunks, using less memory for large blueprints
+        @type dense: bool
+        """
+        assert jobs > 0, "Bad number of jobs: {}".format(jobs)
+        assert not (lazy and dense), "Reading lazy and dense at the same time is not supported"
         self._block_list = BlockList()
-        directory_data = os.path.join(directory_blueprint, "DATA")
-        file_list = sorted(os.listdir(directory_data))
-        assert len(file_list) > 0, "No smd files found"
+        if dense:
+            self._block_list = ChunkedBlockList()
+        directory_data, file_list = self._get_file_list(directory_blueprint)
         file_name = file_list[0]
-        file_path = os.path.join(directory_data, file_name)
-        if os.path.isdir(file_path) and file_name.startswith("ATTACHED_"):
-            directory_data = os.path.join(directory_data, file_name)
-            file_list = sorted(os.listdir(directory_data))
-            assert len(file_list) > 0, "No smd files found"
-            file_name = file_list[0]
         if file_name.endswith(".smd3"):
+            if lazy:
+                self._read_lazy(directory_data, file_list)
+                return
+            if jobs > 1 and len(file_list) > 1:
+                self._read_parallel(directory_data, file_list, jobs)
+                return
             smd_region = SmdRegion(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
             for file_name in file_list:
                 file_path = os.path.join(directory_data, file_name)
@@ -88,14 +103,109 @@ class Smd(DefaultLogging):
             offset = (8, 8, 8)
             self._block_list = smd2.get_block_list()
             self._block_list.move_positions(offset)
+            if dense:
+                block_list = self._block_list
+                self._block_list = ChunkedBlockList()
+                for position_index, block in block_list.pop_position_indexes():
+                    self._block_list[position_index] = block
         else:
             raise RuntimeError("Unknown smd format: '{}'".format(directory_data))
 
+    @staticmethod
+    def _get_file_list(directory_blueprint):
+        """
+        Locate smd files in the blueprint/data/ directory
+
+        @param directory_blueprint: input directory path
+        @type directory_blueprint: str
+
+        @return: directory of smd files, sorted smd file names
+        @rtype: str, list[str]
+        """
+        directory_data = os.path.join(directory_blueprint, "DATA")
+        file_list = sorted(os.listdir(directory_data))
+        assert len(file_list) > 0, "No smd files found"
+        file_name = file_list[0]
+        file_path = os.path.join(directory_data, file_name)
+        if os.path.isdir(file_path) and file_name.startswith("ATTACHED_"):
+            directory_data = os.path.join(directory_data, file_name)
+            file_list = sorted(os.listdir(directory_data))
+            assert len(file_list) > 0, "No smd files found"
+        return directory_data, file_list
+
+    def read_statistics(self, directory_blueprint):
+        """
+        Count blocks of each id and get the bounding box from smd files, without creating blocks.
+        smd2 files are read and converted as usual.
+
+        @param directory_blueprint: input directory path
+        @type directory_blueprint: str
+
+        @rtype: BlockStatistics
+        """
+        block_statistics = BlockStatistics(self._position_core)
+        directory_data, file_list = self._get_file_list(directory_blueprint)
+        if not file_list[0].endswith(".smd3"):
+            self.read(directory_blueprint)
+            position_states = list(self._block_list.iter_states())
+            block_statistics.set_states(
+                [position_index for position_index, _ in position_states], [state for _, state in position_states])
+            self._block_list = BlockList()
+            return block_statistics
+        smd_region = SmdRegion(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        for file_name in file_list:
+            smd_region.read(os.path.join(directory_data, file_name), block_statistics)
+        return block_statistics
+
+    def _read_lazy(self, directory_data, file_list):
+        """
+        Locate segments of smd3 region files, without decoding them
+
+        @param directory_data: blueprint/data/ directory
+        @type directory_data: str
+        @param file_list: names of region files
+        @type file_list: list[str]
+        """
+        self._block_list = LazyBlockList(blocks_in_a_line=self._blocks_in_a_line_in_a_segment)
+        smd_region = SmdRegion(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        for file_name in file_list:
+            file_path = os.path.join(directory_data, file_name)
+            self._file_name_prefix, x, y, z = os.path.splitext(file_name)[0].rsplit('.', 3)
+            segment_position_to_offset = smd_region.read_segment_offsets(file_path, (int(x), int(y), int(z)))
+            for segment_position, offset in segment_position_to_offset.items():
+                self._block_list.add_source(segment_position, file_path, offset)
+
+    def _read_parallel(self, directory_data, file_list, jobs):
+        """
+        Decode smd3 region files in worker processes and merge the block states into the block list
+
+        @param directory_data: blueprint/data/ directory
+        @type directory_data: str
+        @param file_list: names of region files
+        @type file_list: list[str]
+        @param jobs: number of worker processes
+        @type jobs: int
+        """
+        file_paths = []
+        for file_name in file_list:
+            file_paths.append(os.path.join(directory_data, file_name))
+            self._file_name_prefix, x, y, z = os.path.splitext(file_name)[0].rsplit('.', 3)
+        self._logger.info("Reading {} files using {} processes".format(len(file_paths), jobs))
+        pool = multiprocessing.Pool(processes=min(jobs, len(file_paths)))
+        try:
+            for file_path, region_states in zip(file_paths, pool.imap(read_region_states, file_paths)):
+                self._logger.debug("Merging file '{}'".format(file_path))
+                for version, position_indexes, states in region_states:
+                    self._block_list.set_states(position_indexes, states, version=version)
+        finally:
+            pool.close()
+            pool.join()
+
     # #######################################
     # ###  Write
     # #######################################
 
-    def write(self, directory_blueprint, blueprint_name):
+    def write(self, directory_blueprint, blueprint_name, threads=1):
         """
         Write smd data to files in the blueprint/data/ directory
 
@@ -103,20 +213,135 @@ class Smd(DefaultLogging):
         @type directory_blueprint: str
         @param blueprint_name: name of blueprint
         @type blueprint_name: str
+        @param threads: number of threads compressing segments of a region at the same time
+        @type threads: int
         """
         assert len(blueprint_name) > 0, "Bad blueprint name."
+        assert threads > 0, "Bad number of threads: {}".format(threads)
+        # segments not modified since read are copied from their region file as they are
+        segment_sources = []
+        if isinstance(self._block_list, LazyBlockList):
+            segment_sources = self._block_list.pop_sources()
         # move blocks from pool into smd data structure
         for position_block, block in self._block_list.pop_positions():
             self.add(position_block, block)
+        self._add_compressed_segments(segment_sources)
         directory_data = os.path.join(directory_blueprint, "DATA")
         if not os.path.exists(directory_data):
             os.mkdir(directory_data)
-        # print self.position_to_region.keys()
-        for position, region in self.position_to_region.items():
-            assert isinstance(region, SmdRegion)
-            file_name = blueprint_name + "." + ".".join(map(str, position)) + ".smd3"
-            file_path = os.path.join(directory_data, file_name)
-            region.write(file_path)
+        thread_pool = None
+        if threads > 1:
+            thread_pool = ThreadPool(processes=threads)
+        time_compression = 0.
+        time_io = 0.
+        try:
+            for position, region in self.position_to_region.items():
+                assert isinstance(region, SmdRegion)
+                file_name = blueprint_name + "." + ".".join(map(str, position)) + ".smd3"
+                file_path = os.path.join(directory_data, file_name)
+                time_start = time.time()
+                region.compress(thread_pool)
+                time_compression += time.time() - time_start
+                time_start = time.time()
+                region.write(file_path)
+                time_io += time.time() - time_start
+        finally:
+            if thread_pool is not None:
+                thread_pool.close()
+                thread_pool.join()
+        self._logger.info("Compression: {:.3f}s, writing: {:.3f}s ({} threads)".format(
+            time_compression, time_io, threads))
+
+    def _add_compressed_segments(self, segment_sources):
+        """
+        Add unmodified segments with their compressed block data, as found in region files
+
+        @param segment_sources: segment position, region file path and offset of segment within the file
+        @type segment_sources: list[((int, int, int), str, int)]
+        """
+        if len(segment_sources) == 0:
+            return
+        self._logger.info("Copying {} unmodified segments".format(len(segment_sources)))
+        file_path_to_sources = dict()
+        for segment_position, file_path, offset in segment_sources:
+            file_path_to_sources.setdefault(file_path, []).append((offset, segment_position))
+        for file_path in sorted(file_path_to_sources.keys()):
+            with open(file_path, 'rb') as input_stream:
+                smd_stream = SMBinaryStream(input_stream)
+                for offset, segment_position in sorted(file_path_to_sources[file_path]):
+                    smd_stream.seek(offset)
+                    self._get_region(segment_position).add_compressed_segment(smd_stream)
+
+    # #######################################
+    # ###  Streaming
+    # #######################################
+
+    def transform(self, directory_blueprint, directory_output, blueprint_name, transforms, threads=1):
+        """
+        Read, transform and write smd3 region files one at a time, only blocks of a single region are kept in memory.
+        Meant for transformations of blocks that do not depend on neighbouring blocks, like replacing or removing blocks.
+        Transforms must not move blocks.
+        Regions left without blocks are not written, so the output must not contain region files already.
+
+        @param directory_blueprint: input directory path
+        @type directory_blueprint: str
+        @param directory_output: output directory path
+        @type directory_output: str
+        @param blueprint_name: name of blueprint
+        @type blueprint_name: str
+        @param transforms: functions modifying the block list of a region in place, in the given order
+        @type transforms: list[(BlockList) -> None]
+        @param threads: number of threads compressing segments of a region at the same time
+        @type threads: int
+
+        @return: quantity of each block id, minimum and maximum position of blocks
+        @rtype: dict[int, int], (int, int, int), (int, int, int)
+        """
+        assert len(blueprint_name) > 0, "Bad blueprint name."
+        assert threads > 0, "Bad number of threads: {}".format(threads)
+        directory_data, file_list = self._get_file_list(directory_blueprint)
+        if not file_list[0].endswith(".smd3"):
+            raise RuntimeError("Unsupported smd format for streaming: '{}'".format(directory_data))
+        directory_output_data = os.path.join(directory_output, "DATA")
+        if not os.path.exists(directory_output_data):
+            os.mkdir(directory_output_data)
+        assert len(os.listdir(directory_output_data)) == 0, \
+            "Output smd directory is not empty: '{}'".format(directory_output_data)
+        block_id_to_quantity = {}
+        min_vector = max_vector = self._position_core
+        thread_pool = None
+        if threads > 1:
+            thread_pool = ThreadPool(processes=threads)
+        try:
+            for file_name in file_list:
+                self._file_name_prefix, x, y, z = os.path.splitext(file_name)[0].rsplit('.', 3)
+                self._block_list = BlockList()
+                smd_region = SmdRegion(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+                smd_region.read(os.path.join(directory_data, file_name), self._block_list)
+                for transform in transforms:
+                    transform(self._block_list)
+                for block_id, quantity in self.get_block_id_to_quantity().items():
+                    block_id_to_quantity[block_id] = block_id_to_quantity.get(block_id, 0) + quantity
+                region_min_vector, region_max_vector = self.get_min_max_vector()
+                min_vector = tuple(map(min, min_vector, region_min_vector))
+                max_vector = tuple(map(max, max_vector, region_max_vector))
+                if len(self._block_list) == 0:
+                    continue
+                position_region = (int(x), int(y), int(z))
+                smd_region = SmdRegion(logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+                for position_block, block in self._block_list.pop_positions():
+                    assert self.get_region_position_of_position(position_block) == position_region, \
+                        "Block moved out of region: {}".format(position_block)
+                    smd_region.add(position_block, block)
+                smd_region.compress(thread_pool)
+                file_name = blueprint_name + "." + ".".join(map(str, position_region)) + ".smd3"
+                smd_region.write(os.path.join(directory_output_data, file_name))
+        finally:
+            if thread_pool is not None:
+                thread_pool.close()
+                thread_pool.join()
+            self._block_list = BlockList()
+        return block_id_to_quantity, min_vector, max_vector
 
     # #######################################
     # ###  Get
@@ -185,17 +410,7 @@ class Smd(DefaultLogging):
         @type direction_vector: (int,int,int)
         @rtype: None
         """
-        # test if core exists
-        block_core = None
-        if self._block_list.has_core():
-            block_core = self._block_list.pop(self._position_core)
-
-        new_direction_vector = Vector.multiplication((-1, -1, -1), direction_vector)
-        self._block_list.move_positions(new_direction_vector)
-
-        # return core if it existed
-        if block_core is not None:
-            self._block_list[self._position_core] = block_core
+        self.apply_transform(Transform().move_center(direction_vector))
 
     def mirror(self, axis_index, reverse=False):
         """
@@ -207,24 +422,7 @@ class Smd(DefaultLogging):
         @type axis_index: int
         @type reverse: bool
         """
-        vector_factor = [1] * 3
-        vector_factor[axis_index] = -1
-        for position_block, block in self._block_list.pop_positions():
-            if position_block[axis_index] == self._position_core[axis_index]:
-                self._block_list[position_block] = block
-                continue
-            if reverse:
-                mirror = position_block[axis_index] < self._position_core[axis_index]
-            else:
-                mirror = position_block[axis_index] > self._position_core[axis_index]
-            if not mirror:
-                continue
-            position_tmp = Vector.subtraction(position_block, self._position_core)
-            position_tmp = Vector.multiplication(position_tmp, vector_factor)
-            new_block_position = Vector.addition(position_tmp, self._position_core)
-            new_block = block.get_mirror(axis_index)
-            self._block_list[position_block] = block
-            self._block_list[new_block_position] = new_block
+        self.apply_transform(Transform().mirror(axis_index, reverse))
 
     # #######################################
     # ###  Turning
@@ -237,25 +435,103 @@ class Smd(DefaultLogging):
         @param tilt_index: integer representing a specific turn
         @type tilt_index: int
         """
-        for position_block, block in self._block_list.pop_positions():
-            new_block_position = position_block
-            if block.get_id() != 1:  # core
-                new_block_position = Vector.tilt_turn_position(position_block, tilt_index)
-                # block.tilt_turn(tilt_index)  # todo: needs fixing
-            self._block_list[new_block_position] = block
+        self.apply_transform(Transform().tilt_turn(tilt_index))
+
+    # #######################################
+    # ###  Transform
+    # #######################################
+
+    def apply_transform(self, transform, selection=None):
+        """
+        Move, mirror and turn all blocks in a single pass.
+        The core keeps its position and orientation, a block moved to the position of the core is removed.
+
+        Blocks transformed onto unselected blocks replace them, like mirrored copies outside of a selection.
+
+        @type transform: Transform
+        @param selection: only blocks of a selection are transformed, the others stay where they are.
+            The selection is compared with positions before the transformation.
+        @type selection: Selection | None
+        """
+        if transform.is_moving_blocks():
+            # checked once, instead of each position
+            min_vector, max_vector = transform.get_box(*self.get_min_max_vector())
+            assert Vector.is_in_range(min_vector) and Vector.is_in_range(max_vector), \
+                "Blocks moved out of range: {} {}".format(min_vector, max_vector)
+        block_core = None
+        if self._block_list.has_core(self._position_core):
+            block_core = self._block_list.pop(self._position_core)
+        position_indexes = []
+        blocks = []
+        if selection is None:
+            for position_index, block in self._block_list.pop_position_indexes():
+                position_indexes.append(position_index)
+                blocks.append(block)
+        else:
+            position_indexes = [
+                position_index for position_index, _ in self._block_list.blocks_in_selection(selection)]
+            blocks = self._block_list.pop_many(position_indexes)
+        if transform.is_moving_blocks():
+            position_indexes = transform.get_indexes(position_indexes)
+            if hasattr(position_indexes, "tolist"):
+                position_indexes = position_indexes.tolist()
+        block_to_transformed = {}
+        for block in blocks:
+            if block not in block_to_transformed:
+                block_to_transformed[block] = block_pool(transform.get_state(block.get_int_24()))
+        if not transform.has_mirror():
+            new_position_indexes = position_indexes
+            new_blocks = [block_to_transformed[block] for block in blocks]
+        else:
+            new_position_indexes = []
+            new_blocks = []
+            block_to_mirrored = {}
+            for position_index, block in zip(position_indexes, blocks):
+                position_block = Vector.get_position(position_index)
+                side = transform.get_side(position_block)
+                if side < 0:
+                    continue
+                block = block_to_transformed[block]
+                new_position_indexes.append(position_index)
+                new_blocks.append(block)
+                if side == 0:
+                    continue
+                if block not in block_to_mirrored:
+                    block_to_mirrored[block] = block_pool(transform.get_mirrored_state(block.get_int_24()))
+                new_position_indexes.append(Vector.get_index(transform.get_mirrored_position(position_block)))
+                new_blocks.append(block_to_mirrored[block])
+        if selection is not None:
+            # selected blocks were removed, any block left in the way is not part of the selection
+            number_of_overwritten = sum(
+                1 for position_index in new_position_indexes
+                if self._block_list.has_block_at(Vector.get_position(position_index)))
+            if number_of_overwritten > 0:
+                self._logger.warning("Overwritten unselected blocks: {}".format(number_of_overwritten))
+        self._block_list.set_many(new_position_indexes, new_blocks)
+
+        # return core if it existed
+        if block_core is not None:
+            self._block_list[self._position_core] = block_core
 
     # #######################################
     # ###  Else
     # #######################################
 
-    def remove_blocks(self, block_ids):
+    def remove_blocks(self, block_ids, selection=None):
         """
         Removing all blocks of a specific id
 
         @param block_ids:
         @type block_ids: set[int]
+        @param selection: only blocks of a selection are removed, all blocks if None
+        @type selection: Selection | None
         """
-        self._block_list.remove_blocks(block_ids)
+        if selection is None:
+            self._block_list.remove_blocks(block_ids)
+            return
+        self._block_list.pop_many([
+            position_index for position_index, block in self._block_list.blocks_in_selection(selection)
+            if block.get_id() in block_ids])
 
     def add_block(self, block, position):
         """
@@ -288,18 +564,18 @@ class Smd(DefaultLogging):
             entity_type = 0
 
         invalid_ids = set()
-        for position, block in self._block_list.items():
-            if not block_config[block.get_id()].is_valid(entity_type):
-                invalid_ids.add(block.get_id())
+        for block_id in self._block_list.get_block_ids():
+            if not block_config[block_id].is_valid(entity_type):
+                invalid_ids.add(block_id)
                 continue
-            if not block_config[block.get_id()].is_docking():
+            if not block_config[block_id].is_docking():
                 continue
-            updated_block_id = block_config[block.get_id()].get_rail_equivalent()
+            updated_block_id = block_config[block_id].get_rail_equivalent()
             if updated_block_id is None:
-                invalid_ids.add(block.get_id())
+                invalid_ids.add(block_id)
                 continue
-            new_block = block.to_style6(block_id=updated_block_id)
-            self._block_list[position] = new_block
+            for position_index in self._block_list.search_all({block_id}):
+                self._block_list[position_index] = self._block_list[position_index].to_style6(block_id=updated_block_id)
         self._block_list.remove_blocks(invalid_ids)
 
     def add(self, block_position, block, replace=True):
@@ -313,13 +589,24 @@ class Smd(DefaultLogging):
         """
         assert isinstance(block_position, tuple)
         assert isinstance(block, StyleBasic), block
-        position_region = self.get_region_position_of_position(block_position)
+        self._get_region(block_position).add(block_position, block, replace)
+
+    def _get_region(self, position):
+        """
+        Get the region a position belongs to, a new one if needed
+
+        @param position: Any global position like that of a block
+        @type position: (int, int, int)
+
+        @rtype: SmdRegion
+        """
+        position_region = self.get_region_position_of_position(position)
         if position_region not in self.position_to_region:
             self.position_to_region[position_region] = SmdRegion(
                 logfile=self._logfile,
                 verbose=self._verbose,
                 debug=self._debug)
-        self.position_to_region[position_region].add(block_position, block, replace)
+        return self.position_to_region[position_region]
 
     def search(self, block_id):
         """
@@ -344,7 +631,30 @@ class Smd(DefaultLogging):
         @return: None or (x,y,z)
         @rtype: set[(int, int, int)]
         """
-        return self._block_list.search_positions(set(block_id))
+        return set(Vector.get_position(position_index)
+                   for position_index in self._block_list.search_positions({block_id}))
+
+    def index_block_ids(self):
+        """
+        Keep position indexes of each block id, for quick searches and removals by id
+        """
+        self._block_list.index_block_ids()
+
+    def snapshot(self):
+        """
+        Keep the current blocks, to be restored after later modifications
+
+        @rtype: smlib.utils.blocklist.BlockListSnapshot
+        """
+        return self._block_list.snapshot()
+
+    def restore(self, snapshot):
+        """
+        Restore blocks kept in a snapshot, segments not modified since are left untouched
+
+        @type snapshot: smlib.utils.blocklist.BlockListSnapshot
+        """
+        self._block_list.restore(snapshot)
 
     def has_block_at(self, position):
         """
@@ -365,12 +675,7 @@ class Smd(DefaultLogging):
         @return: dictionary of block id to the quantity of that block type
         @rtype: dict[int, int]
         """
-        block_id_to_quantity = {}
-        for position, block in self._block_list.items():
-            if block.get_id() not in block_id_to_quantity:
-                block_id_to_quantity[block.get_id()] = 0
-            block_id_to_quantity[block.get_id()] += 1
-        return block_id_to_quantity
+        return self._block_list.get_block_id_to_quantity()
 
     def set_type(self, entity_type):
         """
@@ -399,24 +704,22 @@ class Smd(DefaultLogging):
         @return: Minimum(x,y,z), Maximum(x,y,z)
         @rtype: tuple[int,int,int], tuple[int,int,int]
         """
-        min_vector = [16, 16, 16]
-        max_vector = [16, 16, 16]
-        for position_block, block in self._block_list.items():
-            for index, value in enumerate(position_block):
-                if value < min_vector[index]:
-                    min_vector[index] = value
-                if value > max_vector[index]:
-                    max_vector[index] = value
-        return tuple(min_vector), tuple(max_vector)
+        return self._block_list.get_min_max_vector(self._position_core)
 
-    def to_stream(self, output_stream=sys.stdout):
+    def to_stream(self, output_stream=sys.stdout, block_statistics=None):
         """
         Stream smd values
 
         @param output_stream: Output stream
         @type output_stream: fileIO
+        @param block_statistics: statistics to report, instead of those of the block list
+        @type block_statistics: BlockStatistics | None
         """
         output_stream.write("####\nSMD\n####\n\n")
+        if block_statistics is not None:
+            output_stream.write("Total blocks: {}\n\n".format(len(block_statistics)))
+            output_stream.flush()
+            return
         output_stream.write("Total blocks: {}\n\n".format(self.get_number_of_blocks()))
         if self._debug:
             for position_block, block in sorted(self._block_list.items()):
@@ -1,10 +1,14 @@
 __author__ = 'Peter Hofmann'
 
+import os
 import sys
 import math
+import mmap
+import struct
 
 from ...common.loggingwrapper import DefaultLogging
 from ...utils.smbinarystream import SMBinaryStream
+from ...utils.blocklist import BlockList, BlockStates
 from .smdsegment import SmdSegment, StyleBasic
 
 
@@ -15,8 +19,12 @@ class SmdRegion(DefaultLogging):
     # #######################################
 
     @type position_to_segment: dict[tuple[int], SmdSegment]
+    @type memory_mapped: bool
     """
 
+    # read region files memory mapped, accessing only segments listed in the segment index
+    memory_mapped = True
+
     _valid_versions = {
         (2, 0, 0, 0),
         (3, 0, 0, 0),
@@ -118,6 +126,90 @@ class SmdRegion(DefaultLogging):
                 continue
             segment.read(block_list, input_stream)
 
+    def _unpack_segment_index(self, buffer):
+        """
+        Unpack region header from a buffer
+        Only segment index entries that point to a segment in the file are returned.
+
+        @param buffer: region header, or whole region file
+        @type buffer: mmap.mmap | bytes
+
+        @return: segment index to identifier
+        @rtype: dict[int, int]
+        """
+        assert len(buffer) >= self._get_region_header_size(), "Region file too small"
+        region_header = struct.unpack_from(">4b{}H".format(self._segments_in_a_cube * 2), buffer, 0)
+        self.version = region_header[:4]
+        assert self.version in self._valid_versions, "Unsupported smd version: {}".format(self.version)
+        segment_index_to_identifier = {}
+        for segment_index in range(0, self._segments_in_a_cube):
+            identifier = region_header[4 + segment_index * 2]
+            size = region_header[5 + segment_index * 2]
+            if identifier > 0 and size > 0:
+                segment_index_to_identifier[segment_index] = identifier
+        return segment_index_to_identifier
+
+    def _get_region_header_size(self):
+        """
+        Size of version (4 byte) and segment index (4 byte per segment)
+
+        @rtype: int
+        """
+        return 4 + self._segments_in_a_cube * 4
+
+    def _get_segment_offset(self, identifier):
+        """
+        segment position in file     = (region header size) + (identifier - 1) * (segment data size)
+
+        @type identifier: int
+        @rtype: int
+        """
+        return self._get_region_header_size() + (identifier - 1) * 49152
+
+    def _read_mapped(self, block_list, buffer):
+        """
+        Read region data from a memory mapped file
+        Segment offsets are computed from the segment index, empty slots are never accessed.
+
+        @type block_list: BlockList
+        @param buffer: memory mapped region file
+        @type buffer: mmap.mmap
+        """
+        segment_index_to_identifier = self._unpack_segment_index(buffer)
+        segment = SmdSegment(
+            blocks_in_a_line=self._blocks_in_a_line_in_a_segment,
+            logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        for identifier in sorted(segment_index_to_identifier.values()):
+            offset = self._get_segment_offset(identifier)
+            if offset >= len(buffer):
+                # segment beyond end of file
+                continue
+            segment.read_buffer(block_list, buffer, offset)
+
+    def read_segment_offsets(self, file_path, region_position):
+        """
+        Read only the header of a region file, to locate its segments without decoding them
+
+        @param file_path: region file path
+        @type file_path: str
+        @param region_position: region position, as found in the file name
+        @type region_position: (int, int, int)
+
+        @return: segment position to offset of segment within the file
+        @rtype: dict[(int, int, int), int]
+        """
+        with open(file_path, 'rb') as input_stream:
+            segment_index_to_identifier = self._unpack_segment_index(input_stream.read(self._get_region_header_size()))
+            file_size = os.fstat(input_stream.fileno()).st_size
+        segment_position_to_offset = {}
+        for segment_index, identifier in segment_index_to_identifier.items():
+            offset = self._get_segment_offset(identifier)
+            if offset >= file_size:
+                continue
+            segment_position = self.get_segment_position_by_index(segment_index, region_position)
+            segment_position_to_offset[segment_position] = offset
+        return segment_position_to_offset
+
     def read(self, file_path, block_list):
         """
         Read region data from a file
@@ -129,7 +221,14 @@ class SmdRegion(DefaultLogging):
         # print file_path
         self._logger.info("Reading file '{}'".format(file_path))
         with open(file_path, 'rb') as input_stream:
-            self._read_file(block_list, SMBinaryStream(input_stream))
+            if not self.memory_mapped or os.fstat(input_stream.fileno()).st_size == 0:
+                self._read_file(block_list, SMBinaryStream(input_stream))
+                return
+            buffer = mmap.mmap(input_stream.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self._read_mapped(block_list, buffer)
+            finally:
+                buffer.close()
 
     # #######################################
     # ###  Write
@@ -184,6 +283,20 @@ class SmdRegion(DefaultLogging):
             seg_id += 1
             self._write_segment_index(seg_id, segment_index_to_size[segment_index], output_stream)
 
+    def compress(self, thread_pool=None):
+        """
+        Encode and compress block data of all segments ahead of writing the region
+
+        @param thread_pool: compress segments in threads of this pool
+        @type thread_pool: multiprocessing.pool.ThreadPool | None
+        """
+        segments = list(self.position_to_segment.values())
+        if thread_pool is None:
+            for segment in segments:
+                segment.compress()
+            return
+        thread_pool.map(SmdSegment.compress, segments)
+
     def _write_file(self, output_stream):
         """
         Write region data to a byte stream
@@ -265,6 +378,27 @@ class SmdRegion(DefaultLogging):
             (tmp[1] % self._segments_in_a_line) * self._segments_in_a_line + \
             (tmp[2] % self._segments_in_a_line) * self._segments_in_an_area
 
+    def get_segment_position_by_index(self, segment_index, region_position):
+        """
+        Get segment position of a segment index within a region, reverse of get_segment_index_by_position
+
+        @param segment_index: index of segment within region 0:4095
+        @type segment_index: int
+        @param region_position: x,y,z position of region
+        @type region_position: tuple[int]
+
+        @rtype: tuple[int]
+        """
+        blocks_in_a_line_in_a_region = self._blocks_in_a_line_in_a_segment * self._segments_in_a_line
+        offset = int(blocks_in_a_line_in_a_region / 2)
+        tmp = (
+            segment_index % self._segments_in_a_line,
+            int(segment_index / self._segments_in_a_line) % self._segments_in_a_line,
+            int(segment_index / self._segments_in_an_area))
+        return tuple(
+            region_position[axis] * blocks_in_a_line_in_a_region - offset + tmp[axis] * self._blocks_in_a_line_in_a_segment
+            for axis in range(3))
+
     # #######################################
     # ###  Set
     # #######################################
@@ -288,6 +422,31 @@ class SmdRegion(DefaultLogging):
             self.position_to_segment[position_segment].set_position(position_segment)
         self.position_to_segment[position_segment].add(block_position, block, replace)
 
+    def add_compressed_segment(self, input_stream):
+        """
+        Add a segment from a region file without decoding its block data, it is written again as it is.
+        Segments of an older version, or at the position of a segment blocks were added to, are decoded instead.
+
+        @param input_stream: input stream at the position of a segment
+        @type input_stream: SMBinaryStream
+        """
+        offset = input_stream.tell()
+        segment = SmdSegment(
+            blocks_in_a_line=self._blocks_in_a_line_in_a_segment,
+            logfile=self._logfile, verbose=self._verbose, debug=self._debug)
+        segment.read_compressed(input_stream)
+        if not segment.has_valid_data:
+            return
+        position_segment = tuple(segment.position)
+        if segment.is_up_to_date() and position_segment not in self.position_to_segment:
+            self.position_to_segment[position_segment] = segment
+            return
+        block_list = BlockList()
+        input_stream.seek(offset)
+        segment.read(block_list, input_stream)
+        for block_position, block in block_list.pop_positions():
+            self.add(block_position, block)
+
     def to_stream(self, output_stream=sys.stdout):
         """
         Stream region values
@@ -302,3 +461,18 @@ class SmdRegion(DefaultLogging):
                 self.position_to_segment[position].to_stream(output_stream)
         output_stream.write("\n")
         output_stream.flush()
+
+
+def read_region_states(file_path):
+    """
+    Decode a region file into block states, grouped by segment version.
+    Meant to run in a worker process, states are not resolved to blocks.
+
+    @param file_path: region file path
+    @type file_path: str
+
+    @rtype: list[(int, list[int] | numpy.ndarray, list[int] | numpy.ndarray)]
+    """
+    block_states = BlockStates()
+    SmdRegion().read(file_path, block_states)
+    return list(block_states.items())
@@ -2,11 +2,18 @@ __author__ = 'Peter Hofmann'
 
 import sys
 import zlib
+import struct
 import datetime
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from ...common.loggingwrapper import DefaultLogging
 from ...utils.smbinarystream import SMBinaryStream
-from ..smdblock.blockpool import block_pool, StyleBasic
+from ...utils.vector import Vector
+from ..smdblock.blockpool import StyleBasic
 
 
 class SmdSegment(DefaultLogging):
@@ -18,10 +25,18 @@ class SmdSegment(DefaultLogging):
 
     @type block_index_to_block: dict[int, StyleBasic]
     @type position: tuple[int]
+    @type vectorized: bool
+    @type _compressed_data: bytes | None
     """
 
     _valid_versions = {2, 3}
 
+    # version, timestamp, position, has_valid_data, compressed_size
+    _header_struct = struct.Struct(">bQiii?I")
+
+    # decode and encode block data as a whole with numpy, instead of block by block
+    vectorized = np is not None
+
     def __init__(self, blocks_in_a_line=32, logfile=None, verbose=False, debug=False):
         super(SmdSegment, self).__init__(
             label="SmdSegment",
@@ -36,6 +51,7 @@ class SmdSegment(DefaultLogging):
         self.position = None
         self.has_valid_data = False
         self.compressed_size = 0
+        self._compressed_data = None
         self.block_index_to_block = {}
 
     # #######################################
@@ -66,8 +82,33 @@ class SmdSegment(DefaultLogging):
         @param input_stream: input byte stream
         @type input_stream: SMBinaryStream
         """
-        decompressed_data = zlib.decompress(input_stream.read(self.compressed_size))
+        self._decode(block_list, zlib.decompress(input_stream.read(self.compressed_size)))
+        input_stream.seek(49126-self.compressed_size, 1)  # skip unused bytes
+
+    def _decode(self, block_list, decompressed_data):
+        """
+        Decode block data, block by block or vectorized
+
+        @type block_list: BlockList
+        @param decompressed_data: 3 byte for each block of the segment
+        @type decompressed_data: bytes
+        """
         self.block_index_to_block = {}
+        if self.vectorized:
+            self._decode_block_data_vectorized(block_list, decompressed_data)
+        else:
+            self._decode_block_data(block_list, decompressed_data)
+
+    def _decode_block_data(self, block_list, decompressed_data):
+        """
+        Decode block data one block at a time
+
+        @type block_list: BlockList
+        @param decompressed_data: 3 byte for each block of the segment
+        @type decompressed_data: bytes
+        """
+        position_indexes = []
+        states = []
         number_of_blocks = len(decompressed_data) / 3
         for block_index in range(int(number_of_blocks)):
             position = block_index * 3
@@ -75,11 +116,24 @@ class SmdSegment(DefaultLogging):
                 int_24bit = SMBinaryStream.unpack_int24(decompressed_data[position:position+3])
             else:
                 int_24bit = SMBinaryStream.unpack_int24b(decompressed_data[position:position+3])
-            block = block_pool(int_24bit, version=self._version)
-            if block is None:
+            if int_24bit == 0:
                 continue
-            block_list[self.get_block_position_by_block_index(block_index)] = block
-        input_stream.seek(49126-self.compressed_size, 1)  # skip unused bytes
+            position_indexes.append(Vector.get_index(self.get_block_position_by_block_index(block_index)))
+            states.append(int_24bit)
+        block_list.set_states(position_indexes, states, version=self._version)
+
+    def _decode_block_data_vectorized(self, block_list, decompressed_data):
+        """
+        Decode block data of the whole segment at once, only non-empty blocks are passed on to the block list.
+
+        @type block_list: BlockList
+        @param decompressed_data: 3 byte for each block of the segment
+        @type decompressed_data: bytes
+        """
+        states = SMBinaryStream.unpack_int24_array(decompressed_data, by_byte=self._version >= 3)
+        block_indexes = np.flatnonzero(states)
+        position_indexes = self.get_position_indexes_by_block_indexes(block_indexes)
+        block_list.set_states(position_indexes, states[block_indexes], version=self._version)
 
     def read(self, block_list, input_stream):
         """
@@ -97,10 +151,105 @@ class SmdSegment(DefaultLogging):
         else:
             self._read_block_data(block_list, input_stream)
 
+    def read_buffer(self, block_list, buffer, offset):
+        """
+        Read segment data from a buffer, like a memory mapped region file.
+        The compressed block data is not copied before decompression.
+
+        @type block_list: BlockList
+        @param buffer: input buffer
+        @type buffer: mmap.mmap | bytes
+        @param offset: position of the segment within the buffer
+        @type offset: int
+        """
+        header_size = self._header_struct.size
+        self._version, self.timestamp, x, y, z, self.has_valid_data, self.compressed_size = \
+            self._header_struct.unpack_from(buffer, offset)
+        assert self._version in self._valid_versions, "Unsupported SmdSegment version: {}".format(self._version)
+        self.position = (x, y, z)
+        if not self.has_valid_data:
+            return
+        start = offset + header_size
+        end = start + self.compressed_size
+        assert end <= len(buffer), "Segment data exceeds region file"
+        if sys.version_info < (3,):
+            self._decode(block_list, zlib.decompress(buffer[start:end]))
+            return
+        view = memoryview(buffer)
+        try:
+            decompressed_data = zlib.decompress(view[start:end])
+        finally:
+            view.release()
+        self._decode(block_list, decompressed_data)
+
+    def read_compressed(self, input_stream):
+        """
+        Read segment header and compressed block data from a byte stream, without decompressing it.
+        The segment is written again as it is, as long as no block is added.
+
+        @param input_stream: input byte stream
+        @type input_stream: SMBinaryStream
+        """
+        assert isinstance(input_stream, SMBinaryStream)
+        self._read_header(input_stream)
+        self.block_index_to_block = {}
+        if not self.has_valid_data:
+            self._compressed_data = None
+            return
+        self._compressed_data = input_stream.read(self.compressed_size)
+
+    def is_up_to_date(self):
+        """
+        Returns true if the segment is of the most recent version, so its compressed block data can be kept as it is.
+
+        @rtype: bool
+        """
+        return self._version == max(self._valid_versions)
+
     # #######################################
     # ###  Write
     # #######################################
 
+    def _encode_block_data(self):
+        """
+        Turn blocks into uncompressed segment block data, 3 byte for each position of the segment.
+        Empty positions are zero.
+
+        @rtype: bytes
+        """
+        number_of_blocks = len(self.block_index_to_block)
+        if self.vectorized:
+            block_indexes = np.fromiter(self.block_index_to_block.keys(), dtype=np.int64, count=number_of_blocks)
+            states = np.fromiter(
+                (block.get_int_24() for block in self.block_index_to_block.values()),
+                dtype=np.int32, count=number_of_blocks)
+            data = np.zeros((self._blocks_in_a_cube, 3), dtype=np.uint8)
+            data[block_indexes] = SMBinaryStream.pack_int24_array(states, by_byte=self._version >= 3)
+            return data.tobytes()
+        byte_string = bytearray(self._blocks_in_a_cube * 3)
+        for block_index, block in self.block_index_to_block.items():
+            position = block_index * 3
+            if self._version < 3:
+                byte_string[position:position+3] = SMBinaryStream.pack_int24(block.get_int_24())
+            else:
+                byte_string[position:position+3] = SMBinaryStream.pack_int24b(block.get_int_24())
+        return bytes(byte_string)
+
+    def compress(self):
+        """
+        Encode and compress block data ahead of writing the segment.
+        Can be run for several segments at the same time in threads, since zlib releases the GIL.
+        Block data that is already compressed is kept.
+        """
+        if self._compressed_data is not None:
+            return
+        self._version = max(self._valid_versions)
+        if not self.has_valid_data:
+            self._compressed_data = b""
+        else:
+            self._compressed_data = zlib.compress(self._encode_block_data())
+        self.compressed_size = len(self._compressed_data)
+
     def _write_block_data(self, output_stream):
         """
         Write segment block data to a byte stream.
@@ -109,25 +258,9 @@ class SmdSegment(DefaultLogging):
         @param output_stream: input byte stream
         @type output_stream: SMBinaryStream
         """
-        if not self.has_valid_data:
-            self.compressed_size = 0
-            output_stream.write_int32_unassigned(self.compressed_size)   # 4 byte
-        else:
-            byte_string = b""
-            set_of_valid_block_index = set(self.block_index_to_block.keys())
-            for block_index in range(0, self._blocks_in_a_cube):
-                if block_index in set_of_valid_block_index:
-                    block_int_24 = self.block_index_to_block[block_index].get_int_24()
-                    if self._version < 3:
-                        byte_string += SMBinaryStream.pack_int24(block_int_24)
-                    else:
-                        byte_string += SMBinaryStream.pack_int24b(block_int_24)
-                    continue
-                byte_string += b"\0" * 3
-            compressed_data = zlib.compress(byte_string)
-            self.compressed_size = len(compressed_data)
-            output_stream.write_int32_unassigned(self.compressed_size)   # 4 byte
-            output_stream.write(compressed_data)
+        output_stream.write_int32_unassigned(self.compressed_size)   # 4 byte
+        output_stream.write(self._compressed_data)
+        self._compressed_data = None
 
         output_stream.seek(49125-self.compressed_size, 1)
         output_stream.write(b"\0")  # this should fill the skipped positions with \0
@@ -151,12 +284,13 @@ class SmdSegment(DefaultLogging):
         """
         Write segment as binary data to any kind of stream.
         Always total size 49152 byte
+        Block data is compressed now, unless 'compress' was called before or it was read compressed.
 
         @param output_stream: Output byte stream
         @type output_stream: SMBinaryStream
         """
         assert isinstance(output_stream, SMBinaryStream)
-        self._version = max(self._valid_versions)
+        self.compress()
         self._write_header(output_stream)
         self._write_block_data(output_stream)
 
@@ -182,6 +316,24 @@ class SmdSegment(DefaultLogging):
         x = rest % self._blocks_in_a_line
         return x+self.position[0], y+self.position[1], z+self.position[2]
 
+    def get_position_indexes_by_block_indexes(self, block_indexes):
+        """
+        Get global position indexes based on an array of local indexes
+
+        @attention: requires numpy
+
+        @param block_indexes: indexes of blocks of this segment 0:32767
+        @type block_indexes: numpy.ndarray
+
+        @return: position indexes, as returned by Vector.get_index
+        @rtype: numpy.ndarray
+        """
+        block_indexes = block_indexes.astype(np.int64)
+        z = block_indexes // self._blocks_in_an_area + self.position[2]
+        y = (block_indexes % self._blocks_in_an_area) // self._blocks_in_a_line + self.position[1]
+        x = block_indexes % self._blocks_in_a_line + self.position[0]
+        return (x & 0xFFFF) | ((y & 0xFFFF) << 16) | ((z & 0xFFFF) << 32)
+
     def get_block_index_by_block_position(self, position):
         """
         Get block index of position in this segment
@@ -231,6 +383,7 @@ class SmdSegment(DefaultLogging):
             return
         self.block_index_to_block[block_index] = block
         self.has_valid_data = True
+        self._compressed_data = None
 
     def to_stream(self, output_stream=sys.stdout):
         """
@@ -16,9 +16,14 @@ from .style.style6 import Style6
 class BlockPool(object):
     """
     @type _state_to_instance: WeakValueDictionary[int, Block]
+    @type _key_to_instance: WeakValueDictionary[int, Block]
+    @type hits: int
+    @type misses: int
     """
 
     _state_to_instance = WeakValueDictionary()
+    # state and version as read, before conversion to the latest version
+    _key_to_instance = WeakValueDictionary()
 
     _valid_versions = {0, 1, 2, 3}
 
@@ -26,6 +31,8 @@ class BlockPool(object):
         self._basic = StyleBasic(0, 0)
         self._styles = [Style0, Style1Wedge, Style2Corner, Style3, Style4Tetra, Style5Hepta, Style6]
         self._max_version = max(BlockPool._valid_versions)
+        self.hits = 0
+        self.misses = 0
 
     def __call__(self, state, version=None):
         """
@@ -36,22 +43,36 @@ class BlockPool(object):
 
         @rtype: Block | None
         """
-        max_version = self.get_max_version()
         if version is None:
-            version = max_version
+            version = self._max_version
+        key = state | (version << 24)
+        instance_pool = BlockPool._key_to_instance.get(key)
+        if instance_pool is not None:
+            self.hits += 1
+            return instance_pool
+        # empty cells are never pooled, each lookup of one is a miss
+        self.misses += 1
         block = self.get_block(state, version)
         if block is None:
             return None
-        if version < max_version:
-            block.convert(max_version)
+        if version < self._max_version:
+            block.convert(self._max_version)
             state = block.get_int_24()
         # check if this block state already exist
-        instance_pool = self._state_to_instance.get(state)
+        instance_pool = BlockPool._state_to_instance.get(state)
         if not instance_pool:
             instance_pool = block
-            self._state_to_instance[state] = instance_pool
+            BlockPool._state_to_instance[state] = instance_pool
+        BlockPool._key_to_instance[key] = instance_pool
         return instance_pool
 
+    def reset_counters(self):
+        """
+        Reset number of cache hits and misses
+        """
+        self.hits = 0
+        self.misses = 0
+
     # Methods, called on instance objects:
     def __iter__(self):
         """
@@ -112,6 +133,7 @@ class BlockPool(object):
         """
         state_pool = BlockPool._state_to_instance
         BlockPool._state_to_instance = dict()
+        BlockPool._key_to_instance = WeakValueDictionary()
         for state, block in state_pool.popitem():
             yield state, block
 
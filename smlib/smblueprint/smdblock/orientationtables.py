@@ -0,0 +1,175 @@
+__author__ = 'Peter Hofmann'
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ...utils.blockconfig import block_config
+from ...utils.vector import Vector
+from .style.style0 import Style0
+from .style.style1wedge import Style1Wedge
+from .style.style2corner import Style2Corner
+from .style.style3 import Style3
+from .style.style4tetra import Style4Tetra
+from .style.style5hepta import Style5Hepta
+from .style.style6 import Style6
+
+
+class OrientationTables(object):
+    """
+    State to state tables, mirroring or turning the orientation of blocks of every id.
+    A table is indexed by the id and orientation bits of a state, hit points and active bit are kept as they are.
+    Tables are built on first use after a block config was loaded.
+
+    @type _mirror_tables: list[array]
+    @type _turn_tables: list[array]
+    """
+
+    # direction each side is facing
+    _side_to_vector = {
+        "Front": (0, 0, 1),
+        "Back": (0, 0, -1),
+        "Top": (0, 1, 0),
+        "Bottom": (0, -1, 0),
+        "Left": (1, 0, 0),
+        "Right": (-1, 0, 0),
+    }
+
+    _styles = [Style0, Style1Wedge, Style2Corner, Style3, Style4Tetra, Style5Hepta, Style6]
+
+    # bits of a state that are not changed: hit points and active bit
+    _kept_bits = 0x07F800
+
+    def __init__(self):
+        self._generation = None
+        self._mirror_tables = []
+        self._turn_tables = []
+
+    # #######################################
+    # ###  Tables
+    # #######################################
+
+    def get_mirror_table(self, axis_index):
+        """
+        @param axis_index: 0: x left to right, 1: y top to bottom, 2: z front to back
+        @type axis_index: int
+
+        @rtype: array
+        """
+        self._build()
+        return self._mirror_tables[axis_index]
+
+    def get_turn_table(self, tilt_index):
+        """
+        @param tilt_index: integer representing a specific turn, see Vector.tilt_turn_position
+        @type tilt_index: int
+
+        @rtype: array
+        """
+        self._build()
+        return self._turn_tables[tilt_index]
+
+    @staticmethod
+    def get_table_index(state):
+        """
+        Index of the id and orientation of a state within a table
+
+        @type state: int
+
+        @rtype: int
+        """
+        return (state & 0x7FF) | ((state >> 19) << 11)
+
+    def transform(self, table, state):
+        """
+        @type table: array
+        @type state: int
+
+        @rtype: int
+        """
+        return (state & self._kept_bits) | table[(state & 0x7FF) | ((state >> 19) << 11)]
+
+    def transform_states(self, table, states):
+        """
+        Transform many states at once
+
+        @attention: requires numpy
+
+        @type table: array
+        @type states: numpy.ndarray
+
+        @rtype: numpy.ndarray
+        """
+        states = np.asarray(states, dtype=np.uint32)
+        table = np.frombuffer(table, dtype=np.uint32)
+        return (states & self._kept_bits) | table[(states & 0x7FF) | ((states >> 19) << 11)]
+
+    def mirror_state(self, state, axis_index):
+        """
+        @type state: int
+        @type axis_index: int
+
+        @rtype: int
+        """
+        return self.transform(self.get_mirror_table(axis_index), state)
+
+    def turn_state(self, state, tilt_index):
+        """
+        @type state: int
+        @type tilt_index: int
+
+        @rtype: int
+        """
+        return self.transform(self.get_turn_table(tilt_index), state)
+
+    # #######################################
+    # ###  Build
+    # #######################################
+
+    def _get_side_to_side(self, transform_vector):
+        """
+        @param transform_vector: turning or mirroring a direction
+        @type transform_vector: (int, int, int) -> (int, int, int)
+
+        @rtype: dict[str, str]
+        """
+        vector_to_side = {vector: side for side, vector in self._side_to_vector.items()}
+        return {side: vector_to_side[tuple(transform_vector(vector))] for side, vector in self._side_to_vector.items()}
+
+    def _build(self):
+        """
+        Build all tables, unless they are up to date with the block config
+        """
+        if self._generation == block_config.generation:
+            return
+        side_to_sides = []
+        for axis_index in range(3):
+            side_to_sides.append(self._get_side_to_side(
+                lambda vector, axis_index=axis_index: Vector.mirror_position(vector, axis_index, (0, 0, 0))))
+        for tilt_index in range(6):
+            side_to_sides.append(self._get_side_to_side(
+                lambda vector, tilt_index=tilt_index: Vector.subtraction(
+                    Vector.tilt_turn_position(vector, tilt_index), Vector.tilt_turn_position((0, 0, 0), tilt_index))))
+        # orientation bits to orientation bits, for each transformation and block style
+        style_tables = [[] for _ in side_to_sides]
+        for style in self._styles:
+            blocks = [style(orientation << 19, 3) for orientation in range(32)]
+            for side_to_side, tables in zip(side_to_sides, style_tables):
+                tables.append([block.get_transformed(side_to_side) >> 19 for block in blocks])
+        tables = []
+        for transformation_tables in style_tables:
+            table = array('I', [(index & 0x7FF) | ((index >> 11) << 19) for index in range(0x10000)])
+            for block_id in block_config:
+                orientations = transformation_tables[block_config[block_id].block_style]
+                for orientation in range(32):
+                    table[block_id | (orientation << 11)] = block_id | (orientations[orientation] << 19)
+            tables.append(table)
+        self._mirror_tables = tables[:3]
+        self._turn_tables = tables[3:]
+        self._generation = block_config.generation
+
+
+orientation_tables = OrientationTables()
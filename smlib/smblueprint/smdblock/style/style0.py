@@ -108,6 +108,27 @@ class Style0(StyleBasic):
         int_24 = self._int_24
         return self.modify_orientation(int_24, block_side_id=side_id)
 
+    # #######################################
+    # ###  Transform
+    # #######################################
+
+    def get_transformed(self, side_to_side):
+        """
+        Orientation after each side was moved to another side, like by a mirror or a turn
+
+        @type side_to_side: dict[str, str]
+
+        @rtype: int
+        """
+        side_id = self.get_block_side_id()
+        if side_id not in self._orientation_to_str:
+            return self._int_24
+        side = side_to_side[self._orientation_to_str[side_id].strip().title()]
+        for side_id_new, side_str in self._orientation_to_str.items():
+            if side_str.strip().title() == side:
+                return self.modify_orientation(self._int_24, block_side_id=side_id_new)
+        return self._int_24
+
     # #######################################
     # ###  Turning type 0
     # #######################################
@@ -91,3 +91,19 @@ class Style1Wedge(StyleBasic):
             else:
                 rotations -= 1
         return self.modify_orientation(self._int_24, rotations=rotations)
+
+    # #######################################
+    # ###  Transform
+    # #######################################
+
+    def get_transformed(self, side_to_side):
+        """
+        Orientation after each side was moved to another side, like by a mirror or a turn
+
+        @type side_to_side: dict[str, str]
+
+        @rtype: int
+        """
+        orientation_to_sides = {
+            orientation: tuple(sides.split(", ")) for orientation, sides in self._orientation_to_str.items()}
+        return self._get_transformed_orientation(orientation_to_sides, side_to_side)
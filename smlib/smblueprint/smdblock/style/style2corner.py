@@ -142,3 +142,28 @@ class Style2Corner(StyleBasic):
         axis_rotation, rotations = self._tuple_str_to_orientation[tuple_str]
         return self.modify_orientation(
             self._int_24, rotations=rotations, axis_rotation=axis_rotation)
+
+    # #######################################
+    # ###  Transform
+    # #######################################
+
+    def get_transformed(self, side_to_side):
+        """
+        Orientation after each side was moved to another side, like by a mirror or a turn
+
+        @type side_to_side: dict[str, str]
+
+        @rtype: int
+        """
+        return self._get_transformed_orientation(self._orientation_to_tuple_str, side_to_side)
+
+    @staticmethod
+    def _get_sides_key(sides):
+        """
+        Square side, and sloped sides in any order
+
+        @type sides: tuple[str]
+
+        @rtype: object
+        """
+        return sides[0], frozenset(sides[1:])
@@ -93,3 +93,17 @@ class Style4Tetra(StyleBasic):
         bit_22, rotations = self._tuple_str_to_orientation[tuple_str]
         return self.modify_orientation(
             self._int_24, axis_rotation=axis_rotation, rotations=rotations)
+
+    # #######################################
+    # ###  Transform
+    # #######################################
+
+    def get_transformed(self, side_to_side):
+        """
+        Orientation after each side was moved to another side, like by a mirror or a turn
+
+        @type side_to_side: dict[str, str]
+
+        @rtype: int
+        """
+        return self._get_transformed_orientation(self._orientation_to_tuple_str, side_to_side)
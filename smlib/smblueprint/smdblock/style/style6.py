@@ -97,3 +97,18 @@ class Style6(Style2Corner):
         rotations = self.get_rotations()
         tuple_str = ", ".join(self._orientation_to_tuple_str[(axis_rotation, rotations)])
         return "Faces: {}, pointing: {}".format(tuple_str[0], tuple_str[1])
+
+    # #######################################
+    # ###  Transform
+    # #######################################
+
+    @staticmethod
+    def _get_sides_key(sides):
+        """
+        Side the icon faces, and side it points towards
+
+        @type sides: tuple[str]
+
+        @rtype: object
+        """
+        return tuple(sides)
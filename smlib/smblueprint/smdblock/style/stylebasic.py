@@ -33,13 +33,25 @@ class StyleBasic(BlockBits):
         @rtype: StyleBasic
         """
         from smlib.smblueprint.smdblock.blockpool import block_pool
-        if axis_index == 0:
-            return block_pool(self._mirror_x())
-        if axis_index == 1:
-            return block_pool(self._mirror_y())
-        if axis_index == 2:
-            return block_pool(self._mirror_z())
-        raise RuntimeError("Unknown Axis index: {}".format(axis_index))
+        from smlib.smblueprint.smdblock.orientationtables import orientation_tables
+        if axis_index not in (0, 1, 2):
+            raise RuntimeError("Unknown Axis index: {}".format(axis_index))
+        return block_pool(orientation_tables.mirror_state(self._int_24, axis_index))
+
+    def get_turned(self, tilt_index):
+        """
+        Turn or tilt orientation
+
+        @param tilt_index: integer representing a specific turn, see Vector.tilt_turn_position
+        @type tilt_index: int
+
+        @rtype: StyleBasic
+        """
+        from smlib.smblueprint.smdblock.blockpool import block_pool
+        from smlib.smblueprint.smdblock.orientationtables import orientation_tables
+        if tilt_index not in range(6):
+            raise RuntimeError("Unknown tilt index: {}".format(tilt_index))
+        return block_pool(orientation_tables.turn_state(self._int_24, tilt_index))
 
     def _mirror_x(self):
         """
@@ -66,6 +78,50 @@ class StyleBasic(BlockBits):
         """
         pass
 
+    # #######################################
+    # ###  Transform
+    # #######################################
+
+    def get_transformed(self, side_to_side):
+        """
+        Orientation after each side was moved to another side, like by a mirror or a turn.
+        Blocks without orientation stay as they are.
+
+        @param side_to_side: new side of each side, like 'Front' to 'Top'
+        @type side_to_side: dict[str, str]
+
+        @rtype: int
+        """
+        return self._int_24
+
+    def _get_transformed_orientation(self, orientation_to_sides, side_to_side):
+        """
+        @param orientation_to_sides: sides describing each (axis rotation, rotations)
+        @type orientation_to_sides: dict[tuple[int], tuple[str]]
+        @type side_to_side: dict[str, str]
+
+        @rtype: int
+        """
+        orientation = (self.get_axis_rotation(), self.get_rotations())
+        if orientation not in orientation_to_sides:
+            return self._int_24
+        key = self._get_sides_key(tuple(side_to_side[side] for side in orientation_to_sides[orientation]))
+        for (axis_rotation, rotations), sides in orientation_to_sides.items():
+            if self._get_sides_key(sides) == key:
+                return self.modify_orientation(self._int_24, axis_rotation=axis_rotation, rotations=rotations)
+        return self._int_24
+
+    @staticmethod
+    def _get_sides_key(sides):
+        """
+        Sides describing an orientation, in a form that ignores their order where it does not matter
+
+        @type sides: tuple[str]
+
+        @rtype: object
+        """
+        return frozenset(sides)
+
     # #######################################
     # ###  Stream
     # #######################################
@@ -43,12 +43,13 @@ class Annotate(object):
                 self.marked.remove(position_index)
 
     def _add_neighbours_to_query(self, query, position):
-        for taxi_dist, position_tmp in self.get_neighbours(position):
+        occupancy = self._block_list.get_neighbourhood(position)
+        for taxi_dist, (x, y, z), bit in self._neighbour_offsets:
             if taxi_dist == 3:
                 continue
-            position_index_tmp = Vector.get_index(position_tmp)
+            position_index_tmp = Vector.get_index((position[0] + x, position[1] + y, position[2] + z))
             if taxi_dist == 2:
-                if self._block_list.has_block_at(position_tmp):
+                if occupancy >> bit & 1:
                     self.border.add(position_index_tmp)
                 continue
             if position_index_tmp in self.marked:
@@ -89,17 +90,16 @@ class Annotate(object):
             self.marked.add(position_index)
             self._add_neighbours_to_query(tmp, position)
 
+    # taxi distance, offset and bit within a neighbourhood, see BlockList.get_neighbourhood
+    _neighbour_offsets = [
+        (abs(x) + abs(y) + abs(z), (x, y, z), (x + 1) * 9 + (y + 1) * 3 + (z + 1))
+        for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+        if (x, y, z) != (0, 0, 0)]
+
     @staticmethod
     def get_neighbours(position):
-        range_p = [-1, 0, 1]
-        for x in range_p:
-            for y in range_p:
-                for z in range_p:
-                    taxi_dist = abs(x) + abs(y) + abs(z)
-                    position_tmp = (position[0] + x, position[1] + y, position[2] + z)
-                    if position_tmp == position:
-                        continue
-                    yield taxi_dist, position_tmp
+        for taxi_dist, (x, y, z), _ in Annotate._neighbour_offsets:
+            yield taxi_dist, (position[0] + x, position[1] + y, position[2] + z)
 
     def trace_boundary(self, start_position):
         """
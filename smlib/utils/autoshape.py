@@ -1,4 +1,5 @@
 from .blocklist import BlockList
+from .vector import Vector
 from .blockconfig import block_config
 from .periphery import PeripheryBase
 from ..smblueprint.smdblock.blockpool import block_pool
@@ -13,16 +14,34 @@ class AutoShape(object):
 
     @type _block_list: BlockList
     @type _periphery: PeripheryBase
+    @type _selection: Selection | None
     """
 
-    def __init__(self, block_list, periphery):
+    def __init__(self, block_list, periphery, selection=None):
         """
 
         @type block_list: BlockList
         @type periphery: PeripheryBase
+        @param selection: only blocks of a selection are shaped, all blocks if None
+        @type selection: Selection | None
         """
         self._block_list = block_list
         self._periphery = periphery
+        self._selection = selection
+
+    def _get_position_indexes(self, block_ids):
+        """
+        Position indexes of blocks of some ids, only those of the selection if there is one
+
+        @type block_ids: set[int]
+
+        @rtype: Iterable[int]
+        """
+        if self._selection is None:
+            return self._block_list.search_all(block_ids)
+        return [
+            position_index for position_index, block in self._block_list.blocks_in_selection(self._selection)
+            if block.get_id() in block_ids]
 
     def auto_hull_shape_independent(self, auto_wedge, auto_tetra):
         """
@@ -33,22 +52,26 @@ class AutoShape(object):
         @type auto_tetra: bool
         """
         cube_id = block_config.get_shape_id('cube')
-        for position, block in self._block_list.items():
-            block_id = block.get_id()
-            if not block_config[block_id].is_hull():
-                continue
-            if block_config[block_id].shape != cube_id:
-                continue
+        block_ids = set(
+            block_id for block_id in self._block_list.get_block_ids()
+            if block_config[block_id].is_hull() and block_config[block_id].shape == cube_id)
+        # shapes only depend on which positions are occupied, so blocks are replaced after all are looked at
+        position_indexes = []
+        blocks = []
+        for position_index in self._get_position_indexes(block_ids):
             orientation_simple = self._periphery.get_orientation_simple(
-                position, shape_wedge=auto_wedge, shape_tetra=auto_tetra)
+                Vector.get_position(position_index), shape_wedge=auto_wedge, shape_tetra=auto_tetra)
             if orientation_simple is None:
                 continue
             new_shape_id, [axis_rotation, rotations] = orientation_simple
+            block_id = self._block_list[position_index].get_id()
             block_hull_tier, color_id, shape_id = block_config[block_id].get_details()
             new_block_id = block_config.get_block_id_by_details(block_hull_tier, color_id, new_shape_id)
             new_block = block_pool(new_block_id).get_modified_block(
                 block_id=new_block_id, axis_rotation=axis_rotation, rotations=rotations)
-            self._block_list[position] = new_block
+            position_indexes.append(position_index)
+            blocks.append(new_block)
+        self._block_list.set_many(position_indexes, blocks)
 
     def auto_hull_shape_dependent(self, block_shape_id):
         """
@@ -58,7 +81,13 @@ class AutoShape(object):
         @type block_shape_id: int
         """
         cube_id = block_config.get_shape_id('cube')
-        for position, block in self._block_list.items():
+        if self._selection is None:
+            blocks = self._block_list.items()
+        else:
+            blocks = [
+                (Vector.get_position(position_index), block)
+                for position_index, block in self._block_list.blocks_in_selection(self._selection)]
+        for position, block in blocks:
             block_id = block.get_id()
             if not block_config[block_id].is_hull():
                 continue
@@ -113,11 +113,14 @@ class SuperBlockConfig(object):
 
     @type _id_to_block: dict[int, BlockInfo]
     @type _label_to_block: dict[str, BlockInfo]
+    @type generation: int
     """
 
     def __init__(self):
         self._id_to_block = dict()
         self._label_to_block = dict()
+        # number of times a config was loaded, anything derived from a config is rebuilt once it changes
+        self.generation = 0
 
     def __getattr__(self, block_id):
         """
@@ -238,6 +241,7 @@ class BlockConfig(SuperBlockConfig, ):
                     self._id_to_block[block_id].tier = index
                     self._id_to_block[block_id].hit_points = BlockConfigHardcoded.get_hp_by_hull_type(index)
                     break
+        self.generation += 1
 
     def read(self, directory_starmade):
         """
@@ -332,5 +336,6 @@ class BlockConfig(SuperBlockConfig, ):
                 if tier in name_lower_case:
                     self._label_to_block[label].tier = index
                     break
+        self.generation += 1
 
 block_config = BlockConfig()
@@ -1,16 +1,49 @@
+import weakref
+from array import array
 from collections import Iterable
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from .vector import Vector
-from ..smblueprint.smdblock.blockpool import StyleBasic
+from ..smblueprint.smdblock.blockpool import block_pool, StyleBasic
 
 
 class BlockList(object):
     """
     @type _position_index_to_instance: dict[int, StyleBasic]
+    @type _segment_index_to_block_id_to_quantity: dict[int, dict[int, int]]
+    @type _block_id_to_position_indexes: dict[int, set[int]] | None
+    @type _block_id_to_quantity: dict[int, int]
+    @type _axis_value_to_quantity: list[dict[int, int]]
+    @type _snapshots: list[weakref.ref]
+    @type _segments_saved: set[int]
+    @type _segment_index_to_occupancy: dict[int, array] | None
     """
 
+    # position index bits of the lowest position of a segment of 32 x 32 x 32 blocks
+    _segment_mask = 0xFFE0FFE0FFE0
+    # position index offsets of all positions within a segment
+    _segment_offsets = None
+    # bit within a neighbourhood and occupancy row offset, of each (x, y) row of a 3x3x3 neighbourhood
+    _neighbourhood_row_offsets = list(zip(range(0, 27, 3), (-33, -1, 31, -32, 0, 32, -31, 1, 33)))
+
     def __init__(self):
         self._position_index_to_instance = dict()
+        # number of blocks of each id within a segment, to skip segments when searching
+        self._segment_index_to_block_id_to_quantity = dict()
+        # optional, position indexes of blocks of each id
+        self._block_id_to_position_indexes = None
+        # number of blocks of each id, and of each coordinate value of each axis, for quantities and box
+        self._block_id_to_quantity = dict()
+        self._axis_value_to_quantity = [dict(), dict(), dict()]
+        # snapshots that keep segments before they are modified, and segments already kept by all of them
+        self._snapshots = []
+        self._segments_saved = set()
+        # built on first spatial query, occupancy of each segment as z bit masks of its 32 x 32 (x, y) rows
+        self._segment_index_to_occupancy = None
 
     # Methods, called on class objects:
     def __iter__(self):
@@ -37,10 +70,84 @@ class BlockList(object):
         if isinstance(position, int):
             position_index = position
         else:
+            assert Vector.is_in_range(position), "Position out of range: {}".format(position)
             position_index = Vector.get_index(position)
         assert isinstance(block, StyleBasic), block
+        if self._snapshots:
+            self._save_segments([position_index & self._segment_mask])
+        block_previous = self._position_index_to_instance.get(position_index)
+        if block_previous is not None:
+            self._count(position_index, block_previous.get_id(), -1)
+            if self._block_id_to_position_indexes is not None:
+                self._block_id_to_position_indexes[block_previous.get_id()].discard(position_index)
+        else:
+            self._count_position(position_index, 1)
+        self._count(position_index, block.get_id(), 1)
+        if self._block_id_to_position_indexes is not None:
+            self._block_id_to_position_indexes.setdefault(block.get_id(), set()).add(position_index)
         self._position_index_to_instance[position_index] = block
 
+    def set_states(self, position_indexes, states, version=None):
+        """
+        Set blocks by their integer state.
+        States that do not resolve to a block, like those of id 0, are skipped.
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: Iterable[int] | numpy.ndarray
+        @param states: int_24 states, one for each position index
+        @type states: Iterable[int] | numpy.ndarray
+        @param version: version of smd segment the states are from
+        @type version: int | None
+        """
+        counted = False
+        if self._snapshots:
+            if not hasattr(position_indexes, "tolist"):
+                position_indexes = list(position_indexes)
+            self._save_segments(set(position_index & self._segment_mask for position_index in position_indexes))
+        if hasattr(position_indexes, "tolist"):
+            self._count_states(position_indexes, states)
+            counted = True
+            # numpy arrays, keys must be python integer
+            position_indexes = position_indexes.tolist()
+            states = states.tolist()
+        state_to_block = {}
+        blocks_replaced = []
+        segment_index = None
+        block_id_to_quantity = None
+        block_id_to_position_indexes = self._block_id_to_position_indexes
+        block_id_to_quantity_total = self._block_id_to_quantity
+        position_indexes_added = []
+        for position_index, state in zip(position_indexes, states):
+            if state not in state_to_block:
+                state_to_block[state] = block_pool(state, version=version)
+            block = state_to_block[state]
+            if block is None:
+                continue
+            if position_index in self._position_index_to_instance:
+                blocks_replaced.append((position_index, self._position_index_to_instance[position_index]))
+                if block_id_to_position_indexes is not None:
+                    block_id_to_position_indexes[blocks_replaced[-1][1].get_id()].discard(position_index)
+            elif not counted:
+                if position_index & self._segment_mask != segment_index:
+                    # states are mostly grouped by segment
+                    segment_index = position_index & self._segment_mask
+                    block_id_to_quantity = self._segment_index_to_block_id_to_quantity.setdefault(segment_index, {})
+                block_id = block.get_id()
+                block_id_to_quantity[block_id] = block_id_to_quantity.get(block_id, 0) + 1
+                block_id_to_quantity_total[block_id] = block_id_to_quantity_total.get(block_id, 0) + 1
+                self._count_position(position_index, 1)
+            else:
+                position_indexes_added.append(position_index)
+            if block_id_to_position_indexes is not None:
+                block_id_to_position_indexes.setdefault(block.get_id(), set()).add(position_index)
+            self._position_index_to_instance[position_index] = block
+        for position_index, block in blocks_replaced:
+            self._count(position_index, block.get_id(), -1)
+            if not counted:
+                self._count(position_index, self._position_index_to_instance[position_index].get_id(), 1)
+        if counted and len(position_indexes_added) > 0:
+            self._count_positions(np.array(position_indexes_added, dtype=np.int64), 1)
+
     def __getitem__(self, position):
         """
         Get a block at a specific position
@@ -70,8 +177,11 @@ class BlockList(object):
         """
         @rtype: Iterable[(int, int, int), StyleBasic]
         """
+        if self._snapshots:
+            self._save_segments(list(self._segment_index_to_block_id_to_quantity))
         blocks = self._position_index_to_instance
         self._position_index_to_instance = dict()
+        self._reset_counts()
         while len(blocks) > 0:
             position_index, block = blocks.popitem()
             yield Vector.get_position(position_index), block
@@ -80,8 +190,11 @@ class BlockList(object):
         """
         @rtype: Iterable[int, StyleBasic]
         """
+        if self._snapshots:
+            self._save_segments(list(self._segment_index_to_block_id_to_quantity))
         blocks = self._position_index_to_instance
         self._position_index_to_instance = dict()
+        self._reset_counts()
         while len(blocks) > 0:
             position_index, block = blocks.popitem()
             yield position_index, block
@@ -97,7 +210,24 @@ class BlockList(object):
         """
         assert isinstance(position, tuple)
         assert self.has_block_at(position), "No block at position: {}".format(position)
-        return self._position_index_to_instance.pop(Vector.get_index(position))
+        return self._pop_index(Vector.get_index(position))
+
+    def _pop_index(self, position_index):
+        """
+        Remove Block at specific position index.
+
+        @type position_index: int
+
+        @rtype: StyleBasic
+        """
+        if self._snapshots:
+            self._save_segments([position_index & self._segment_mask])
+        block = self._position_index_to_instance.pop(position_index)
+        self._count(position_index, block.get_id(), -1)
+        self._count_position(position_index, -1)
+        if self._block_id_to_position_indexes is not None:
+            self._block_id_to_position_indexes[block.get_id()].discard(position_index)
+        return block
 
     def keys(self):
         """
@@ -106,6 +236,25 @@ class BlockList(object):
         for position_index in self._position_index_to_instance:
             yield position_index
 
+    def iter_states(self, block_ids=None):
+        """
+        Position indexes and int_24 states of blocks, for bulk operations that need no block instances
+
+        @param block_ids: only blocks of these ids
+        @type block_ids: set[int] | None
+
+        @rtype: Iterable[(int, int)]
+        """
+        if block_ids is None:
+            for position_index, block in self._position_index_to_instance.items():
+                yield position_index, block.get_int_24()
+            return
+        block_ids = set(block_ids)
+        for position_index in self._iter_position_indexes_of(block_ids):
+            block = self._position_index_to_instance[position_index]
+            if block.get_id() in block_ids:
+                yield position_index, block.get_int_24()
+
     # #######################################
     # ###  Get
     # #######################################
@@ -127,6 +276,54 @@ class BlockList(object):
             return True
         return False
 
+    def get_block_ids(self):
+        """
+        Ids of all blocks, without looking at each block
+
+        @rtype: set[int]
+        """
+        return set(self._block_id_to_quantity)
+
+    def get_block_id_to_quantity(self):
+        """
+        Quantity of each block id, kept up to date while blocks are added and removed
+
+        @rtype: dict[int, int]
+        """
+        return dict(self._block_id_to_quantity)
+
+    def get_min_max_vector(self, position_core=(16, 16, 16)):
+        """
+        Get the minimum and maximum coordinates of blocks, from the number of blocks with each coordinate value
+
+        @param position_core: the box always includes the core position
+        @type position_core: (int, int, int)
+
+        @return: Minimum(x,y,z), Maximum(x,y,z)
+        @rtype: tuple[int,int,int], tuple[int,int,int]
+        """
+        min_vector = list(position_core)
+        max_vector = list(position_core)
+        for axis, value_to_quantity in enumerate(self._axis_value_to_quantity):
+            if len(value_to_quantity) == 0:
+                continue
+            values = [(value ^ 0x8000) - 0x8000 for value in value_to_quantity]
+            min_vector[axis] = min(min_vector[axis], min(values))
+            max_vector[axis] = max(max_vector[axis], max(values))
+        return tuple(min_vector), tuple(max_vector)
+
+    def index_block_ids(self):
+        """
+        Keep position indexes of each block id from now on,
+        searches and removals by id then cost time proportional to the number of matching blocks.
+        Costs a set entry per block.
+        """
+        if self._block_id_to_position_indexes is not None:
+            return
+        self._block_id_to_position_indexes = dict()
+        for position_index, block in self._position_index_to_instance.items():
+            self._block_id_to_position_indexes.setdefault(block.get_id(), set()).add(position_index)
+
     def remove_blocks(self, block_ids):
         """
         Removing all blocks of a specific id
@@ -136,7 +333,7 @@ class BlockList(object):
         """
         del_position_indexes = self.search_all(block_ids)   # should be smaller than making a list of '.keys()'
         for position_index in del_position_indexes:
-            self._position_index_to_instance.pop(position_index)
+            self._pop_index(position_index)
 
     def search_all(self, block_ids):
         """
@@ -148,8 +345,13 @@ class BlockList(object):
         @return: set of (x,y,z)
         @rtype: set[int]
         """
+        if self._block_id_to_position_indexes is not None:
+            position_indexes = set()
+            for block_id in block_ids:
+                position_indexes.update(self._block_id_to_position_indexes.get(block_id, ()))
+            return position_indexes
         position_indexes = set()
-        for position_index in self._position_index_to_instance:
+        for position_index in self._iter_position_indexes_of(block_ids):
             if self[position_index].get_id() not in block_ids:
                 continue
             position_indexes.add(position_index)
@@ -165,12 +367,7 @@ class BlockList(object):
         @return: set of (x,y,z)
         @rtype: set[int]
         """
-        position_indexes = set()
-        for position_index in self._position_index_to_instance:
-            if self[position_index].get_id() not in block_ids:
-                continue
-            position_indexes.add(position_index)
-        return position_indexes
+        return self.search_all(block_ids)
 
     def search(self, block_id):
         """
@@ -183,18 +380,732 @@ class BlockList(object):
         @return: None or (x,y,z)
         @rtype: None | tuple[int]
         """
-        for position_index in self._position_index_to_instance:
+        for position_index in self._iter_position_indexes_of({block_id}):
             if self[position_index].get_id() == block_id:
                 return Vector.get_position(position_index)
         return None
 
+    def _assert_move_in_range(self, vector_direction):
+        """
+        Positions are shifted without checking each of them, so the moved box is checked once instead
+
+        @type vector_direction: (int, int, int)
+        """
+        min_vector, max_vector = self.get_min_max_vector()
+        min_vector = Vector.addition(min_vector, vector_direction)
+        max_vector = Vector.addition(max_vector, vector_direction)
+        assert Vector.is_in_range(min_vector) and Vector.is_in_range(max_vector), \
+            "Blocks moved out of range: {} {}".format(min_vector, max_vector)
+
     def move_positions(self, vector_direction):
         """
         Move all positions in a direction
 
         @type vector_direction: (int, int, int)
         """
+        self._assert_move_in_range(vector_direction)
+        position_indexes = []
+        blocks = []
         for position_index, block in self.pop_position_indexes():
-            new_position_index = Vector.shift_position_index(
-                position_index, vector_direction)
-            self._position_index_to_instance[new_position_index] = block
+            position_indexes.append(position_index)
+            blocks.append(block)
+        index_offset = Vector.get_index(vector_direction)
+        if np is not None:
+            position_indexes = Vector.shift_position_indexes(np.array(position_indexes, dtype=np.int64), index_offset)
+        else:
+            position_indexes = [
+                Vector.shift_position_indexes(position_index, index_offset) for position_index in position_indexes]
+        self.set_many(position_indexes, blocks)
+
+    # #######################################
+    # ###  Bulk
+    # #######################################
+
+    def set_many(self, position_indexes, blocks):
+        """
+        Set blocks at many positions in one call
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: Iterable[int] | numpy.ndarray
+        @param blocks: a block for each position index
+        @type blocks: Iterable[StyleBasic]
+        """
+        if hasattr(position_indexes, "tolist"):
+            position_indexes = position_indexes.tolist()
+        if self._snapshots:
+            position_indexes = list(position_indexes)
+            self._save_segments(set(position_index & self._segment_mask for position_index in position_indexes))
+        instances = self._position_index_to_instance
+        block_id_to_position_indexes = self._block_id_to_position_indexes
+        block_to_id = {}
+        # (segment index, block id) to change of quantity
+        key_to_quantity = {}
+        for position_index, block in zip(position_indexes, blocks):
+            block_previous = instances.get(position_index)
+            if block_previous is not None:
+                if block_previous not in block_to_id:
+                    block_to_id[block_previous] = block_previous.get_id()
+                key = (position_index & self._segment_mask, block_to_id[block_previous])
+                key_to_quantity[key] = key_to_quantity.get(key, 0) - 1
+                if block_id_to_position_indexes is not None:
+                    block_id_to_position_indexes[key[1]].discard(position_index)
+            else:
+                self._count_position(position_index, 1)
+            if block not in block_to_id:
+                assert isinstance(block, StyleBasic), block
+                block_to_id[block] = block.get_id()
+            key = (position_index & self._segment_mask, block_to_id[block])
+            key_to_quantity[key] = key_to_quantity.get(key, 0) + 1
+            if block_id_to_position_indexes is not None:
+                block_id_to_position_indexes.setdefault(key[1], set()).add(position_index)
+            instances[position_index] = block
+        for (segment_index, block_id), quantity in key_to_quantity.items():
+            if quantity != 0:
+                self._count(segment_index, block_id, quantity)
+
+    def pop_many(self, position_indexes):
+        """
+        Remove blocks at many positions in one call
+
+        @param position_indexes: position indexes of existing blocks
+        @type position_indexes: Iterable[int] | numpy.ndarray
+
+        @return: removed blocks, in the order of the position indexes
+        @rtype: list[StyleBasic]
+        """
+        if hasattr(position_indexes, "tolist"):
+            position_indexes = position_indexes.tolist()
+        if self._snapshots:
+            position_indexes = list(position_indexes)
+            self._save_segments(set(position_index & self._segment_mask for position_index in position_indexes))
+        instances = self._position_index_to_instance
+        block_id_to_position_indexes = self._block_id_to_position_indexes
+        block_to_id = {}
+        key_to_quantity = {}
+        blocks = []
+        for position_index in position_indexes:
+            block = instances.pop(position_index)
+            self._count_position(position_index, -1)
+            if block not in block_to_id:
+                block_to_id[block] = block.get_id()
+            key = (position_index & self._segment_mask, block_to_id[block])
+            key_to_quantity[key] = key_to_quantity.get(key, 0) - 1
+            if block_id_to_position_indexes is not None:
+                block_id_to_position_indexes[key[1]].discard(position_index)
+            blocks.append(block)
+        for (segment_index, block_id), quantity in key_to_quantity.items():
+            self._count(segment_index, block_id, quantity)
+        return blocks
+
+    def get_distinct_states(self, block_ids=None):
+        """
+        Distinct states of blocks, for building tables passed to map_states
+
+        @param block_ids: only states of blocks of these ids
+        @type block_ids: set[int] | None
+
+        @rtype: set[int]
+        """
+        if block_ids is None:
+            blocks = set(self._position_index_to_instance.values())
+        else:
+            blocks = set(self._position_index_to_instance[position_index]
+                         for position_index in self._iter_position_indexes_of(block_ids))
+        states = set(block.get_int_24() for block in blocks)
+        if block_ids is None:
+            return states
+        return set(state for state in states if state & 0x7FF in block_ids)
+
+    def map_states(self, table):
+        """
+        Rewrite the state of every block through a lookup table.
+        States that are not in the table are kept, blocks with a new state of id 0 are removed.
+        Only segments with blocks of ids in the table are looked at.
+
+        @param table: int_24 state to new int_24 state
+        @type table: dict[int, int]
+        """
+        if len(table) == 0:
+            return
+        block_ids = set(state & 0x7FF for state in table)
+        block_to_block = {}
+        position_indexes_set = []
+        blocks_set = []
+        position_indexes_removed = []
+        for position_index in self._iter_position_indexes_of(block_ids):
+            block = self._position_index_to_instance[position_index]
+            if block not in block_to_block:
+                state = block.get_int_24()
+                block_to_block[block] = block
+                if state in table:
+                    block_to_block[block] = block_pool(table[state])
+            new_block = block_to_block[block]
+            if new_block is block:
+                continue
+            if new_block is None:
+                position_indexes_removed.append(position_index)
+                continue
+            position_indexes_set.append(position_index)
+            blocks_set.append(new_block)
+        self.pop_many(position_indexes_removed)
+        self.set_many(position_indexes_set, blocks_set)
+
+    # #######################################
+    # ###  Snapshots
+    # #######################################
+
+    def snapshot(self):
+        """
+        Take a snapshot, that can be restored later on.
+        Nothing is copied until a segment is modified, then only the blocks of that segment are kept.
+        A snapshot costs nothing once it is no longer referenced.
+
+        @rtype: BlockListSnapshot
+        """
+        snapshot = BlockListSnapshot()
+        self._snapshots.append(weakref.ref(snapshot))
+        self._segments_saved = set()
+        return snapshot
+
+    def restore(self, snapshot):
+        """
+        Return to the blocks of a snapshot, only segments modified since the snapshot was taken are touched.
+        The snapshot and other snapshots of this list stay valid, for undo and redo.
+
+        @type snapshot: BlockListSnapshot
+        """
+        snapshots = self._get_snapshots()
+        assert snapshot in snapshots, "Snapshot was not taken of this block list"
+        segment_index_to_content = snapshot.segment_index_to_content
+        # other snapshots keep the segments as they are now
+        self._save_segments(list(segment_index_to_content))
+        self._snapshots = []
+        try:
+            for segment_index, content in segment_index_to_content.items():
+                self._restore_segment(segment_index, content)
+        finally:
+            self._snapshots = [weakref.ref(other) for other in snapshots]
+        snapshot.segment_index_to_content = dict()
+        self._segments_saved = set()
+
+    def _get_snapshots(self):
+        """
+        Snapshots still referenced elsewhere
+
+        @rtype: list[BlockListSnapshot]
+        """
+        snapshots = [reference() for reference in self._snapshots]
+        snapshots = [snapshot for snapshot in snapshots if snapshot is not None]
+        if len(snapshots) < len(self._snapshots):
+            self._snapshots = [weakref.ref(snapshot) for snapshot in snapshots]
+        return snapshots
+
+    def _save_segments(self, segment_indexes):
+        """
+        Keep blocks of segments in snapshots that do not have them yet, before the segments are modified
+
+        @type segment_indexes: Iterable[int]
+        """
+        segment_indexes = set(segment_indexes).difference(self._segments_saved)
+        if len(segment_indexes) == 0:
+            return
+        snapshots = self._get_snapshots()
+        self._segments_saved.update(segment_indexes)
+        segment_indexes = set(
+            segment_index
+            for segment_index in segment_indexes
+            for snapshot in snapshots
+            if segment_index not in snapshot.segment_index_to_content)
+        if len(segment_indexes) == 0:
+            return
+        segment_index_to_content = self._get_segment_contents(segment_indexes)
+        for snapshot in snapshots:
+            for segment_index in segment_indexes:
+                if segment_index not in snapshot.segment_index_to_content:
+                    snapshot.segment_index_to_content[segment_index] = segment_index_to_content[segment_index]
+
+    def _get_segment_contents(self, segment_indexes):
+        """
+        Blocks of segments, by position index
+
+        @type segment_indexes: set[int]
+
+        @rtype: dict[int, dict[int, StyleBasic]]
+        """
+        segment_index_to_content = dict((segment_index, dict()) for segment_index in segment_indexes)
+        segment_indexes = segment_indexes.intersection(self._segment_index_to_block_id_to_quantity)
+        if len(segment_indexes) * 32768 >= len(self._position_index_to_instance):
+            for position_index, block in self._position_index_to_instance.items():
+                if position_index & self._segment_mask in segment_indexes:
+                    segment_index_to_content[position_index & self._segment_mask][position_index] = block
+            return segment_index_to_content
+        for segment_index in segment_indexes:
+            for position_index in self._iter_segment(segment_index):
+                segment_index_to_content[segment_index][position_index] = \
+                    self._position_index_to_instance[position_index]
+        return segment_index_to_content
+
+    def _restore_segment(self, segment_index, content):
+        """
+        Replace all blocks of a segment
+
+        @type segment_index: int
+        @param content: blocks of the segment, by position index
+        @type content: dict[int, StyleBasic]
+        """
+        if segment_index in self._segment_index_to_block_id_to_quantity:
+            self.pop_many(list(self._iter_segment(segment_index)))
+        self.set_many(list(content.keys()), list(content.values()))
+
+    def _iter_segment(self, segment_index):
+        """
+        Position indexes of blocks of a segment
+
+        @type segment_index: int
+
+        @rtype: Iterable[int]
+        """
+        if BlockList._segment_offsets is None:
+            BlockList._segment_offsets = [
+                x | (y << 16) | (z << 32) for z in range(32) for y in range(32) for x in range(32)]
+        for offset in BlockList._segment_offsets:
+            if segment_index | offset in self._position_index_to_instance:
+                yield segment_index | offset
+
+    # #######################################
+    # ###  Spatial index
+    # #######################################
+
+    def get_box_occupancy(self, min_vector, max_vector):
+        """
+        Which positions of a box hold a block, one bit per position.
+        The bit of position (x, y, z) is ((x - min x) * size y + (y - min y)) * size z + (z - min z).
+        Rows along the z axis are looked up as a whole, instead of position by position.
+
+        @param min_vector: lowest corner of the box, included
+        @type min_vector: (int, int, int)
+        @param max_vector: highest corner of the box, included
+        @type max_vector: (int, int, int)
+
+        @rtype: int
+        """
+        segment_index_to_occupancy = self._get_occupancy()
+        min_z, max_z = min_vector[2], max_vector[2]
+        size_z = max_z - min_z + 1
+        occupancy = 0
+        shift = 0
+        for x in range(min_vector[0], max_vector[0] + 1):
+            for y in range(min_vector[1], max_vector[1] + 1):
+                z = min_z
+                while z <= max_z:
+                    # rest of the row within the segment
+                    z_end = min(max_z, z | 0x1F)
+                    position_index = (x & 0xFFFF) | ((y & 0xFFFF) << 16) | ((z & 0xFFFF) << 32)
+                    rows = segment_index_to_occupancy.get(position_index & self._segment_mask)
+                    if rows is not None:
+                        row = rows[(position_index & 0x1F) | ((position_index >> 11) & 0x3E0)]
+                        occupancy |= ((row >> (z & 0x1F)) & ((1 << (z_end - z + 1)) - 1)) << (shift + z - min_z)
+                    z = z_end + 1
+                shift += size_z
+        return occupancy
+
+    def get_neighbourhood(self, position):
+        """
+        Which positions of the 3x3x3 cube around a position hold a block, one bit per position.
+        The bit of offset (x, y, z) is (x + 1) * 9 + (y + 1) * 3 + (z + 1), the position itself is bit 13.
+
+        @type position: (int, int, int) | int
+
+        @rtype: int
+        """
+        if isinstance(position, int):
+            position = Vector.get_position(position)
+        x, y, z = position
+        if 0 < x & 0x1F < 31 and 0 < y & 0x1F < 31 and 0 < z & 0x1F < 31:
+            # all within the segment of the position
+            position_index = (x & 0xFFFF) | ((y & 0xFFFF) << 16) | ((z & 0xFFFF) << 32)
+            rows = self._get_occupancy().get(position_index & self._segment_mask)
+            if rows is None:
+                return 0
+            row_index = (x & 0x1F) | ((y & 0x1F) << 5)
+            shift = (z & 0x1F) - 1
+            occupancy = 0
+            for bit, offset in self._neighbourhood_row_offsets:
+                occupancy |= ((rows[row_index + offset] >> shift) & 7) << bit
+            return occupancy
+        return self.get_box_occupancy((x - 1, y - 1, z - 1), (x + 1, y + 1, z + 1))
+
+    def blocks_in_box(self, min_vector, max_vector):
+        """
+        Blocks within a box, only segments overlapping the box are looked at
+
+        @param min_vector: lowest corner of the box, included
+        @type min_vector: (int, int, int)
+        @param max_vector: highest corner of the box, included
+        @type max_vector: (int, int, int)
+
+        @rtype: Iterable[(int, StyleBasic)]
+        """
+        segment_index_to_occupancy = self._get_occupancy()
+        for segment_index in list(self._segment_index_to_block_id_to_quantity):
+            rows = segment_index_to_occupancy.get(segment_index)
+            if rows is None:
+                continue
+            segment_position = Vector.get_position(segment_index)
+            low = [max(value, segment_value) for value, segment_value in zip(min_vector, segment_position)]
+            high = [min(value, segment_value + 31) for value, segment_value in zip(max_vector, segment_position)]
+            if low[0] > high[0] or low[1] > high[1] or low[2] > high[2]:
+                continue
+            z_mask = ((1 << (high[2] - low[2] + 1)) - 1) << (low[2] & 0x1F)
+            for x in range(low[0], high[0] + 1):
+                for y in range(low[1], high[1] + 1):
+                    row = rows[(x & 0x1F) | ((y & 0x1F) << 5)] & z_mask
+                    position_index = segment_index | (x & 0x1F) | ((y & 0x1F) << 16)
+                    while row:
+                        bit = row & -row
+                        row ^= bit
+                        position_index_block = position_index | ((bit.bit_length() - 1) << 32)
+                        yield position_index_block, self[position_index_block]
+
+    def blocks_in_selection(self, selection):
+        """
+        Blocks of a selection, only boxes of the selection are looked at, or only blocks of its ids.
+        Collect them before changing the block list.
+
+        @type selection: Selection
+
+        @rtype: Iterable[(int, StyleBasic)]
+        """
+        boxes = selection.get_boxes()
+        if boxes is None:
+            for position_index, _ in self.iter_states(selection.get_block_ids()):
+                block = self[position_index]
+                if selection.contains_block_id(block.get_id()):
+                    yield position_index, block
+            return
+        for min_vector, max_vector in boxes:
+            for position_index, block in self.blocks_in_box(min_vector, max_vector):
+                if selection.contains_block_id(block.get_id()):
+                    yield position_index, block
+
+    def _get_occupancy(self):
+        """
+        Occupancy rows of all segments, built once and kept up to date from then on
+
+        @rtype: dict[int, array]
+        """
+        if self._segment_index_to_occupancy is None:
+            self._segment_index_to_occupancy = dict()
+            self._build_occupancy()
+        return self._segment_index_to_occupancy
+
+    def _build_occupancy(self):
+        """
+        Mark positions of all blocks
+        """
+        for position_index in self.keys():
+            self._occupy(position_index, True)
+
+    def _occupy(self, position_index, occupied):
+        """
+        Set or unset the occupancy bit of a position
+
+        @type position_index: int
+        @type occupied: bool
+        """
+        segment_index = position_index & self._segment_mask
+        rows = self._segment_index_to_occupancy.get(segment_index)
+        if rows is None:
+            if not occupied:
+                return
+            rows = array('I', [0]) * 1024
+            self._segment_index_to_occupancy[segment_index] = rows
+        row_index = (position_index & 0x1F) | ((position_index >> 11) & 0x3E0)
+        bit = 1 << ((position_index >> 32) & 0x1F)
+        if occupied:
+            rows[row_index] |= bit
+        else:
+            rows[row_index] &= ~bit & 0xFFFFFFFF
+
+    # #######################################
+    # ###  Segment summary
+    # #######################################
+
+    def _reset_counts(self):
+        """
+        Forget all numbers of blocks, once all blocks were removed
+        """
+        self._segment_index_to_block_id_to_quantity = dict()
+        self._block_id_to_quantity = dict()
+        self._axis_value_to_quantity = [dict(), dict(), dict()]
+        if self._block_id_to_position_indexes is not None:
+            self._block_id_to_position_indexes = dict()
+        if self._segment_index_to_occupancy is not None:
+            self._segment_index_to_occupancy = dict()
+
+    def _count(self, position_index, block_id, quantity):
+        """
+        Update number of blocks of an id in total and in the segment of a position
+
+        @type position_index: int
+        @type block_id: int
+        @type quantity: int
+        """
+        total = self._block_id_to_quantity.get(block_id, 0) + quantity
+        if total > 0:
+            self._block_id_to_quantity[block_id] = total
+        else:
+            self._block_id_to_quantity.pop(block_id, None)
+        segment_index = position_index & self._segment_mask
+        block_id_to_quantity = self._segment_index_to_block_id_to_quantity.setdefault(segment_index, {})
+        quantity += block_id_to_quantity.get(block_id, 0)
+        if quantity > 0:
+            block_id_to_quantity[block_id] = quantity
+            return
+        block_id_to_quantity.pop(block_id, None)
+        if len(block_id_to_quantity) == 0:
+            self._segment_index_to_block_id_to_quantity.pop(segment_index)
+
+    def _count_states(self, position_indexes, states):
+        """
+        Add numbers of blocks of each id within each segment of states at once
+
+        @attention: requires numpy
+
+        @type position_indexes: numpy.ndarray
+        @type states: numpy.ndarray
+        """
+        block_ids = states.astype(np.int64) & 0x7FF
+        non_empty = block_ids != 0
+        keys = ((position_indexes[non_empty].astype(np.int64) & self._segment_mask) << 11) | block_ids[non_empty]
+        keys, quantities = np.unique(keys, return_counts=True)
+        for key, quantity in zip(keys.tolist(), quantities.tolist()):
+            block_id_to_quantity = self._segment_index_to_block_id_to_quantity.setdefault(key >> 11, {})
+            block_id_to_quantity[key & 0x7FF] = block_id_to_quantity.get(key & 0x7FF, 0) + quantity
+            self._block_id_to_quantity[key & 0x7FF] = self._block_id_to_quantity.get(key & 0x7FF, 0) + quantity
+
+    def _count_position(self, position_index, quantity):
+        """
+        Update number of blocks with the coordinates of a position
+
+        @type position_index: int
+        @type quantity: int
+        """
+        if self._segment_index_to_occupancy is not None:
+            self._occupy(position_index, quantity > 0)
+        for value_to_quantity in self._axis_value_to_quantity:
+            # unsigned 16 bit coordinate
+            value = position_index & 0xFFFF
+            position_index >>= 16
+            total = value_to_quantity.get(value, 0) + quantity
+            if total > 0:
+                value_to_quantity[value] = total
+            else:
+                value_to_quantity.pop(value, None)
+
+    def _count_positions(self, position_indexes, quantity):
+        """
+        Update number of blocks with the coordinates of many positions at once
+
+        @attention: requires numpy
+
+        @type position_indexes: numpy.ndarray
+        @type quantity: int
+        """
+        position_indexes = np.asarray(position_indexes, dtype=np.int64)
+        if self._segment_index_to_occupancy is not None:
+            for position_index in position_indexes.tolist():
+                self._occupy(position_index, quantity > 0)
+        for axis, value_to_quantity in enumerate(self._axis_value_to_quantity):
+            values, quantities = np.unique((position_indexes >> (16 * axis)) & 0xFFFF, return_counts=True)
+            for value, total in zip(values.tolist(), (quantities * quantity).tolist()):
+                total += value_to_quantity.get(value, 0)
+                if total > 0:
+                    value_to_quantity[value] = total
+                else:
+                    value_to_quantity.pop(value, None)
+
+    def _iter_position_indexes_of(self, block_ids):
+        """
+        Position indexes of segments with blocks of any of the ids, all if that is cheaper.
+        Blocks of other ids are included.
+
+        @type block_ids: set[int]
+
+        @rtype: Iterable[int]
+        """
+        block_ids = set(block_ids)
+        if self._block_id_to_position_indexes is not None:
+            for block_id in block_ids:
+                for position_index in list(self._block_id_to_position_indexes.get(block_id, ())):
+                    yield position_index
+            return
+        segment_indexes = [
+            segment_index
+            for segment_index, block_id_to_quantity in self._segment_index_to_block_id_to_quantity.items()
+            if not block_ids.isdisjoint(block_id_to_quantity)]
+        if len(segment_indexes) * 32768 >= len(self._position_index_to_instance):
+            for position_index in self._position_index_to_instance:
+                yield position_index
+            return
+        for segment_index in segment_indexes:
+            for position_index in self._iter_segment(segment_index):
+                yield position_index
+
+
+class BlockListSnapshot(object):
+    """
+    Segments of a block list as they were when the snapshot was taken,
+    a segment is only kept once it is modified afterwards.
+
+    @type segment_index_to_content: dict[int, object]
+    """
+
+    def __init__(self):
+        self.segment_index_to_content = dict()
+
+
+class BlockStates(object):
+    """
+    Decoded block states and their position indexes, grouped by the version of the segment they are from.
+    Can be passed to segment and region readers in place of a BlockList, states are not resolved to blocks.
+    With numpy, states are kept as compact arrays that are cheap to pass between processes.
+
+    @type _version_to_chunks: dict[int, list[(list[int] | numpy.ndarray, list[int] | numpy.ndarray)]]
+    """
+
+    def __init__(self):
+        self._version_to_chunks = dict()
+
+    def __len__(self):
+        """
+        Get number of states, including those that might not resolve to a block
+
+        @rtype: int
+        """
+        return sum(len(states) for chunks in self._version_to_chunks.values() for _, states in chunks)
+
+    def set_states(self, position_indexes, states, version=None):
+        """
+        Collect block states
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: list[int] | numpy.ndarray
+        @param states: int_24 states, one for each position index
+        @type states: list[int] | numpy.ndarray
+        @param version: version of smd segment the states are from
+        @type version: int | None
+        """
+        if version not in self._version_to_chunks:
+            self._version_to_chunks[version] = []
+        self._version_to_chunks[version].append((position_indexes, states))
+
+    def items(self):
+        """
+        @rtype: Iterable[(int, list[int] | numpy.ndarray, list[int] | numpy.ndarray)]
+        """
+        for version, chunks in self._version_to_chunks.items():
+            if np is not None and all(isinstance(states, np.ndarray) for _, states in chunks):
+                yield version, np.concatenate([p for p, _ in chunks]), np.concatenate([s for _, s in chunks])
+                continue
+            position_indexes = []
+            states = []
+            for chunk_position_indexes, chunk_states in chunks:
+                position_indexes.extend(chunk_position_indexes)
+                states.extend(chunk_states)
+            yield version, position_indexes, states
+
+
+class BlockStatistics(object):
+    """
+    Quantity of each block id and bounding box of decoded block states, no blocks are created.
+    Can be passed to segment and region readers in place of a BlockList.
+    States of id 0 are ignored, like they are when resolved to blocks.
+
+    @type _block_id_to_quantity: dict[int, int]
+    @type _min_vector: list[int]
+    @type _max_vector: list[int]
+    """
+
+    # block id, lowest 11 bits of a state
+    _id_mask = 0x7FF
+
+    def __init__(self, position_core=(16, 16, 16)):
+        """
+        @param position_core: the box always includes the core position
+        @type position_core: (int, int, int)
+        """
+        self._block_id_to_quantity = dict()
+        self._min_vector = list(position_core)
+        self._max_vector = list(position_core)
+
+    def __len__(self):
+        """
+        Get number of blocks
+
+        @rtype: int
+        """
+        return sum(self._block_id_to_quantity.values())
+
+    def set_states(self, position_indexes, states, version=None):
+        """
+        Count block states
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: list[int] | numpy.ndarray
+        @param states: int_24 states, one for each position index
+        @type states: list[int] | numpy.ndarray
+        @param version: version of smd segment the states are from, the id bits are the same for all versions
+        @type version: int | None
+        """
+        if np is not None and isinstance(states, np.ndarray):
+            self._set_states_vectorized(np.asarray(position_indexes, dtype=np.int64), states)
+            return
+        for position_index, state in zip(position_indexes, states):
+            block_id = state & self._id_mask
+            if block_id == 0:
+                continue
+            self._block_id_to_quantity[block_id] = self._block_id_to_quantity.get(block_id, 0) + 1
+            for axis, value in enumerate(Vector.get_position(position_index)):
+                if value < self._min_vector[axis]:
+                    self._min_vector[axis] = value
+                if value > self._max_vector[axis]:
+                    self._max_vector[axis] = value
+
+    def _set_states_vectorized(self, position_indexes, states):
+        """
+        Count block states as a whole with numpy
+
+        @type position_indexes: numpy.ndarray
+        @type states: numpy.ndarray
+        """
+        block_ids = states & self._id_mask
+        non_empty = block_ids != 0
+        if not non_empty.any():
+            return
+        quantities = np.bincount(block_ids[non_empty])
+        for block_id in np.flatnonzero(quantities):
+            block_id = int(block_id)
+            self._block_id_to_quantity[block_id] = self._block_id_to_quantity.get(block_id, 0) + int(quantities[block_id])
+        position_indexes = position_indexes[non_empty]
+        for axis in range(3):
+            values = ((position_indexes >> (16 * axis)) & 0xFFFF).astype(np.uint16).view(np.int16)
+            self._min_vector[axis] = min(self._min_vector[axis], int(values.min()))
+            self._max_vector[axis] = max(self._max_vector[axis], int(values.max()))
+
+    def get_block_id_to_quantity(self):
+        """
+        Return the quantity of each block type
+
+        @rtype: dict[int, int]
+        """
+        return dict(self._block_id_to_quantity)
+
+    def get_min_max_vector(self):
+        """
+        Get the minimum and maximum coordinates of blocks
+
+        @return: Minimum(x,y,z), Maximum(x,y,z)
+        @rtype: tuple[int,int,int], tuple[int,int,int]
+        """
+        return tuple(self._min_vector), tuple(self._max_vector)
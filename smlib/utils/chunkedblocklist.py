@@ -0,0 +1,614 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .vector import Vector
+from .blocklist import BlockList
+from ..smblueprint.smdblock.blockpool import block_pool, StyleBasic
+
+
+__author__ = 'Peter Hofmann'
+
+
+class ChunkedBlockList(BlockList):
+    """
+    Block list keeping blocks as integer states in dense chunks of 32 x 32 x 32 positions, like smd3 segments.
+    Only chunks with blocks are kept, a chunk costs 4 byte per position instead of a dict entry per block.
+    Blocks are taken from the block pool once they are accessed.
+
+    @type _chunk_index_to_states: dict[int, array]
+    @type _state_to_block: dict[int, StyleBasic]
+    @type _quantity: int
+    """
+
+    _blocks_in_a_chunk = 32768
+
+    def __init__(self):
+        super(ChunkedBlockList, self).__init__()
+        # chunk index, position index of the lowest position of a chunk, to block states of all positions of the chunk
+        self._chunk_index_to_states = dict()
+        self._state_to_block = dict()
+        self._quantity = 0
+
+    # #######################################
+    # ###  Chunks
+    # #######################################
+
+    @staticmethod
+    def _get_local_index(position_index):
+        """
+        Index of a position within its chunk, the same as the block index within a smd3 segment
+
+        @type position_index: int
+
+        @rtype: int
+        """
+        return (position_index & 0x1F) | ((position_index >> 11) & 0x3E0) | ((position_index >> 22) & 0x7C00)
+
+    @staticmethod
+    def _get_offsets():
+        """
+        Position index offsets of all positions of a chunk, by local index
+
+        @rtype: list[int]
+        """
+        if BlockList._segment_offsets is None:
+            BlockList._segment_offsets = [
+                x | (y << 16) | (z << 32) for z in range(32) for y in range(32) for x in range(32)]
+        return BlockList._segment_offsets
+
+    def _get_block(self, state):
+        """
+        @type state: int
+
+        @rtype: StyleBasic
+        """
+        block = self._state_to_block.get(state)
+        if block is None:
+            block = block_pool(state)
+            self._state_to_block[state] = block
+        return block
+
+    def _iter_chunk(self, chunk_index, states, block_ids=None):
+        """
+        Position indexes and states of blocks in a chunk
+
+        @type chunk_index: int
+        @param states: block states of all positions of the chunk
+        @type states: array
+        @param block_ids: only blocks of these ids
+        @type block_ids: set[int] | None
+
+        @rtype: Iterable[(int, int)]
+        """
+        offsets = self._get_offsets()
+        if np is not None:
+            view = np.frombuffer(states, dtype=np.uint32)
+            if block_ids is None:
+                local_indexes = np.flatnonzero(view)
+            else:
+                local_indexes = np.flatnonzero(np.isin(view & 0x7FF, list(block_ids)))
+            for local_index, state in zip(local_indexes.tolist(), view[local_indexes].tolist()):
+                yield chunk_index | offsets[local_index], state
+            return
+        for local_index, state in enumerate(states):
+            if state == 0:
+                continue
+            if block_ids is not None and state & 0x7FF not in block_ids:
+                continue
+            yield chunk_index | offsets[local_index], state
+
+    def _get_chunks_of(self, block_ids):
+        """
+        Indexes of chunks with blocks of any of the ids
+
+        @type block_ids: set[int]
+
+        @rtype: list[int]
+        """
+        return [
+            chunk_index
+            for chunk_index, block_id_to_quantity in self._segment_index_to_block_id_to_quantity.items()
+            if not block_ids.isdisjoint(block_id_to_quantity)]
+
+    def _iter_position_index_state(self):
+        """
+        @rtype: Iterable[(int, int)]
+        """
+        for chunk_index, states in list(self._chunk_index_to_states.items()):
+            for position_index, state in self._iter_chunk(chunk_index, states):
+                yield position_index, state
+
+    def _set_state(self, position_index, state):
+        """
+        Set block state at a position
+
+        @type position_index: int
+        @param state: int_24 state of a block of the most recent version
+        @type state: int
+        """
+        chunk_index = position_index & self._segment_mask
+        if self._snapshots:
+            self._save_segments([chunk_index])
+        states = self._chunk_index_to_states.get(chunk_index)
+        if states is None:
+            states = array('I', [0]) * self._blocks_in_a_chunk
+            self._chunk_index_to_states[chunk_index] = states
+        local_index = self._get_local_index(position_index)
+        state_previous = states[local_index]
+        self._count(position_index, state & 0x7FF, 1)
+        if state_previous != 0:
+            self._count(position_index, state_previous & 0x7FF, -1)
+        else:
+            self._count_position(position_index, 1)
+            self._quantity += 1
+        states[local_index] = state
+
+    def _set_states_vectorized(self, position_indexes, states, version):
+        """
+        Set block states chunk by chunk with numpy
+
+        @type position_indexes: numpy.ndarray
+        @type states: numpy.ndarray
+        @type version: int | None
+        """
+        unique_states, inverse = np.unique(np.asarray(states, dtype=np.int64), return_inverse=True)
+        resolved_states = np.zeros(len(unique_states), dtype=np.uint32)
+        for index, state in enumerate(unique_states.tolist()):
+            block = block_pool(state, version=version)
+            if block is not None:
+                resolved_states[index] = block.get_int_24()
+        states = resolved_states[inverse.reshape(-1)]
+        position_indexes = np.asarray(position_indexes, dtype=np.int64)[states != 0]
+        states = states[states != 0]
+        chunk_indexes = position_indexes & self._segment_mask
+        order = np.argsort(chunk_indexes, kind='mergesort')
+        chunk_indexes, starts = np.unique(chunk_indexes[order], return_index=True)
+        ends = list(starts[1:].tolist()) + [len(order)]
+        if self._snapshots:
+            self._save_segments(chunk_indexes.tolist())
+        for chunk_index, start, end in zip(chunk_indexes.tolist(), starts.tolist(), ends):
+            chunk_position_indexes = position_indexes[order[start:end]]
+            chunk_states = states[order[start:end]]
+            if chunk_index not in self._chunk_index_to_states:
+                self._chunk_index_to_states[chunk_index] = array('I', [0]) * self._blocks_in_a_chunk
+            view = np.frombuffer(self._chunk_index_to_states[chunk_index], dtype=np.uint32)
+            local_indexes = (
+                (chunk_position_indexes & 0x1F) |
+                ((chunk_position_indexes >> 11) & 0x3E0) |
+                ((chunk_position_indexes >> 22) & 0x7C00))
+            states_previous = view[local_indexes]
+            self._count_states(chunk_position_indexes, chunk_states)
+            block_ids_previous, quantities = np.unique(
+                states_previous[states_previous != 0] & 0x7FF, return_counts=True)
+            for block_id, quantity in zip(block_ids_previous.tolist(), quantities.tolist()):
+                self._count(chunk_index, block_id, -quantity)
+            self._count_positions(chunk_position_indexes[states_previous == 0], 1)
+            self._quantity += int(np.count_nonzero(states_previous == 0))
+            view[local_indexes] = chunk_states
+
+    # #######################################
+    # ###  BlockList
+    # #######################################
+
+    def __iter__(self):
+        """
+        @rtype: Iterable[(int, int, int)]
+        """
+        for position_index, _ in self._iter_position_index_state():
+            yield Vector.get_position(position_index)
+
+    def items(self):
+        """
+        @rtype: Iterable[((int, int, int), StyleBasic)]
+        """
+        for position_index, state in self._iter_position_index_state():
+            yield Vector.get_position(position_index), self._get_block(state)
+
+    def keys(self):
+        """
+        @rtype: Iterable[int]
+        """
+        for position_index, _ in self._iter_position_index_state():
+            yield position_index
+
+    def iter_states(self, block_ids=None):
+        """
+        States are passed on as they are stored, only chunks with blocks of the ids are looked at
+
+        @type block_ids: set[int] | None
+
+        @rtype: Iterable[(int, int)]
+        """
+        if block_ids is None:
+            for position_index, state in self._iter_position_index_state():
+                yield position_index, state
+            return
+        block_ids = set(block_ids)
+        chunk_indexes = self._get_chunks_of(block_ids)
+        for chunk_index in chunk_indexes:
+            for position_index, state in self._iter_chunk(chunk_index, self._chunk_index_to_states[chunk_index], block_ids):
+                yield position_index, state
+
+    def __setitem__(self, position, block):
+        """
+        @param position:
+        @type position: (int, int, int) | int
+        @param block:
+        @type block: StyleBasic
+        """
+        if isinstance(position, int):
+            position_index = position
+        else:
+            assert Vector.is_in_range(position), "Position out of range: {}".format(position)
+            position_index = Vector.get_index(position)
+        assert isinstance(block, StyleBasic), block
+        self._set_state(position_index, block.get_int_24())
+
+    def set_states(self, position_indexes, states, version=None):
+        """
+        Set blocks by their integer state.
+        States that do not resolve to a block, like those of id 0, are skipped.
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: Iterable[int] | numpy.ndarray
+        @param states: int_24 states, one for each position index
+        @type states: Iterable[int] | numpy.ndarray
+        @param version: version of smd segment the states are from
+        @type version: int | None
+        """
+        if np is not None and isinstance(states, np.ndarray):
+            self._set_states_vectorized(position_indexes, states, version)
+            return
+        state_to_state = {}
+        for position_index, state in zip(position_indexes, states):
+            if state not in state_to_state:
+                block = block_pool(state, version=version)
+                state_to_state[state] = 0 if block is None else block.get_int_24()
+            if state_to_state[state] == 0:
+                continue
+            self._set_state(position_index, state_to_state[state])
+
+    def __getitem__(self, position):
+        """
+        Get a block at a specific position
+
+        @param position:
+        @type position: (int, int, int) | int
+
+        @rtype: StyleBasic
+        """
+        if isinstance(position, int):
+            position_index = position
+        else:
+            position_index = Vector.get_index(position)
+        states = self._chunk_index_to_states.get(position_index & self._segment_mask)
+        state = 0
+        if states is not None:
+            state = states[self._get_local_index(position_index)]
+        assert state != 0, "{} No block at position: {}".format(len(self), position)
+        return self._get_block(state)
+
+    def __len__(self):
+        """
+        Get number of blocks of blueprint
+
+        @rtype: int
+        """
+        return self._quantity
+
+    def pop_positions(self):
+        """
+        @rtype: Iterable[(int, int, int), StyleBasic]
+        """
+        for position_index, block in self.pop_position_indexes():
+            yield Vector.get_position(position_index), block
+
+    def pop_position_indexes(self):
+        """
+        Chunk by chunk, a chunk is freed once its blocks are passed on.
+
+        @rtype: Iterable[int, StyleBasic]
+        """
+        if self._snapshots:
+            self._save_segments(list(self._chunk_index_to_states))
+        chunk_index_to_states = self._chunk_index_to_states
+        self._chunk_index_to_states = dict()
+        self._reset_counts()
+        self._quantity = 0
+        while len(chunk_index_to_states) > 0:
+            chunk_index, states = chunk_index_to_states.popitem()
+            blocks = [
+                (position_index, self._get_block(state))
+                for position_index, state in self._iter_chunk(chunk_index, states)]
+            del states
+            for position_index, block in blocks:
+                yield position_index, block
+
+    def _pop_index(self, position_index):
+        """
+        @type position_index: int
+
+        @rtype: StyleBasic
+        """
+        chunk_index = position_index & self._segment_mask
+        if self._snapshots:
+            self._save_segments([chunk_index])
+        states = self._chunk_index_to_states[chunk_index]
+        local_index = self._get_local_index(position_index)
+        state = states[local_index]
+        assert state != 0, "No block at position: {}".format(Vector.get_position(position_index))
+        states[local_index] = 0
+        self._quantity -= 1
+        self._count(position_index, state & 0x7FF, -1)
+        self._count_position(position_index, -1)
+        if chunk_index not in self._segment_index_to_block_id_to_quantity:
+            del self._chunk_index_to_states[chunk_index]
+        return self._get_block(state)
+
+    def has_block_at(self, position):
+        """
+        Returns true if a block exists at a position
+
+        @param position: (x,y,z)
+        @type position: (int, int, int)
+
+        @rtype: bool
+        """
+        position_index = Vector.get_index(position)
+        states = self._chunk_index_to_states.get(position_index & self._segment_mask)
+        return states is not None and states[self._get_local_index(position_index)] != 0
+
+    def remove_blocks(self, block_ids):
+        """
+        Removing all blocks of a specific id, states are cleared chunk by chunk
+
+        @type block_ids: set[int]
+        """
+        self.map_states(dict((state, 0) for state in self.get_distinct_states(block_ids)))
+
+    def move_positions(self, vector_direction):
+        """
+        Move all positions in a direction.
+        The offset is added to the position indexes of all blocks at once, without creating blocks.
+
+        @type vector_direction: (int, int, int)
+        """
+        if np is None:
+            super(ChunkedBlockList, self).move_positions(vector_direction)
+            return
+        self._assert_move_in_range(vector_direction)
+        if self._snapshots:
+            self._save_segments(list(self._chunk_index_to_states))
+        offsets = np.array(self._get_offsets(), dtype=np.int64)
+        position_indexes = [np.zeros(0, dtype=np.int64)]
+        states = [np.zeros(0, dtype=np.uint32)]
+        for chunk_index, chunk_states in self._chunk_index_to_states.items():
+            view = np.frombuffer(chunk_states, dtype=np.uint32)
+            local_indexes = np.flatnonzero(view)
+            position_indexes.append(chunk_index | offsets[local_indexes])
+            states.append(view[local_indexes])
+        self._chunk_index_to_states = dict()
+        self._reset_counts()
+        self._quantity = 0
+        position_indexes = Vector.shift_position_indexes(np.concatenate(position_indexes), Vector.get_index(vector_direction))
+        self._set_states_vectorized(position_indexes, np.concatenate(states), None)
+
+    def set_many(self, position_indexes, blocks):
+        """
+        @type position_indexes: Iterable[int] | numpy.ndarray
+        @type blocks: Iterable[StyleBasic]
+        """
+        if hasattr(position_indexes, "tolist"):
+            position_indexes = position_indexes.tolist()
+        for position_index, block in zip(position_indexes, blocks):
+            self._set_state(position_index, block.get_int_24())
+
+    def pop_many(self, position_indexes):
+        """
+        @type position_indexes: Iterable[int] | numpy.ndarray
+
+        @rtype: list[StyleBasic]
+        """
+        if hasattr(position_indexes, "tolist"):
+            position_indexes = position_indexes.tolist()
+        return [self._pop_index(position_index) for position_index in position_indexes]
+
+    def get_distinct_states(self, block_ids=None):
+        """
+        @type block_ids: set[int] | None
+
+        @rtype: set[int]
+        """
+        if block_ids is None:
+            chunk_indexes = list(self._chunk_index_to_states)
+        else:
+            block_ids = set(block_ids)
+            chunk_indexes = self._get_chunks_of(block_ids)
+        states = set()
+        for chunk_index in chunk_indexes:
+            chunk_states = self._chunk_index_to_states[chunk_index]
+            if np is not None:
+                states.update(np.unique(np.frombuffer(chunk_states, dtype=np.uint32)).tolist())
+            else:
+                states.update(chunk_states)
+        states.discard(0)
+        if block_ids is None:
+            return states
+        return set(state for state in states if state & 0x7FF in block_ids)
+
+    def map_states(self, table):
+        """
+        States are rewritten chunk by chunk on the arrays, without creating blocks
+
+        @type table: dict[int, int]
+        """
+        state_to_state = {}
+        for state, new_state in table.items():
+            if state == 0:
+                continue
+            block = block_pool(new_state)
+            state_to_state[state] = 0 if block is None else block.get_int_24()
+        if len(state_to_state) == 0:
+            return
+        if np is not None:
+            keys = np.array(sorted(state_to_state), dtype=np.uint32)
+            values = np.array([state_to_state[state] for state in keys.tolist()], dtype=np.uint32)
+        block_ids = set(state & 0x7FF for state in state_to_state)
+        chunk_indexes = self._get_chunks_of(block_ids)
+        if self._snapshots:
+            self._save_segments(chunk_indexes)
+        for chunk_index in chunk_indexes:
+            states = self._chunk_index_to_states[chunk_index]
+            if np is not None:
+                view = np.frombuffer(states, dtype=np.uint32)
+                local_indexes = np.flatnonzero(np.isin(view, keys))
+                states_previous = view[local_indexes]
+                states_new = values[np.searchsorted(keys, states_previous)]
+                view[local_indexes] = states_new
+                self._count_changes(chunk_index, local_indexes, states_previous, states_new)
+                continue
+            local_indexes = []
+            states_previous = []
+            states_new = []
+            for local_index, state in enumerate(states):
+                if state in state_to_state:
+                    states[local_index] = state_to_state[state]
+                    local_indexes.append(local_index)
+                    states_previous.append(state)
+                    states_new.append(state_to_state[state])
+            self._count_changes(chunk_index, local_indexes, states_previous, states_new)
+
+    def _count_changes(self, chunk_index, local_indexes, states_previous, states_new):
+        """
+        Update block quantities after states of a chunk were replaced, drop the chunk if it is empty
+
+        @type chunk_index: int
+        @type local_indexes: list[int] | numpy.ndarray
+        @type states_previous: list[int] | numpy.ndarray
+        @type states_new: list[int] | numpy.ndarray
+        """
+        if np is not None:
+            local_indexes = np.asarray(local_indexes, dtype=np.int64)
+            states_previous = np.asarray(states_previous, dtype=np.uint32)
+            states_new = np.asarray(states_new, dtype=np.uint32)
+            block_ids, quantities = np.unique(states_previous[states_previous != 0] & 0x7FF, return_counts=True)
+            changes = list(zip(block_ids.tolist(), (-quantities).tolist()))
+            block_ids, quantities = np.unique(states_new[states_new != 0] & 0x7FF, return_counts=True)
+            changes.extend(zip(block_ids.tolist(), quantities.tolist()))
+            position_indexes = chunk_index | (
+                (local_indexes & 0x1F) | (((local_indexes >> 5) & 0x1F) << 16) | ((local_indexes >> 10) << 32))
+            added = (states_previous == 0) & (states_new != 0)
+            removed = (states_previous != 0) & (states_new == 0)
+            self._count_positions(position_indexes[added], 1)
+            self._count_positions(position_indexes[removed], -1)
+            self._quantity += int(np.count_nonzero(added)) - int(np.count_nonzero(removed))
+        else:
+            changes = [(state & 0x7FF, -1) for state in states_previous if state != 0]
+            changes.extend((state & 0x7FF, 1) for state in states_new if state != 0)
+            offsets = self._get_offsets()
+            for local_index, state_previous, state in zip(local_indexes, states_previous, states_new):
+                if (state_previous == 0) == (state == 0):
+                    continue
+                quantity = 1 if state_previous == 0 else -1
+                self._count_position(chunk_index | offsets[local_index], quantity)
+                self._quantity += quantity
+        # additions first, so the summary of the chunk is not dropped in between
+        for block_id, quantity in sorted(changes, key=lambda change: -change[1]):
+            self._count(chunk_index, block_id, quantity)
+        if chunk_index not in self._segment_index_to_block_id_to_quantity:
+            del self._chunk_index_to_states[chunk_index]
+
+    # #######################################
+    # ###  Snapshots
+    # #######################################
+
+    def _get_segment_contents(self, segment_indexes):
+        """
+        Copies of the states of chunks, None for chunks without blocks
+
+        @type segment_indexes: set[int]
+
+        @rtype: dict[int, array | None]
+        """
+        segment_index_to_content = dict()
+        for chunk_index in segment_indexes:
+            states = self._chunk_index_to_states.get(chunk_index)
+            segment_index_to_content[chunk_index] = None if states is None else array('I', states)
+        return segment_index_to_content
+
+    def _restore_segment(self, segment_index, content):
+        """
+        Replace the states of a chunk, only positions with a different state are counted
+
+        @type segment_index: int
+        @param content: states of all positions of the chunk, None for no blocks
+        @type content: array | None
+        """
+        states = self._chunk_index_to_states.get(segment_index)
+        if states is None and content is None:
+            return
+        if states is None:
+            states = array('I', [0]) * self._blocks_in_a_chunk
+            self._chunk_index_to_states[segment_index] = states
+        if content is None:
+            content = array('I', [0]) * self._blocks_in_a_chunk
+        if np is not None:
+            view = np.frombuffer(states, dtype=np.uint32)
+            view_content = np.frombuffer(content, dtype=np.uint32)
+            local_indexes = np.flatnonzero(view != view_content)
+            states_previous = view[local_indexes]
+            states_new = view_content[local_indexes]
+            view[local_indexes] = states_new
+        else:
+            local_indexes = [local_index for local_index in range(self._blocks_in_a_chunk)
+                             if states[local_index] != content[local_index]]
+            states_previous = [states[local_index] for local_index in local_indexes]
+            states_new = [content[local_index] for local_index in local_indexes]
+            for local_index, state in zip(local_indexes, states_new):
+                states[local_index] = state
+        if len(local_indexes) == 0:
+            return
+        self._count_changes(segment_index, local_indexes, states_previous, states_new)
+
+    # #######################################
+    # ###  Spatial index
+    # #######################################
+
+    def _build_occupancy(self):
+        """
+        Mark positions of all blocks, chunk by chunk
+        """
+        if np is None:
+            super(ChunkedBlockList, self)._build_occupancy()
+            return
+        bits = np.left_shift(np.uint32(1), np.arange(32, dtype=np.uint32))[:, None, None]
+        for chunk_index, states in self._chunk_index_to_states.items():
+            # local index is z, y, x from highest to lowest bits
+            occupied = (np.frombuffer(states, dtype=np.uint32) != 0).reshape(32, 32, 32)
+            rows = np.bitwise_or.reduce(occupied * bits, axis=0).ravel()
+            self._segment_index_to_occupancy[chunk_index] = array('I', rows.tolist())
+
+    def index_block_ids(self):
+        """
+        Not kept, chunks without blocks of an id are skipped when searching instead
+        """
+        pass
+
+    def _iter_position_indexes_of(self, block_ids):
+        """
+        Position indexes of blocks of any of the ids, only chunks with such blocks are looked at
+
+        @type block_ids: set[int]
+
+        @rtype: Iterable[int]
+        """
+        block_ids = set(block_ids)
+        chunk_indexes = self._get_chunks_of(block_ids)
+        for chunk_index in chunk_indexes:
+            states = self._chunk_index_to_states[chunk_index]
+            for position_index, _ in self._iter_chunk(chunk_index, states, block_ids):
+                yield position_index
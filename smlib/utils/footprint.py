@@ -0,0 +1,154 @@
+import io
+import sys
+import types
+import logging
+import weakref
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+__author__ = 'Peter Hofmann'
+
+
+# shared by everything, or not owned by the object they are referenced from
+_skipped_types = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    logging.Logger, logging.Handler, io.IOBase, weakref.ref, weakref.WeakValueDictionary)
+
+
+def get_size(value, seen=None, exclude_types=()):
+    """
+    Bytes used by a value and everything it references, each object is counted once.
+    Classes, functions, modules, loggers, files and weak references are not followed.
+
+    @param value: any object
+    @type value: object
+    @param seen: ids of objects already counted, shared between calls to count shared objects only once
+    @type seen: set[int] | None
+    @param exclude_types: objects of these types are neither counted nor followed
+    @type exclude_types: tuple[type]
+
+    @rtype: int
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [value]
+    while len(stack) > 0:
+        value = stack.pop()
+        if id(value) in seen or isinstance(value, _skipped_types) or isinstance(value, exclude_types):
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            stack.extend(value)
+        elif np is not None and isinstance(value, np.ndarray):
+            # a view does not own its data
+            if value.base is not None:
+                stack.append(value.base)
+            continue
+        if hasattr(value, "__dict__"):
+            stack.append(value.__dict__)
+        for cls in type(value).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(value, name):
+                    stack.append(getattr(value, name))
+    return size
+
+
+class PeakMemory(object):
+    """
+    Peak of memory allocated while within a 'with' statement, relative to its start.
+    Requires tracemalloc, python 3.4 and later, otherwise no peak is recorded.
+    Tracing allocations slows python down considerably.
+
+    @type peak: int | None
+    """
+
+    def __init__(self, enabled=True):
+        """
+        @param enabled: if not, nothing is traced and no peak recorded
+        @type enabled: bool
+        """
+        self.peak = None
+        self._enabled = enabled and tracemalloc is not None
+        self._start = 0
+        self._is_tracing = False
+
+    def __enter__(self):
+        if not self._enabled:
+            return self
+        self._is_tracing = tracemalloc.is_tracing()
+        if not self._is_tracing:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self._enabled:
+            return
+        self.peak = max(0, tracemalloc.get_traced_memory()[1] - self._start)
+        if not self._is_tracing:
+            tracemalloc.stop()
+
+
+class MemoryFootprint(object):
+    """
+    Bytes used by each component of a blueprint, and peaks recorded while reading and writing
+
+    @type component_to_size: dict[str, int]
+    @type stage_to_peak: dict[str, int]
+    @type number_of_blocks: int
+    @type number_of_states: int
+    """
+
+    def __init__(self, number_of_blocks=0, number_of_states=0):
+        """
+        @param number_of_blocks: number of blocks, for sizes per block
+        @type number_of_blocks: int
+        @param number_of_states: number of distinct pooled block states
+        @type number_of_states: int
+        """
+        self.component_to_size = dict()
+        self.stage_to_peak = dict()
+        self.number_of_blocks = number_of_blocks
+        self.number_of_states = number_of_states
+
+    def get_total(self):
+        """
+        @rtype: int
+        """
+        return sum(self.component_to_size.values())
+
+    def to_stream(self, output_stream=sys.stdout):
+        """
+        Stream sizes in kilobytes, and bytes per block
+
+        @param output_stream: Output stream
+        @type output_stream: fileIO
+        """
+        output_stream.write("####\nMEMORY\n####\n\n")
+        output_stream.write("Blocks: {}\n".format(self.number_of_blocks))
+        output_stream.write("Distinct block states: {}\n".format(self.number_of_states))
+        component_to_size = sorted(self.component_to_size.items()) + [("total", self.get_total())]
+        for component, size in component_to_size:
+            if self.number_of_blocks == 0:
+                output_stream.write("{}: {:.1f} KiB\n".format(component, size / 1024.))
+                continue
+            output_stream.write("{}: {:.1f} KiB ({:.1f} B per block)\n".format(
+                component, size / 1024., size / float(self.number_of_blocks)))
+        for stage, peak in sorted(self.stage_to_peak.items()):
+            output_stream.write("Peak during {}: {:.1f} KiB\n".format(stage, peak / 1024.))
+        output_stream.write("\n")
@@ -27,6 +27,48 @@ class PeripheryBase(object):
     _shape_id_corner = block_config.get_shape_id("corner")
     _shape_id_hepta = block_config.get_shape_id("hepta")
 
+    # periphery range: offsets and their neighbourhood bits
+    _range_to_offsets = {}
+    # periphery range: periphery index bits of each 9 bit x slice of a neighbourhood
+    _range_to_tables = {}
+
+    @staticmethod
+    def _get_offsets(periphery_range):
+        """
+        Offsets within a periphery range, besides the center, in the order of the periphery index bits.
+        Each with its bit within a neighbourhood, see BlockList.get_neighbourhood.
+
+        @type periphery_range: int
+
+        @rtype: list[((int, int, int), int)]
+        """
+        if periphery_range not in PeripheryBase._range_to_offsets:
+            range_p = [-1, 0, 1]
+            PeripheryBase._range_to_offsets[periphery_range] = [
+                ((x, y, z), (x + 1) * 9 + (y + 1) * 3 + (z + 1))
+                for x in range_p for y in range_p for z in range_p
+                if 0 < abs(x) + abs(y) + abs(z) <= periphery_range]
+        return PeripheryBase._range_to_offsets[periphery_range]
+
+    @staticmethod
+    def _get_tables(periphery_range):
+        """
+        Periphery index bits of each possible x slice of a neighbourhood
+
+        @type periphery_range: int
+
+        @rtype: list[list[int]]
+        """
+        if periphery_range not in PeripheryBase._range_to_tables:
+            tables = [[0] * 512 for _ in range(3)]
+            for power, (_, bit) in enumerate(PeripheryBase._get_offsets(periphery_range)):
+                table = tables[bit // 9]
+                for occupancy in range(512):
+                    if occupancy >> (bit % 9) & 1:
+                        table[occupancy] |= 1 << power
+            PeripheryBase._range_to_tables[periphery_range] = tables
+        return PeripheryBase._range_to_tables[periphery_range]
+
     def get_orientation_simple(self, position, shape_wedge=False, shape_tetra=False):
         """
 
@@ -57,21 +99,9 @@ class PeripheryBase(object):
         @rtype: int
         """
         assert 1 <= periphery_range <= 3
-        periphery_index = 0
-        power = 1
-        range_p = [-1, 0, 1]
-        for x in range_p:
-            for y in range_p:
-                for z in range_p:
-                    if abs(x) + abs(y) + abs(z) > periphery_range:
-                        continue
-                    position_tmp = (position[0] + x, position[1] + y, position[2] + z)
-                    if position_tmp == position:
-                        continue
-                    if self._block_list.has_block_at(position_tmp):
-                        periphery_index |= power
-                    power <<= 1
-        return periphery_index
+        occupancy = self._block_list.get_neighbourhood(position)
+        table_0, table_1, table_2 = self._get_tables(periphery_range)
+        return table_0[occupancy & 0x1FF] | table_1[(occupancy >> 9) & 0x1FF] | table_2[occupancy >> 18]
 
 
 class PeripherySimple(PeripheryBase, PeripheryHardcoded):
@@ -102,22 +132,16 @@ class PeripherySimple(PeripheryBase, PeripheryHardcoded):
         assert 1 <= periphery_range <= 3
         angle_shapes = {block_config.get_shape_id("wedge"), block_config.get_shape_id("tetra")}  # 5, 7,
         shape_periphery = []
-        range_p = [-1, 0, 1]
-        for x in range_p:
-            for y in range_p:
-                for z in range_p:
-                    if abs(x) + abs(y) + abs(z) > periphery_range:
-                        continue
-                    position_tmp = (position[0] + x, position[1] + y, position[2] + z)
-                    if position_tmp == position:
-                        continue
-                    if self._block_list.has_block_at(position_tmp):
-                        block_tmp = self._block_list[position_tmp]
-                        block_id = block_tmp.get_id()
-                        is_angled_shape = False
-                        if block_config[block_id].shape in angle_shapes:
-                            is_angled_shape = True
-                        shape_periphery.append(is_angled_shape)
+        occupancy = self._block_list.get_neighbourhood(position)
+        for (x, y, z), bit in self._get_offsets(periphery_range):
+            if not occupancy >> bit & 1:
+                continue
+            block_tmp = self._block_list[(position[0] + x, position[1] + y, position[2] + z)]
+            block_id = block_tmp.get_id()
+            is_angled_shape = False
+            if block_config[block_id].shape in angle_shapes:
+                is_angled_shape = True
+            shape_periphery.append(is_angled_shape)
         return tuple(shape_periphery)
 
     def get_orientation_simple(self, position, shape_wedge=False, shape_tetra=False):
@@ -199,20 +223,11 @@ class Periphery(PeripheryBase, PeripheryHardcoded):
         assert 1 <= periphery_range <= 3
         periphery_index = 0
         power = 1
-        range_p = [-1, 0, 1]
-        for x in range_p:
-            for y in range_p:
-                for z in range_p:
-                    if abs(x) + abs(y) + abs(z) > periphery_range:
-                        continue
-                    position_tmp = (position[0] + x, position[1] + y, position[2] + z)
-                    if position_tmp == position:
-                        continue
-                    if Vector.get_index(position_tmp) in self._marked:
-                        periphery_index |= power
-                    # if not marked and self._block_list.get_index(position_tmp) not in self._marked:
-                    #     periphery_index |= power
-                    power <<= 1
+        for (x, y, z), _ in self._get_offsets(periphery_range):
+            position_tmp = (position[0] + x, position[1] + y, position[2] + z)
+            if Vector.get_index(position_tmp) in self._marked:
+                periphery_index |= power
+            power <<= 1
         return periphery_index
 
     def get_position_shape_periphery(self, position, periphery_range):
@@ -238,28 +253,18 @@ class Periphery(PeripheryBase, PeripheryHardcoded):
         angle_shapes = {self._shape_id_wedge, self._shape_id_corner, self._shape_id_tetra, self._shape_id_hepta}
         periphery_orientation = []
         periphery_shape = []
-        range_p = [-1, 0, 1]
-        for x in range_p:
-            for y in range_p:
-                for z in range_p:
-                    if abs(x) + abs(y) + abs(z) > periphery_range:
-                        continue
-                    position_tmp = (position[0] + x, position[1] + y, position[2] + z)
-                    if position_tmp == position:
-                        continue
-                    if not self._block_list.has_block_at(position_tmp):
-                        shape_orientation = 0
-                        orientation = None
-                    else:
-                        block_tmp = self._block_list[position_tmp]
-                        block_id = block_tmp.get_id()
-                        shape_orientation = 0
-                        orientation = None
-                        if block_config[block_id].shape in angle_shapes:
-                            shape_orientation = block_config[block_id].shape
-                            orientation = block_tmp.get_axis_rotation(), block_tmp.get_rotations()
-                    periphery_shape.append(shape_orientation)
-                    periphery_orientation.append(orientation)
+        occupancy = self._block_list.get_neighbourhood(position)
+        for (x, y, z), bit in self._get_offsets(periphery_range):
+            shape_orientation = 0
+            orientation = None
+            if occupancy >> bit & 1:
+                block_tmp = self._block_list[(position[0] + x, position[1] + y, position[2] + z)]
+                block_id = block_tmp.get_id()
+                if block_config[block_id].shape in angle_shapes:
+                    shape_orientation = block_config[block_id].shape
+                    orientation = block_tmp.get_axis_rotation(), block_tmp.get_rotations()
+            periphery_shape.append(shape_orientation)
+            periphery_orientation.append(orientation)
         return tuple(periphery_shape), tuple(periphery_orientation)
 
     def get_periphery_simple(self, shape_id):
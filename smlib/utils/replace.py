@@ -1,5 +1,6 @@
 from .blocklist import BlockList
-from .blockconfig import block_config
+from .blockconfig import block_config, BlockConfig
+from .vector import Vector
 from ..smblueprint.smdblock.blockpool import block_pool
 
 
@@ -10,15 +11,117 @@ class Replace(object):
     """
     Collection of auto shape stuff
 
+    Blocks are replaced in two steps, a table from each distinct state present to its new state is built first,
+    and then applied to all blocks at once.
+    New states are kept for the whole run, so docked entities and regions replaced the same way only look at states
+    not seen before.
+
+    With a selection only blocks of the selection are replaced, they are collected once for each replacement.
+
     @type _block_list: BlockList
+    @type _selection: Selection | None
+    @type _selected: list[(int, StyleBasic)] | None
+    @type _key_to_state_to_state: dict[tuple, dict[int, int | None]]
     """
 
-    def __init__(self, block_list):
+    _key_to_state_to_state = dict()
+    _generation = None
+
+    def __init__(self, block_list, selection=None):
         """
 
         @type block_list: BlockList
+        @param selection: only blocks of a selection are replaced, all blocks if None
+        @type selection: Selection | None
         """
         self._block_list = block_list
+        self._selection = selection
+        self._selected = None
+
+    @staticmethod
+    def _get_table(key, states, get_new_state):
+        """
+        Translation table of states present, reusing states translated before
+
+        @param key: replacement and its arguments
+        @type key: tuple
+        @param states: distinct states present
+        @type states: Iterable[int]
+        @param get_new_state: returns the new state of a state, or None if it is not replaced
+        @type get_new_state: (int) -> int | None
+
+        @rtype: dict[int, int]
+        """
+        if Replace._generation != block_config.generation:
+            Replace._key_to_state_to_state = dict()
+            Replace._generation = block_config.generation
+        state_to_state = Replace._key_to_state_to_state.setdefault(key, dict())
+        table = dict()
+        for state in states:
+            if state not in state_to_state:
+                state_to_state[state] = get_new_state(state)
+            if state_to_state[state] is not None:
+                table[state] = state_to_state[state]
+        return table
+
+    # #######################################
+    # ###  Selection
+    # #######################################
+
+    def _get_distinct_states(self, block_ids=None):
+        """
+        Distinct states of all or of the selected blocks, selected blocks are kept until the table is applied
+
+        @type block_ids: set[int] | None
+
+        @rtype: set[int]
+        """
+        if self._selection is None:
+            return self._block_list.get_distinct_states(block_ids)
+        self._selected = list(self._block_list.blocks_in_selection(self._selection))
+        return set(
+            block.get_int_24() for _, block in self._selected if block_ids is None or block.get_id() in block_ids)
+
+    def _get_block_id_to_quantity(self):
+        """
+        Number of blocks of each id, of all or of the selected blocks
+
+        @rtype: dict[int, int]
+        """
+        if self._selection is None:
+            return self._block_list.get_block_id_to_quantity()
+        block_id_to_quantity = dict()
+        for _, block in self._selected:
+            block_id = block.get_id()
+            block_id_to_quantity[block_id] = block_id_to_quantity.get(block_id, 0) + 1
+        return block_id_to_quantity
+
+    def _map_states(self, table):
+        """
+        Apply a translation table to all or to the selected blocks
+
+        @type table: dict[int, int]
+        """
+        if self._selection is None:
+            self._block_list.map_states(table)
+            return
+        state_to_block = dict()
+        position_indexes = []
+        blocks = []
+        for position_index, block in self._selected:
+            state = block.get_int_24()
+            if state not in table:
+                continue
+            if state not in state_to_block:
+                state_to_block[state] = block_pool(table[state])
+            position_indexes.append(position_index)
+            blocks.append(state_to_block[state])
+        self._selected = None
+        self._block_list.set_many(position_indexes, blocks)
+
+    # #######################################
+    # ###  Replace
+    # #######################################
 
     def replace_hull(self, new_hull_type, hull_type=None):
         """
@@ -29,60 +132,287 @@ class Replace(object):
         @param hull_type:
         @type hull_type: int | None
         """
-        replace_cache_positive = dict()
-        for position, block in self._block_list.pop_positions():
-            block_id = block.get_id()
-            if not block_config[block_id].is_hull():
-                self._block_list[position] = block
-                continue
-            if block_id not in replace_cache_positive:
-                hull_tier, color_id, shape_id = block_config[block_id].get_details()
-                if hull_tier is None:
-                    self._block_list[position] = block
-                    continue
-                if hull_type is not None and hull_type != hull_tier:  # not replaced
-                    self._block_list[position] = block
-                    continue
-                new_block_id = block_config.get_block_id_by_details(new_hull_type, color_id, shape_id)
-                replace_cache_positive[block_id] = new_block_id
-            new_block_id = replace_cache_positive[block_id]
-            new_block = block_pool(new_block_id).get_modified_block(
-                block_id=new_block_id, active=False,
-                block_side_id=block.get_block_side_id(), axis_rotation=block.get_axis_rotation(),
-                rotations=block.get_rotations())
-            self._block_list[position] = new_block
+        table = self._get_table(
+            ("hull", new_hull_type, hull_type), self._get_distinct_states(),
+            lambda state: self._get_hull_state(state, new_hull_type, hull_type))
+        self._map_states(table)
+
+    @staticmethod
+    def _get_hull_state(state, new_hull_type, hull_type):
+        """
+        @type state: int
+        @type new_hull_type: int
+        @type hull_type: int | None
+
+        @return: new state, None if not replaced
+        @rtype: int | None
+        """
+        block = block_pool(state)
+        block_id = block.get_id()
+        if not block_config[block_id].is_hull():
+            return None
+        hull_tier, color_id, shape_id = block_config[block_id].get_details()
+        if hull_tier is None:
+            return None
+        if hull_type is not None and hull_type != hull_tier:  # not replaced
+            return None
+        new_block_id = block_config.get_block_id_by_details(new_hull_type, color_id, shape_id)
+        new_block = block_pool(new_block_id).get_modified_block(
+            block_id=new_block_id, active=False,
+            block_side_id=block.get_block_side_id(), axis_rotation=block.get_axis_rotation(),
+            rotations=block.get_rotations())
+        return new_block.get_int_24()
 
     def replace_blocks(self, block_id, replace_id, compatible=False):
         """
         Replace all blocks of a specific id
         """
-        for position, block in self._block_list.items():
-            if block.get_id() != block_id:
-                continue
+        def get_new_state(state):
             if compatible:
-                new_block = block.get_modified_block(block_id=replace_id)
-            else:
-                new_block = block_pool(replace_id).get_modified_block(
-                    block_id=replace_id, active=False)
-            self._block_list[position] = new_block
+                return block_pool(state).get_modified_block(block_id=replace_id).get_int_24()
+            return block_pool(replace_id).get_modified_block(block_id=replace_id, active=False).get_int_24()
+
+        table = self._get_table(
+            ("blocks", block_id, replace_id, compatible), self._get_distinct_states({block_id}),
+            get_new_state)
+        self._map_states(table)
+
+    def replace_by_rules(self, rules):
+        """
+        Replace blocks by any number of rules, applied as one translation table
+
+        @type rules: ReplaceRules
+
+        @return: number of blocks each rule applied to
+        @rtype: list[int]
+        """
+        states = self._get_distinct_states()
+        quantities = [0] * len(rules)
+        for block_id, quantity in self._get_block_id_to_quantity().items():
+            for rule_index in rules.get_rules_applied(block_id):
+                quantities[rule_index] += quantity
+        table = self._get_table(("rules", rules.get_key()), states, rules.get_new_state)
+        self._map_states(table)
+        return quantities
 
     def reset_hull_shape(self, border):
         """
         Turn shape of armor blocks of ship hull to cubes
 
-        @param border: Set of position_index of blocks
+        @param border: Set of position_index of blocks, only those of the selection are changed
         @type border: set(int)
         """
         cube_id = block_config.get_shape_id('cube')
+        block_to_block = dict()
+        position_indexes = []
+        blocks = []
         for position_index in border:
             block = self._block_list[position_index]
-            block_id = block.get_id()
-            if not block_config[block_id].is_hull():
+            if self._selection is not None and not self._selection.contains(
+                    Vector.get_position(position_index), block.get_id()):
                 continue
-            if block_config[block.get_id()].shape == cube_id:
+            if block not in block_to_block:
+                block_to_block[block] = None
+                block_id = block.get_id()
+                if not block_config[block_id].is_hull():
+                    continue
+                if block_config[block_id].shape == cube_id:
+                    continue
+                block_hull_tier, color_id, _ = block_config[block_id].get_details()
+                new_block_id = block_config.get_block_id_by_details(
+                    hull_type=block_hull_tier, color=color_id, shape_id=cube_id)
+                block_to_block[block] = block.get_modified_block(block_id=new_block_id, block_side_id=0)
+            if block_to_block[block] is None:
                 continue
-            block_hull_tier, color_id, _ = block_config[block_id].get_details()
-            new_block_id = block_config.get_block_id_by_details(
-                hull_type=block_hull_tier, color=color_id, shape_id=cube_id)
-            new_block = block.get_modified_block(block_id=new_block_id, block_side_id=0)
-            self._block_list[position_index] = new_block
+            position_indexes.append(position_index)
+            blocks.append(block_to_block[block])
+        self._block_list.set_many(position_indexes, blocks)
+
+
+class ReplaceRules(object):
+    """
+    Ordered replacement rules, compiled into one state translation table.
+    Each rule applies to the result of the rules before it, like replacing with one rule after another.
+
+    Rules are separated by commas or new lines, '#' starts a comment:
+        old_id:new_id
+        hull {h,s,a,c,z}:{h,s,a,c,z}    hull tier, keeping colour and shape, all hull if the old tier is left out
+        color old_color:new_color       hull colour, keeping tier and shape, like 'dark_grey:red'
+
+    @type _rules: list[(str, int | None, int)]
+    """
+
+    _char_to_hull_type = {
+        'h': 0,
+        's': 1,
+        'a': 2,
+        'c': 3,
+        'z': 4,
+    }
+
+    def __init__(self):
+        self._rules = []
+
+    def __len__(self):
+        """
+        @rtype: int
+        """
+        return len(self._rules)
+
+    def get_key(self):
+        """
+        Rules as a hashable value
+
+        @rtype: tuple
+        """
+        return tuple(self._rules)
+
+    # #######################################
+    # ###  Parse
+    # #######################################
+
+    def add_rule(self, kind, old_value, new_value):
+        """
+        @param kind: 'id', 'hull' or 'color'
+        @type kind: str
+        @param old_value: block id, hull tier or colour index, None for all hull tiers
+        @type old_value: int | None
+        @param new_value: block id, hull tier or colour index
+        @type new_value: int
+        """
+        assert kind in ("id", "hull", "color"), "Unknown replace rule: '{}'".format(kind)
+        assert old_value is not None or kind == "hull", "Missing value to replace: '{}'".format(kind)
+        self._rules.append((kind, old_value, new_value))
+
+    def from_string(self, text):
+        """
+        Add rules from a text
+
+        @type text: str
+        """
+        for line in text.replace(",", "\n").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if len(line) == 0:
+                continue
+            kind = "id"
+            if " " in line:
+                kind, line = line.split(None, 1)
+                kind = kind.lower()
+            assert line.count(":") == 1, "Bad replace rule: '{}'".format(line)
+            old_value, new_value = [value.strip().lower() for value in line.split(":")]
+            if kind == "id":
+                assert old_value.isdigit(), "Bad old block id: '{}'".format(old_value)
+                assert new_value.isdigit(), "Bad replace block id: '{}'".format(new_value)
+                self.add_rule(kind, int(old_value), int(new_value))
+            elif kind == "hull":
+                assert old_value in self._char_to_hull_type or old_value == "", "Bad hull type: '{}'".format(old_value)
+                assert new_value in self._char_to_hull_type, "Bad replace hull type: '{}'".format(new_value)
+                self.add_rule(kind, self._char_to_hull_type.get(old_value), self._char_to_hull_type[new_value])
+            elif kind == "color":
+                colors = [color.replace(" ", "_") for color in BlockConfig.colors]
+                assert old_value in colors, "Bad color: '{}'".format(old_value)
+                assert new_value in colors, "Bad replace color: '{}'".format(new_value)
+                self.add_rule(kind, colors.index(old_value), colors.index(new_value))
+            else:
+                raise AssertionError("Unknown replace rule: '{}'".format(kind))
+
+    def from_file(self, file_path):
+        """
+        Add rules from a file
+
+        @type file_path: str
+        """
+        with open(file_path) as input_stream:
+            self.from_string(input_stream.read())
+
+    def to_string(self, rule_index):
+        """
+        @type rule_index: int
+
+        @rtype: str
+        """
+        kind, old_value, new_value = self._rules[rule_index]
+        if kind == "hull":
+            return "hull {}:{}".format(
+                "" if old_value is None else BlockConfig.tiers[old_value], BlockConfig.tiers[new_value])
+        if kind == "color":
+            return "color {}:{}".format(BlockConfig.colors[old_value], BlockConfig.colors[new_value])
+        return "{}:{}".format(old_value, new_value)
+
+    # #######################################
+    # ###  Apply
+    # #######################################
+
+    def _get_new_block_id(self, rule_index, block_id):
+        """
+        @type rule_index: int
+        @type block_id: int
+
+        @return: new block id, None if the rule does not apply
+        @rtype: int | None
+        """
+        kind, old_value, new_value = self._rules[rule_index]
+        if kind == "id":
+            return new_value if block_id == old_value else None
+        if not block_config[block_id].is_hull():
+            return None
+        hull_tier, color_id, shape_id = block_config[block_id].get_details()
+        if hull_tier is None:
+            return None
+        if kind == "hull":
+            if old_value is not None and old_value != hull_tier:
+                return None
+            hull_tier = new_value
+        else:
+            if old_value != color_id:
+                return None
+            color_id = new_value
+        try:
+            return block_config.get_block_id_by_details(hull_tier, color_id, shape_id)
+        except KeyError:
+            return None
+
+    def get_rules_applied(self, block_id):
+        """
+        Indexes of rules that apply to blocks of an id
+
+        @type block_id: int
+
+        @rtype: list[int]
+        """
+        rule_indexes = []
+        for rule_index in range(len(self._rules)):
+            new_block_id = self._get_new_block_id(rule_index, block_id)
+            if new_block_id is None:
+                continue
+            rule_indexes.append(rule_index)
+            block_id = new_block_id
+        return rule_indexes
+
+    def get_new_state(self, state):
+        """
+        @type state: int
+
+        @return: new state, None if no rule applies
+        @rtype: int | None
+        """
+        block = block_pool(state)
+        is_replaced = False
+        for rule_index in range(len(self._rules)):
+            block_id = block.get_id()
+            new_block_id = self._get_new_block_id(rule_index, block_id)
+            if new_block_id is None:
+                continue
+            is_replaced = True
+            if self._rules[rule_index][0] != "id":  # shape is kept
+                block = block_pool(new_block_id).get_modified_block(
+                    block_id=new_block_id, active=False,
+                    block_side_id=block.get_block_side_id(), axis_rotation=block.get_axis_rotation(),
+                    rotations=block.get_rotations())
+            elif block_config[block_id].block_style == block_config[new_block_id].block_style:
+                block = block.get_modified_block(block_id=new_block_id)
+            else:
+                block = block_pool(new_block_id).get_modified_block(block_id=new_block_id, active=False)
+        if not is_replaced:
+            return None
+        return block.get_int_24()
@@ -0,0 +1,160 @@
+from .vector import Vector
+
+
+__author__ = 'Peter Hofmann'
+
+
+class Selection(object):
+    """
+    Part of an entity operations are limited to.
+    Blocks within an axis aligned box, within a set of chunks and of some block ids.
+    Each criterion left out selects everything.
+
+    @type _min_vector: (int, int, int) | None
+    @type _max_vector: (int, int, int) | None
+    @type _chunks: set[(int, int, int)] | None
+    @type _block_ids: set[int] | None
+    """
+
+    _blocks_in_a_line = 32
+
+    def __init__(self, min_vector=None, max_vector=None, chunks=None, block_ids=None, predicate=None):
+        """
+        @param min_vector: lowest corner of the box, included
+        @type min_vector: (int, int, int) | None
+        @param max_vector: highest corner of the box, included
+        @type max_vector: (int, int, int) | None
+        @param chunks: chunks of 32 x 32 x 32 positions, by position divided by 32, like (0, 0, 0) for 0 to 31
+        @type chunks: Iterable[(int, int, int)] | None
+        @param block_ids: only blocks of these ids
+        @type block_ids: Iterable[int] | None
+        @param predicate: only blocks of ids it returns True for
+        @type predicate: ((int) -> bool) | None
+        """
+        assert (min_vector is None) == (max_vector is None), "A box needs a lowest and a highest corner"
+        self._min_vector = None if min_vector is None else tuple(min_vector)
+        self._max_vector = None if max_vector is None else tuple(max_vector)
+        self._chunks = None if chunks is None else set(tuple(chunk) for chunk in chunks)
+        self._block_ids = None if block_ids is None else set(block_ids)
+        self._predicate = predicate
+        # ids of blocks looked at before, to whether they are selected
+        self._block_id_to_is_selected = dict()
+
+    def __repr__(self):
+        return "Selection(box={}, chunks={}, block ids={})".format(
+            None if self._min_vector is None else (self._min_vector, self._max_vector),
+            None if self._chunks is None else len(self._chunks),
+            None if self._block_ids is None else sorted(self._block_ids))
+
+    # #######################################
+    # ###  Criteria
+    # #######################################
+
+    def get_boxes(self):
+        """
+        Boxes covering all selected positions, chunks clipped to the box
+
+        @return: lowest and highest corner of each box, None if positions are not limited
+        @rtype: list[((int, int, int), (int, int, int))] | None
+        """
+        if self._chunks is None:
+            if self._min_vector is None:
+                return None
+            return [(self._min_vector, self._max_vector)]
+        boxes = []
+        for chunk in sorted(self._chunks):
+            min_vector = Vector.multiplication(chunk, (self._blocks_in_a_line, ) * 3)
+            max_vector = Vector.addition(min_vector, (self._blocks_in_a_line - 1, ) * 3)
+            if self._min_vector is not None:
+                min_vector = tuple(max(value, low) for value, low in zip(min_vector, self._min_vector))
+                max_vector = tuple(min(value, high) for value, high in zip(max_vector, self._max_vector))
+                if any(low > high for low, high in zip(min_vector, max_vector)):
+                    continue
+            boxes.append((min_vector, max_vector))
+        return boxes
+
+    def get_block_ids(self):
+        """
+        @return: ids blocks are limited to, None if not limited by a set of ids
+        @rtype: set[int] | None
+        """
+        return self._block_ids
+
+    def contains_position(self, position):
+        """
+        True if a position is within the box and the chunks
+
+        @type position: (int, int, int)
+
+        @rtype: bool
+        """
+        if self._min_vector is not None:
+            for value, low, high in zip(position, self._min_vector, self._max_vector):
+                if value < low or value > high:
+                    return False
+        if self._chunks is not None:
+            chunk = tuple(value // self._blocks_in_a_line for value in position)
+            if chunk not in self._chunks:
+                return False
+        return True
+
+    def contains_block_id(self, block_id):
+        """
+        True if blocks of an id are selected
+
+        @type block_id: int
+
+        @rtype: bool
+        """
+        if block_id not in self._block_id_to_is_selected:
+            is_selected = self._block_ids is None or block_id in self._block_ids
+            if is_selected and self._predicate is not None:
+                is_selected = bool(self._predicate(block_id))
+            self._block_id_to_is_selected[block_id] = is_selected
+        return self._block_id_to_is_selected[block_id]
+
+    def contains(self, position, block_id):
+        """
+        @type position: (int, int, int)
+        @type block_id: int
+
+        @rtype: bool
+        """
+        return self.contains_block_id(block_id) and self.contains_position(position)
+
+    # #######################################
+    # ###  Parse
+    # #######################################
+
+    @staticmethod
+    def from_strings(box=None, chunks=None, block_ids=None):
+        """
+        Selection from command line values
+
+        @param box: 'x,y,z:x,y,z', lowest and highest corner
+        @type box: str | None
+        @param chunks: 'x,y,z;x,y,z', chunk positions
+        @type chunks: str | None
+        @param block_ids: 'id,id'
+        @type block_ids: str | None
+
+        @rtype: Selection
+        """
+        def to_vector(text):
+            values = text.strip().split(',')
+            assert len(values) == 3, "Bad vector: '{}'".format(text)
+            return tuple(int(value) for value in values)
+
+        min_vector = max_vector = None
+        if box is not None:
+            assert box.count(':') == 1, "Bad box: '{}'".format(box)
+            corner_a, corner_b = [to_vector(corner) for corner in box.split(':')]
+            min_vector = tuple(min(a, b) for a, b in zip(corner_a, corner_b))
+            max_vector = tuple(max(a, b) for a, b in zip(corner_a, corner_b))
+        if chunks is not None:
+            chunks = [to_vector(chunk) for chunk in chunks.split(';') if len(chunk.strip()) > 0]
+        if block_ids is not None:
+            values = [value.strip() for value in block_ids.split(',')]
+            assert all(value.isdigit() for value in values), "Bad block ids: '{}'".format(block_ids)
+            block_ids = [int(value) for value in values]
+        return Selection(min_vector, max_vector, chunks, block_ids)
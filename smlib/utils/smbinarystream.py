@@ -2,6 +2,11 @@ __author__ = 'Peter Hofmann'
 
 import struct
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from ..common.binarystream import BinaryStream
 
 
@@ -195,6 +200,28 @@ class SMBinaryStream(BinaryStream):
         )
         return SMBinaryStream.pack('BBB', byte_order, data[0], data[1], data[2])
 
+    @staticmethod
+    def pack_int24_array(int_24bits, by_byte=False):
+        """
+        Turn an array of integer into 3 byte values, one row for each value
+
+        @attention: requires numpy
+
+        @param int_24bits: 24 bit integer
+        @type int_24bits: numpy.ndarray
+        @param by_byte: Store values one byte at a time, lowest byte first, like with 'pack_int24b'
+        @type by_byte: bool
+
+        @rtype: numpy.ndarray
+        """
+        int_24bits = np.asarray(int_24bits, dtype=np.int32)
+        data = np.empty((len(int_24bits), 3), dtype=np.uint8)
+        lowest, highest = (0, 2) if by_byte else (2, 0)
+        data[:, lowest] = int_24bits & 0xFF
+        data[:, 1] = (int_24bits >> 8) & 0xFF
+        data[:, highest] = (int_24bits >> 16) & 0xFF
+        return data
+
     @staticmethod
     def unpack_int24(byte_string):
         """
@@ -215,3 +242,24 @@ class SMBinaryStream(BinaryStream):
         """
         data = struct.unpack(">BBB", byte_string)
         return data[0] | data[1] << 8 | data[2] << 16
+
+    @staticmethod
+    def unpack_int24_array(byte_string, by_byte=False):
+        """
+        Read a sequence of 3 byte values as an array of integer
+
+        @attention: requires numpy
+
+        @param byte_string: Concatenated 3 byte values, trailing bytes are ignored
+        @type byte_string: str | bytes
+        @param by_byte: Values are stored one byte at a time, lowest byte first, like with 'unpack_int24b'
+        @type by_byte: bool
+
+        @rtype: numpy.ndarray
+        """
+        number_of_values = len(byte_string) // 3
+        data = np.frombuffer(byte_string, dtype=np.uint8, count=number_of_values * 3).reshape(number_of_values, 3)
+        data = data.astype(np.int32)
+        if by_byte:
+            return data[:, 0] | (data[:, 1] << 8) | (data[:, 2] << 16)
+        return (data[:, 0] << 16) | (data[:, 1] << 8) | data[:, 2]
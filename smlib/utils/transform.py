@@ -0,0 +1,253 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .vector import Vector
+from ..smblueprint.smdblock.orientationtables import orientation_tables
+
+
+__author__ = 'Peter Hofmann'
+
+
+class Transform(object):
+    """
+    Moving the center, mirroring and turning, composed into one map applied in a single pass.
+    Positions are mapped by an integer affine map, a signed permutation of the axes followed by a translation,
+    and block states by one orientation table.
+    A mirror keeps one half of an entity and adds a mirrored copy of it, it is applied after the affine map.
+
+    @type _indexes: list[int]
+    @type _multiplicators: list[int]
+    @type _translation: list[int]
+    @type _table: array | None
+    @type _mirror: list[int | bool] | None
+    @type _move_offset: (int, int, int)
+    """
+
+    _core_position = (16, 16, 16)
+
+    def __init__(self):
+        # new position: multiplicator[axis] * position[index[axis]] + translation[axis]
+        self._indexes = [0, 1, 2]
+        self._multiplicators = [1, 1, 1]
+        self._translation = [0, 0, 0]
+        # orientation table, None as long as no state changes
+        self._table = None
+        # axis index, reverse and the value of the mirror plane on that axis
+        self._mirror = None
+        self._move_offset = (0, 0, 0)
+
+    # #######################################
+    # ###  Compose
+    # #######################################
+
+    def move_center(self, direction_vector):
+        """
+        Move center (core) in a specific direction, all other blocks are moved the opposite way
+
+        @param direction_vector: (x,y,z)
+        @type direction_vector: (int,int,int)
+
+        @rtype: Transform
+        """
+        offset = Vector.multiplication((-1, -1, -1), direction_vector)
+        self._translation = list(Vector.addition(self._translation, offset))
+        self._move_offset = Vector.addition(self._move_offset, offset)
+        if self._mirror is not None:
+            self._mirror[2] += offset[self._mirror[0]]
+        return self
+
+    def mirror(self, axis_index, reverse=False):
+        """
+        Mirror at center (core), top to bottom, left to right, front to back
+
+        @param axis_index:  0: x left to right
+                            1: y top to bottom
+                            2: z front to back
+        @type axis_index: int
+        @param reverse: keep the lower half instead of the upper half
+        @type reverse: bool
+
+        @rtype: Transform
+        """
+        if axis_index not in (0, 1, 2):
+            raise RuntimeError("Unknown Axis index: {}".format(axis_index))
+        if self._mirror is not None:
+            raise RuntimeError("Only one mirror can be applied in a single pass")
+        self._mirror = [axis_index, reverse, self._core_position[axis_index]]
+        return self
+
+    def tilt_turn(self, tilt_index):
+        """
+        Turn or tilt around center (core)
+
+        @param tilt_index: integer representing a specific turn, see Vector.tilt_turn_position
+        @type tilt_index: int
+
+        @rtype: Transform
+        """
+        if tilt_index not in range(6):
+            raise RuntimeError("Unknown tilt index: {}".format(tilt_index))
+        turn_indexes = Vector._turn_indexes[tilt_index]
+        turn_multiplicators = Vector._turn_multiplicator[tilt_index]
+        core = self._core_position
+        self._indexes = [self._indexes[turn_indexes[axis]] for axis in range(3)]
+        self._multiplicators = [
+            turn_multiplicators[axis] * self._multiplicators[turn_indexes[axis]] for axis in range(3)]
+        self._translation = [
+            turn_multiplicators[axis] * (self._translation[turn_indexes[axis]] - core[turn_indexes[axis]]) + core[axis]
+            for axis in range(3)]
+        self._table = self._get_composed_table(self._table, orientation_tables.get_turn_table(tilt_index))
+        if self._mirror is not None:
+            axis_index, reverse, value = self._mirror
+            new_axis_index = turn_indexes.index(axis_index)
+            multiplicator = turn_multiplicators[new_axis_index]
+            self._mirror = [
+                new_axis_index,
+                reverse if multiplicator > 0 else not reverse,
+                multiplicator * (value - core[axis_index]) + core[new_axis_index]]
+        return self
+
+    @staticmethod
+    def _get_composed_table(table, table_next):
+        """
+        Table looking up one table and then the next
+
+        @type table: array | None
+        @type table_next: array
+
+        @rtype: array
+        """
+        if table is None:
+            return array('I', table_next)
+        if np is not None:
+            states = np.frombuffer(table, dtype=np.uint32)
+            composed = np.frombuffer(table_next, dtype=np.uint32)[(states & 0x7FF) | ((states >> 19) << 11)]
+            return array('I', composed.astype(np.uint32).tobytes())
+        get_table_index = orientation_tables.get_table_index
+        return array('I', [table_next[get_table_index(state)] for state in table])
+
+    # #######################################
+    # ###  Apply
+    # #######################################
+
+    def is_moving_blocks(self):
+        """
+        False if blocks stay where they are
+
+        @rtype: bool
+        """
+        return (
+            self._indexes != [0, 1, 2] or self._multiplicators != [1, 1, 1] or
+            self._translation != [0, 0, 0] or self._mirror is not None)
+
+    def get_move_offset(self):
+        """
+        Sum of all center moves, the offset blocks are moved by, ignoring turns
+
+        @rtype: (int, int, int)
+        """
+        return self._move_offset
+
+    def get_position(self, position):
+        """
+        @type position: (int, int, int)
+
+        @rtype: (int, int, int)
+        """
+        return tuple(
+            self._multiplicators[axis] * position[self._indexes[axis]] + self._translation[axis] for axis in range(3))
+
+    def get_indexes(self, position_indexes):
+        """
+        Position indexes mapped all at once
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: list[int] | numpy.ndarray
+
+        @rtype: list[int] | numpy.ndarray
+        """
+        if np is None:
+            return [Vector.get_index(self.get_position(Vector.get_position(index))) for index in position_indexes]
+        positions = Vector.get_positions(np.asarray(position_indexes, dtype=np.int64))
+        new_positions = positions[:, self._indexes] * np.array(self._multiplicators, dtype=np.int64)
+        return Vector.get_indexes(new_positions + np.array(self._translation, dtype=np.int64))
+
+    def get_box(self, min_vector, max_vector):
+        """
+        Box of all positions of a box after mapping them, and of their mirrored copies
+
+        @type min_vector: (int, int, int)
+        @type max_vector: (int, int, int)
+
+        @return: Minimum(x,y,z), Maximum(x,y,z)
+        @rtype: (int, int, int), (int, int, int)
+        """
+        corners = [self.get_position(min_vector), self.get_position(max_vector)]
+        if self._mirror is not None:
+            corners.extend([self.get_mirrored_position(corner) for corner in corners])
+        return tuple(map(min, *corners)), tuple(map(max, *corners))
+
+    def get_state(self, state):
+        """
+        @type state: int
+
+        @rtype: int
+        """
+        if self._table is None:
+            return state
+        return orientation_tables.transform(self._table, state)
+
+    # #######################################
+    # ###  Mirror
+    # #######################################
+
+    def has_mirror(self):
+        """
+        @rtype: bool
+        """
+        return self._mirror is not None
+
+    def get_side(self, position):
+        """
+        Side of the mirror plane a position, after mapping it, is on
+
+        @type position: (int, int, int)
+
+        @return: 1 if kept and mirrored, 0 if on the mirror plane, -1 if removed
+        @rtype: int
+        """
+        if self._mirror is None:
+            return 0
+        axis_index, reverse, value = self._mirror
+        if position[axis_index] == value:
+            return 0
+        if (position[axis_index] < value) == reverse:
+            return 1
+        return -1
+
+    def get_mirrored_position(self, position):
+        """
+        Mirrored copy of a position, after mapping it
+
+        @type position: (int, int, int)
+
+        @rtype: (int, int, int)
+        """
+        axis_index, _, value = self._mirror
+        position = list(position)
+        position[axis_index] = 2 * value - position[axis_index]
+        return tuple(position)
+
+    def get_mirrored_state(self, state):
+        """
+        Mirrored copy of a state, after mapping it
+
+        @type state: int
+
+        @rtype: int
+        """
+        return orientation_tables.mirror_state(state, self._mirror[0])
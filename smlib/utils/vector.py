@@ -1,4 +1,7 @@
-import struct
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class Vector(object):
@@ -9,6 +12,8 @@ class Vector(object):
     @staticmethod
     def get_index(position):
         """
+        Position packed into an int64, as if little-endian int16 x, y, z and 0 were read as a single integer.
+        Coordinates are not checked, they must be within the range of an int16, see Vector.is_in_range.
 
         @param position:
         @type position: (int, int, int)
@@ -16,8 +21,20 @@ class Vector(object):
         @return:
         @rtype: int
         """
-        tmp = struct.pack("<hhhh", position[0], position[1], position[2], 0)
-        return struct.unpack("<q", tmp)[0]
+        return (position[0] & 0xFFFF) | ((position[1] & 0xFFFF) << 16) | ((position[2] & 0xFFFF) << 32)
+
+    @staticmethod
+    def is_in_range(position):
+        """
+        True if each coordinate fits into an int16, and can be packed into a position index
+
+        @param position:
+        @type position: (int, int, int)
+
+        @rtype: bool
+        """
+        # a coordinate shifted by 2^15 is negative or above 16 bits if out of range
+        return not ((position[0] + 0x8000) | (position[1] + 0x8000) | (position[2] + 0x8000)) >> 16
 
     @staticmethod
     def get_position(position_index):
@@ -29,9 +46,50 @@ class Vector(object):
         @return:
         @rtype: (int, int, int)
         """
-        # assert isinstance(position_index, int), position_index
-        tmp = struct.pack("<q", position_index)
-        return tuple(struct.unpack("<hhhh", tmp)[:3])
+        # sign extension of each 16 bit field: (value ^ 0x8000) - 0x8000
+        return (
+            ((position_index & 0xFFFF) ^ 0x8000) - 0x8000,
+            (((position_index >> 16) & 0xFFFF) ^ 0x8000) - 0x8000,
+            (((position_index >> 32) & 0xFFFF) ^ 0x8000) - 0x8000)
+
+    @staticmethod
+    def get_indexes(positions):
+        """
+        Batch variant of get_index
+
+        @attention: requires numpy
+
+        @param positions: array of shape (n, 3) with x, y, z in each row
+        @type positions: numpy.ndarray
+
+        @return: position indexes, as returned by Vector.get_index
+        @rtype: numpy.ndarray
+        """
+        assert np is not None, "numpy is required"
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        assert len(positions) == 0 or (positions.min() >= -0x8000 and positions.max() < 0x8000), \
+            "Position out of range"
+        return (positions[:, 0] & 0xFFFF) | ((positions[:, 1] & 0xFFFF) << 16) | ((positions[:, 2] & 0xFFFF) << 32)
+
+    @staticmethod
+    def get_positions(position_indexes):
+        """
+        Batch variant of get_position
+
+        @attention: requires numpy
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: numpy.ndarray
+
+        @return: int64 array of shape (n, 3) with x, y, z in each row
+        @rtype: numpy.ndarray
+        """
+        assert np is not None, "numpy is required"
+        position_indexes = np.asarray(position_indexes, dtype=np.int64).reshape(-1)
+        positions = np.empty((len(position_indexes), 3), dtype=np.int64)
+        for axis in range(3):
+            positions[:, axis] = (((position_indexes >> (16 * axis)) & 0xFFFF) ^ 0x8000) - 0x8000
+        return positions
 
     @staticmethod
     def shift_position_index(position_index, offset):
@@ -43,10 +101,24 @@ class Vector(object):
         @return:
         @rtype: int
         """
-        # Vector
-        position = Vector.get_position(position_index)
-        new_position = Vector.addition(position, offset)
-        return Vector.get_index(new_position)
+        return Vector.shift_position_indexes(position_index, Vector.get_index(offset))
+
+    @staticmethod
+    def shift_position_indexes(position_indexes, index_offset):
+        """
+        Add a packed offset to packed positions, each coordinate wraps around on its own.
+        The high bit of each coordinate is added separately, so no carry crosses into the next coordinate.
+
+        @param position_indexes: position indexes, as returned by Vector.get_index
+        @type position_indexes: int | numpy.ndarray
+        @param index_offset: offset, as returned by Vector.get_index
+        @type index_offset: int
+
+        @rtype: int | numpy.ndarray
+        """
+        return (
+            ((position_indexes & 0x7FFF7FFF7FFF) + (index_offset & 0x7FFF7FFF7FFF)) ^
+            ((position_indexes ^ index_offset) & 0x800080008000))
 
     @staticmethod
     def addition(vector1, vector2):
@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 from unittest import TestCase
 from smbedit import SMBEdit
 from unittests.testinput import blueprint_handler
@@ -61,6 +64,18 @@ class TestSMBEdit(DefaultSetup):
                     debug=options.debug) as manipulator:
                 self.assertFalse(manipulator.run(), blueprint)
 
+    def test_memory(self):
+        for blueprint in self._blueprints:
+            options = Options()
+            options.path_input = blueprint
+            options.memory = True
+            with SMBEdit(
+                    options=options,
+                    logfile=options.logfile,
+                    verbose=options.verbose,
+                    debug=options.debug) as manipulator:
+                self.assertFalse(manipulator.run(), blueprint)
+
     def test_move_center(self):
         for blueprint in self._blueprints:
             options = Options()
@@ -109,6 +124,42 @@ class TestSMBEdit(DefaultSetup):
                     debug=options.debug) as manipulator:
                 self.assertFalse(manipulator.run(), blueprint)
 
+    def test_replace_file(self):
+        directory_output = tempfile.mkdtemp(prefix="test_smbedit")
+        try:
+            file_path = os.path.join(directory_output, "rules.txt")
+            with open(file_path, "w") as output_stream:
+                output_stream.write("# retexture\n598:507\nhull :a\ncolor grey:red\n")
+            for blueprint in self._blueprints:
+                options = Options()
+                options.path_input = blueprint
+                options.replace = "5:598"
+                options.replace_file = file_path
+                with SMBEdit(
+                        options=options,
+                        logfile=options.logfile,
+                        verbose=options.verbose,
+                        debug=options.debug) as manipulator:
+                    self.assertFalse(manipulator.run(), blueprint)
+        finally:
+            shutil.rmtree(directory_output)
+
+    def test_selection(self):
+        for blueprint in self._blueprints:
+            options = Options()
+            options.path_input = blueprint
+            options.replace = "598:507"
+            options.remove_blocks = "599"
+            options.mirror_axis = "x"
+            options.select_box = "-32,-32,-32:16,64,64"
+            options.select_chunks = "0,0,0;-1,0,0"
+            with SMBEdit(
+                    options=options,
+                    logfile=options.logfile,
+                    verbose=options.verbose,
+                    debug=options.debug) as manipulator:
+                self.assertFalse(manipulator.run(), blueprint)
+
     def test_remove_blocks(self):
         for blueprint in self._blueprints:
             options = Options()
@@ -288,6 +339,11 @@ class Options(object):
         self.verbose = False
         self.debug = True
         self.tmp_dir = None
+        self.jobs = 1
+        self.lazy = False
+        self.dense = False
+        self.index_block_ids = False
+        self.memory = False
         self.starmade_dir = None
         self.path_input = None
         self.path_output = None
@@ -307,6 +363,11 @@ class Options(object):
         self.reset_hull_shape = False
         self.replace_hull_blocks = None
         self.replace = None
+        self.replace_file = None
+
+        self.select_box = None
+        self.select_chunks = None
+        self.select_block_ids = None
 
         self.mirror_axis = None
 
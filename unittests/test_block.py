@@ -1,5 +1,6 @@
 from unittest import TestCase
 from smlib.smblueprint.smdblock.blockpool import block_pool, StyleBasic
+from smlib.smblueprint.smdblock.orientationtables import orientation_tables
 from smlib.utils.blockconfig import block_config
 
 __author__ = 'Peter Hofmann'
@@ -91,3 +92,50 @@ class TestBlock(DefaultSetup):
         rotations = self.object.get_rotations()
         axis_rotation = self.object.get_axis_rotation()
         self.assertTupleEqual((axis_rotation, rotations), expected_orientation)
+
+    def test_mirror_table(self):
+        # wedge, corner, hepta and tetra
+        for block_id in (599, 600, 601, 602):
+            for axis_rotation in range(8):
+                for rotations in range(4):
+                    block = block_pool(StyleBasic(block_id, 3).get_modified_int_24bit(
+                        block_id=block_id, hit_points=75, axis_rotation=axis_rotation, rotations=rotations))
+                    for axis_index, mirror in enumerate((block._mirror_x, block._mirror_y, block._mirror_z)):
+                        if (axis_rotation, rotations) not in getattr(
+                                block, "_orientation_to_str", getattr(block, "_orientation_to_tuple_str", {})):
+                            continue
+                        self.assertEqual(orientation_tables.mirror_state(block.get_int_24(), axis_index), mirror())
+
+    def test_turn(self):
+        self.object = self.object.get_turned(0)
+        expected_orientation = (0, 1)
+        self.assertTupleEqual((self.object.get_axis_rotation(), self.object.get_rotations()), expected_orientation)
+        self.assertEqual(self.object.get_hit_points(), 75)
+
+    def test_turn_inverse(self):
+        for block_id in (1, 5, 599, 600, 601, 602, 665):
+            for orientation in range(32):
+                block = block_pool(block_id | (orientation << 19))
+                # invalid orientations are turned into valid ones
+                block = block.get_turned(0).get_turned(1)
+                for tilt_index in range(6):
+                    # 0 and 1, 2 and 3, 4 and 5 turn into opposite directions
+                    inverse_index = tilt_index + 1 - 2 * (tilt_index % 2)
+                    turned = block.get_turned(tilt_index).get_turned(inverse_index)
+                    self.assertEqual(turned.get_int_24(), block.get_int_24())
+                    turned = block
+                    for _ in range(4):
+                        turned = turned.get_turned(tilt_index)
+                    self.assertEqual(turned.get_int_24(), block.get_int_24())
+
+    def test_pool_cache(self):
+        block_pool.reset_counters()
+        first = block_pool(599 | (5 << 19), 3)
+        second = block_pool(599 | (5 << 19), 3)
+        self.assertIs(first, second)
+        self.assertEqual(block_pool.hits, 1)
+        self.assertLessEqual(block_pool.misses, 1)
+        misses = block_pool.misses
+        self.assertIsNone(block_pool(0))
+        self.assertEqual(block_pool.misses, misses + 1)
+        self.assertEqual(block_pool.hits, 1)
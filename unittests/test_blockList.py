@@ -1,6 +1,8 @@
 from unittest import TestCase
 from smlib.utils.vector import Vector
 from smlib.utils.blocklist import BlockList
+from smlib.utils.blockconfig import block_config
+from smlib.smblueprint.smdblock.blockpool import block_pool
 
 
 __author__ = 'Peter Hofmann'
@@ -18,6 +20,7 @@ class DefaultSetup(TestCase):
 
     def setUp(self):
         self.object = BlockList()
+        block_config.from_hard_coded()
 
     def tearDown(self):
         self.object = None
@@ -33,4 +36,153 @@ class TestBlockList(DefaultSetup):
                     result = Vector.get_position(Vector.get_index(expected_position))
                     self.assertTupleEqual(expected_position, result)
 
+    def test_search_segments(self):
+        positions = [(x, y, z) for x in range(-40, 40, 3) for y in range(-70, 70, 5) for z in (-33, -1, 0, 31, 32)]
+        for position in positions:
+            self.object[position] = block_pool(5)
+        self.object[(-1, -64, 31)] = block_pool(1)
+        self.object[(100, 100, 100)] = block_pool(598)
+        self.assertEqual(self.object.search(1), (-1, -64, 31))
+        self.assertEqual(self.object.search(598), (100, 100, 100))
+        self.assertIsNone(self.object.search(2))
+        self.object.pop((-1, -64, 31))
+        self.assertIsNone(self.object.search(1))
+        self.object[(100, 100, 100)] = block_pool(5)
+        self.assertEqual(self.object.search_all({598}), set())
+        self.object.set_states([Vector.get_index((-33, 0, 0)), Vector.get_index((-34, 0, 0))], [1, 598])
+        self.assertEqual(self.object.search_all({1, 598}), {Vector.get_index((-33, 0, 0)), Vector.get_index((-34, 0, 0))})
+        self.object.remove_blocks([5])
+        self.assertEqual(len(self.object), 2)
+        self.object.move_positions((64, 0, 0))
+        self.assertEqual(self.object.search(598), (30, 0, 0))
+        self.assertEqual(len(self.object.search_all({1, 598})), 2)
+
+    def test_index_block_ids(self):
+        expected = BlockList()
+        for position in [(x, y, z) for x in range(-40, 40, 3) for y in range(-70, 70, 5) for z in (-33, 0, 32)]:
+            block = block_pool(5 if (position[0] + position[1]) % 2 else 598)
+            self.object[position] = block
+            expected[position] = block
+        self.object.index_block_ids()
+        for block_list in (self.object, expected):
+            block_list[(-1, -64, 31)] = block_pool(1)
+            block_list[(2, 0, 0)] = block_pool(2)
+            block_list[(2, 0, 0)] = block_pool(599)
+            block_list.set_states([Vector.get_index((-33, 0, 0)), Vector.get_index((2, 0, 0))], [1, 2])
+            block_list.pop((-1, -64, 31))
+        self.assertSetEqual(self.object.get_block_ids(), {1, 2, 5, 598})
+        self.assertSetEqual(self.object.get_block_ids(), expected.get_block_ids())
+        for block_ids in ({1}, {2}, {5, 598}, {599}, {3}):
+            self.assertSetEqual(self.object.search_all(block_ids), expected.search_all(block_ids))
+        self.assertEqual(self.object.search(1), (-33, 0, 0))
+        self.object.remove_blocks({598})
+        expected.remove_blocks({598})
+        self.assertSetEqual(self.object.get_block_ids(), {1, 2, 5})
+        self.object.move_positions((64, 0, 0))
+        self.assertEqual(self.object.search(2), (66, 0, 0))
+        self.assertEqual(len(self.object.search_all({5})), len(expected.search_all({5})))
+
+    def test_bulk(self):
+        expected = BlockList()
+        position_indexes = [Vector.get_index((x, y, -x)) for x in range(-40, 40, 3) for y in range(-70, 70, 5)]
+        blocks = [block_pool(5 if index % 3 else 598) for index in range(len(position_indexes))]
+        self.object.set_many(position_indexes, blocks)
+        for position_index, block in zip(position_indexes, blocks):
+            expected[position_index] = block
+        self.assertDictEqual(dict(self.object.items()), dict(expected.items()))
+        self.assertSetEqual(self.object.get_distinct_states(), {5, 598})
+        self.assertSetEqual(self.object.get_distinct_states({598}), {598})
+        self.assertListEqual(self.object.pop_many(position_indexes[:10]), blocks[:10])
+        self.assertEqual(len(self.object), len(position_indexes) - 10)
+        self.object.map_states({598: 599, 5: 0})
+        self.assertSetEqual(self.object.get_block_ids(), {599})
+        self.assertEqual(len(self.object), len([block for block in blocks[10:] if block.get_id() == 598]))
+        self.assertSetEqual(self.object.search_all({599}), set(self.object.keys()))
+        self.object.move_positions((-3, 1000, 7))
+        self.assertSetEqual(
+            set(self.object.keys()),
+            set(Vector.shift_position_index(position_index, (-3, 1000, 7))
+                for position_index, block in zip(position_indexes[10:], blocks[10:]) if block.get_id() == 598))
+
+    def assertCounts(self, block_list):
+        block_id_to_quantity = {}
+        min_vector = [16, 16, 16]
+        max_vector = [16, 16, 16]
+        for position, block in block_list.items():
+            block_id_to_quantity[block.get_id()] = block_id_to_quantity.get(block.get_id(), 0) + 1
+            min_vector = list(map(min, min_vector, position))
+            max_vector = list(map(max, max_vector, position))
+        self.assertDictEqual(block_list.get_block_id_to_quantity(), block_id_to_quantity)
+        self.assertEqual(block_list.get_min_max_vector(), (tuple(min_vector), tuple(max_vector)))
+
+    def test_counts(self):
+        self.assertCounts(self.object)
+        position_indexes = [Vector.get_index((x, y, x - y)) for x in range(-300, 40, 7) for y in range(-20, 90, 11)]
+        self.object.set_states(position_indexes, [5, 598, 0, 2] * (len(position_indexes) // 4) + [5] * (len(position_indexes) % 4))
+        self.assertCounts(self.object)
+        self.object[(1000, -1000, 0)] = block_pool(599)
+        self.object[(1000, -1000, 0)] = block_pool(5)
+        self.assertCounts(self.object)
+        self.object.pop((1000, -1000, 0))
+        self.object.pop_many(position_indexes[:8:4])
+        self.assertCounts(self.object)
+        self.object.map_states({598: 0, 2: 599})
+        self.object.remove_blocks({5})
+        self.assertCounts(self.object)
+        self.object.move_positions((-20000, 5, 32000))
+        self.assertCounts(self.object)
+        list(self.object.pop_positions())
+        self.assertCounts(self.object)
+
+    def test_snapshot(self):
+        position_indexes = [Vector.get_index((x, y, x - y)) for x in range(-300, 40, 7) for y in range(-20, 90, 11)]
+        self.object.set_many(position_indexes, [block_pool(598), block_pool(5)] * (len(position_indexes) // 2))
+        expected = dict(self.object.items())
+        snapshot = self.object.snapshot()
+        self.assertEqual(len(snapshot.segment_index_to_content), 0)
+        self.object[(0, 0, 0)] = block_pool(599)
+        self.assertSetEqual(set(snapshot.segment_index_to_content), {Vector.get_index((0, 0, 0))})
+        self.object.pop_many(position_indexes[:20])
+        self.object.map_states({598: 2})
+        self.object.move_positions((3, -40, 5))
+        modified = dict(self.object.items())
+        snapshot_redo = self.object.snapshot()
+        self.object.restore(snapshot)
+        self.assertDictEqual(dict(self.object.items()), expected)
+        self.assertCounts(self.object)
+        self.object.restore(snapshot_redo)
+        self.assertDictEqual(dict(self.object.items()), modified)
+        self.assertCounts(self.object)
+        self.object.restore(snapshot)
+        self.assertDictEqual(dict(self.object.items()), expected)
+        self.assertRaises(AssertionError, self.object.restore, BlockList().snapshot())
+
+    def test_spatial_index(self):
+        position_indexes = [Vector.get_index((x, y, x - y)) for x in range(-40, 40, 3) for y in range(-20, 36, 2)]
+        self.object.set_many(position_indexes, [block_pool(598)] * len(position_indexes))
+        positions = set(self.object)
+        self.assertEqual(self.object.get_neighbourhood((100, 100, 100)), 0)
+        for position in [(-1, 0, -1), (0, 0, 0), (-31, -31, 0), (32, 31, 1), (2, -20, 22)]:
+            occupancy = 0
+            for bit, offset in enumerate([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]):
+                if Vector.addition(position, offset) in positions:
+                    occupancy |= 1 << bit
+            self.assertEqual(self.object.get_neighbourhood(position), occupancy)
+        min_vector, max_vector = (-5, -33, -40), (40, 2, 31)
+        expected = set(
+            Vector.get_index(position) for position in positions
+            if all(low <= value <= high for value, low, high in zip(position, min_vector, max_vector)))
+        self.assertSetEqual(set(position_index for position_index, _ in self.object.blocks_in_box(min_vector, max_vector)), expected)
+        occupancy = self.object.get_box_occupancy(min_vector, max_vector)
+        self.assertEqual(bin(occupancy).count("1"), len(expected))
+        # kept up to date
+        self.object.pop_many(position_indexes[::2])
+        self.object[(3, 2, 1)] = block_pool(5)
+        self.object.move_positions((1, 1, 1))
+        positions = set(self.object)
+        self.assertSetEqual(
+            set(Vector.get_position(position_index) for position_index, _ in self.object.blocks_in_box((-99, -99, -99), (99, 99, 99))),
+            positions)
+        self.assertEqual(self.object.get_neighbourhood((4, 3, 2)) >> 13 & 1, 1)
+
     # TODO: more tests
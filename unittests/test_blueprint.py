@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+try:
+    # python 2, accepts native strings
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+from smlib.blueprint import Blueprint
+from unittests.testinput import blueprint_handler
+from smlib.utils.blockconfig import block_config
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type object: Blueprint
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.object = None
+        self._blueprints = blueprint_handler
+        self.directory_output = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        self.object = Blueprint("ENTITY_SHIP_Main")
+        self.directory_output = tempfile.mkdtemp(prefix="test_blueprint")
+
+    def tearDown(self):
+        self.object = None
+        shutil.rmtree(self.directory_output)
+
+
+class TestBlueprint(DefaultSetup):
+    def test_transform(self):
+        for index, directory_blueprint in enumerate(self._blueprints):
+            directory_source = os.path.join(self.directory_output, "source{}".format(index))
+            directory_expected = os.path.join(self.directory_output, "expected{}".format(index))
+            directory_result = os.path.join(self.directory_output, "result{}".format(index))
+            for directory in (directory_source, directory_expected, directory_result):
+                os.mkdir(directory)
+            self.object = Blueprint("ENTITY_SHIP_Main")
+            self.object.read(directory_blueprint)
+            block_ids = set(self.object.smd3.get_block_id_to_quantity()) - {1}
+            self.object.write(directory_source)
+
+            self.object = Blueprint("ENTITY_SHIP_Main")
+            self.object.read(directory_source)
+            self.object.remove_blocks(block_ids)
+            self.object.write(directory_expected)
+            expected = self.object.header.block_id_to_quantity
+
+            self.object = Blueprint("ENTITY_SHIP_Main")
+            self.object.transform(
+                directory_source, directory_result, [lambda block_list: block_list.remove_blocks(block_ids)])
+            self.assertDictEqual(self.object.header.block_id_to_quantity, expected, directory_blueprint)
+            # region positions, without the blueprint name
+            self.assertListEqual(
+                sorted(file_name.split('.', 1)[1] for file_name in os.listdir(os.path.join(directory_expected, "DATA"))),
+                sorted(file_name.split('.', 1)[1] for file_name in os.listdir(os.path.join(directory_result, "DATA"))),
+                directory_blueprint)
+
+            # region files of blocks removed are not overwritten
+            self.object = Blueprint("ENTITY_SHIP_Main")
+            self.assertRaises(
+                AssertionError, self.object.transform,
+                directory_source, directory_source, [lambda block_list: block_list.remove_blocks(block_ids)])
+            self.object = Blueprint("ENTITY_SHIP_Main")
+            self.object.read(directory_source)
+            self.assertEqual(
+                sum(self.object.smd3.get_block_id_to_quantity().values()),
+                sum(self.object.header.block_id_to_quantity.values()), directory_blueprint)
+
+    def test_summary_to_stream(self):
+        for directory_blueprint in self._blueprints:
+            for is_docked_entity in (False, True):
+                # verbose, to include the box
+                expected = StringIO()
+                self.object = Blueprint("ENTITY_SHIP_Main", verbose=True)
+                self.object.read(directory_blueprint)
+                self.object.replace_outdated_docker_modules("ENTITY_SHIP_RAIL_DOCK_", is_docked_entity)
+                self.object.to_stream(expected)
+
+                result = StringIO()
+                self.object = Blueprint("ENTITY_SHIP_Main", verbose=True)
+                self.object.summary_to_stream(directory_blueprint, "ENTITY_SHIP_RAIL_DOCK_", is_docked_entity, result)
+                # block quantities are not in the same order
+                self.assertListEqual(
+                    sorted(result.getvalue().splitlines()), sorted(expected.getvalue().splitlines()),
+                    directory_blueprint)
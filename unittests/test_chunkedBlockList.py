@@ -0,0 +1,173 @@
+import random
+from unittest import TestCase
+from smlib.utils.vector import Vector
+from smlib.utils.blocklist import BlockList, np
+from smlib.utils.chunkedblocklist import ChunkedBlockList
+from smlib.utils.blockconfig import block_config
+from smlib.smblueprint.smdblock.blockpool import block_pool
+
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type object: ChunkedBlockList
+    @type expected: BlockList
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.object = None
+        self.expected = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        self.object = ChunkedBlockList()
+        self.expected = BlockList()
+        random.seed(0)
+        for _ in range(2000):
+            position = tuple(random.randint(-70, 70) for _ in range(3))
+            block = block_pool(random.choice((5, 598, 599, 2)))
+            self.object[position] = block
+            self.expected[position] = block
+
+    def tearDown(self):
+        self.object = None
+        self.expected = None
+
+    def assertSameBlocks(self):
+        self.assertEqual(len(self.object), len(self.expected))
+        self.assertEqual(dict(self.object.items()), dict(self.expected.items()))
+
+
+class TestChunkedBlockList(DefaultSetup):
+    def test_set_get(self):
+        self.assertSameBlocks()
+        for position, block in self.expected.items():
+            self.assertTrue(self.object.has_block_at(position))
+            self.assertIs(self.object[position], block)
+        self.assertFalse(self.object.has_block_at((1000, 1000, 1000)))
+        self.assertEqual(sorted(self.object.keys()), sorted(self.expected.keys()))
+
+    def test_pop(self):
+        for position in list(self.expected)[:500]:
+            self.assertIs(self.object.pop(position), self.expected.pop(position))
+        self.assertSameBlocks()
+        for position in list(self.expected):
+            self.object.pop(position)
+        self.assertEqual(len(self.object), 0)
+        self.assertEqual(len(self.object._chunk_index_to_states), 0)
+
+    def test_set_states(self):
+        position_indexes = [Vector.get_index((x, -x, 40)) for x in range(-40, 40)]
+        states = [random.choice((0, 5, 598, 2)) for _ in position_indexes]
+        self.object.set_states(position_indexes, states)
+        self.expected.set_states(position_indexes, states)
+        self.assertSameBlocks()
+        if np is None:
+            return
+        position_indexes = np.array([Vector.get_index((x, 3, -x)) for x in range(-40, 40)], dtype=np.int64)
+        states = np.array([random.choice((0, 5, 599, 2)) for _ in position_indexes], dtype=np.int32)
+        self.object.set_states(position_indexes, states)
+        self.expected.set_states(position_indexes, states)
+        self.assertSameBlocks()
+
+    def test_search(self):
+        self.object[(-1, -64, 31)] = block_pool(1)
+        self.assertEqual(self.object.search(1), (-1, -64, 31))
+        self.assertIsNone(self.object.search(3))
+        self.assertEqual(self.object.search_all({598, 2}), self.expected.search_all({598, 2}))
+        self.object.pop((-1, -64, 31))
+        self.assertIsNone(self.object.search(1))
+        self.object.remove_blocks({5})
+        self.expected.remove_blocks({5})
+        self.assertSameBlocks()
+
+    def test_iter_states(self):
+        for block_ids in (None, {5}, {598, 2}, {3}):
+            self.assertDictEqual(dict(self.object.iter_states(block_ids)), dict(self.expected.iter_states(block_ids)))
+        self.object.remove_blocks({598, 599, 2})
+        self.expected.remove_blocks({598, 599, 2})
+        self.assertSameBlocks()
+        self.assertSetEqual(self.object.get_block_ids(), {5})
+        self.object.remove_blocks({5})
+        self.assertEqual(len(self.object), 0)
+        self.assertEqual(len(self.object._chunk_index_to_states), 0)
+
+    def test_bulk(self):
+        position_indexes = [Vector.get_index((x, 40, -x)) for x in range(-40, 40)]
+        blocks = [block_pool(random.choice((5, 598, 2))) for _ in position_indexes]
+        self.object.set_many(position_indexes, blocks)
+        self.expected.set_many(position_indexes, blocks)
+        self.assertSameBlocks()
+        self.assertSetEqual(self.object.get_distinct_states(), self.expected.get_distinct_states())
+        self.assertSetEqual(self.object.get_distinct_states({5, 2}), self.expected.get_distinct_states({5, 2}))
+        self.assertListEqual(self.object.pop_many(position_indexes[:20]), self.expected.pop_many(position_indexes[:20]))
+        self.assertSameBlocks()
+        table = {598: 599, 2: 0, 5: block_pool(5).get_modified_block(block_id=2).get_int_24()}
+        self.object.map_states(table)
+        self.expected.map_states(table)
+        self.assertSameBlocks()
+        self.assertSetEqual(self.object.get_block_ids(), {2, 599})
+
+    def test_counts(self):
+        self.assertDictEqual(self.object.get_block_id_to_quantity(), self.expected.get_block_id_to_quantity())
+        self.assertEqual(self.object.get_min_max_vector(), self.expected.get_min_max_vector())
+        for block_list in (self.object, self.expected):
+            block_list.remove_blocks({598})
+            block_list.map_states({5: 0, 2: 599})
+        position_indexes = list(self.expected.keys())[:100]
+        for block_list in (self.object, self.expected):
+            block_list.pop_many(position_indexes)
+        self.assertSameBlocks()
+        self.assertDictEqual(self.object.get_block_id_to_quantity(), self.expected.get_block_id_to_quantity())
+        self.assertEqual(self.object.get_min_max_vector(), self.expected.get_min_max_vector())
+
+    def test_snapshot(self):
+        expected = dict(self.expected.items())
+        snapshot = self.object.snapshot()
+        position_indexes = list(self.expected.keys())[:100]
+        for block_list in (self.object, self.expected):
+            block_list[(1000, 1000, 1000)] = block_pool(5)
+            block_list.pop_many(position_indexes)
+            block_list.map_states({5: 599, 2: 0})
+        self.assertSameBlocks()
+        snapshot_redo = self.object.snapshot()
+        self.object.restore(snapshot)
+        self.assertEqual(dict(self.object.items()), expected)
+        self.object.restore(snapshot_redo)
+        self.assertSameBlocks()
+        self.assertDictEqual(self.object.get_block_id_to_quantity(), self.expected.get_block_id_to_quantity())
+        self.assertEqual(self.object.get_min_max_vector(), self.expected.get_min_max_vector())
+        self.object.move_positions((64, -3, 17))
+        self.object.restore(snapshot)
+        self.assertEqual(dict(self.object.items()), expected)
+        self.assertEqual(len(self.object), len(expected))
+        self.assertNotIn(Vector.get_index((1000, 1000, 1000)) & BlockList._segment_mask, self.object._chunk_index_to_states)
+
+    def test_spatial_index(self):
+        for position in [(0, 0, 0), (-32, 31, 5), (17, -64, 63)]:
+            self.assertEqual(self.object.get_neighbourhood(position), self.expected.get_neighbourhood(position))
+        self.assertEqual(
+            self.object.get_box_occupancy((-40, -3, -70), (20, 5, 70)),
+            self.expected.get_box_occupancy((-40, -3, -70), (20, 5, 70)))
+        for block_list in (self.object, self.expected):
+            block_list.map_states({5: 0})
+            block_list[(0, 0, 0)] = block_pool(2)
+        self.assertEqual(self.object.get_neighbourhood((0, 0, 1)), self.expected.get_neighbourhood((0, 0, 1)))
+        self.assertEqual(
+            dict(self.object.blocks_in_box((-10, -60, 3), (70, 20, 40))),
+            dict(self.expected.blocks_in_box((-10, -60, 3), (70, 20, 40))))
+
+    def test_move_positions(self):
+        self.object.move_positions((64, -3, 17))
+        self.expected.move_positions((64, -3, 17))
+        self.assertSameBlocks()
+        self.assertDictEqual(self.object.get_block_id_to_quantity(), self.expected.get_block_id_to_quantity())
+        self.assertEqual(self.object.get_min_max_vector(), self.expected.get_min_max_vector())
+        for block_list in (self.object, self.expected):
+            block_list.move_positions((-32700, 32700, 0))
+        self.assertSameBlocks()
+        self.assertEqual(dict(self.object.pop_positions()), dict(self.expected.pop_positions()))
+        self.assertEqual(len(self.object), 0)
@@ -0,0 +1,72 @@
+import sys
+from unittest import TestCase
+try:
+    # python 2, accepts native strings
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+from smlib.utils.footprint import get_size, PeakMemory, MemoryFootprint, tracemalloc
+from smlib.utils.blockconfig import block_config
+from smlib.utils.blocklist import BlockList
+from smlib.smblueprint.smdblock.blockpool import block_pool
+
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type object: BlockList
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.object = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        self.object = BlockList()
+        for x in range(100):
+            self.object[(x, 0, 0)] = block_pool(598)
+
+    def tearDown(self):
+        self.object = None
+
+
+class TestFootprint(DefaultSetup):
+    def test_get_size(self):
+        values = [1000000 + index for index in range(100)]
+        size = get_size(values)
+        self.assertEqual(size, sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values))
+        # shared objects are counted once
+        self.assertEqual(get_size([values, values]), size + sys.getsizeof([values, values]))
+        seen = set()
+        self.assertEqual(get_size(values, seen), size)
+        self.assertEqual(get_size(values, seen), 0)
+        size_block_list = get_size(self.object)
+        for x in range(100, 200):
+            self.object[(x, 0, 0)] = block_pool(598)
+        self.assertGreater(get_size(self.object), size_block_list)
+        block = self.object[(0, 0, 0)]
+        self.assertLess(get_size(self.object, exclude_types=(type(block), )), get_size(self.object))
+
+    def test_peak_memory(self):
+        with PeakMemory(enabled=False) as peak_memory:
+            pass
+        self.assertIsNone(peak_memory.peak)
+        if tracemalloc is None:
+            return
+        with PeakMemory() as peak_memory:
+            values = [index for index in range(100000)]
+            del values
+        self.assertGreater(peak_memory.peak, 100000 * 8)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_to_stream(self):
+        footprint = MemoryFootprint(number_of_blocks=len(self.object), number_of_states=len(block_pool))
+        footprint.component_to_size["block list"] = get_size(self.object)
+        footprint.stage_to_peak["read"] = 2048
+        output_stream = StringIO()
+        footprint.to_stream(output_stream)
+        self.assertIn("Blocks: 100\n", output_stream.getvalue())
+        self.assertIn("Peak during read: 2.0 KiB\n", output_stream.getvalue())
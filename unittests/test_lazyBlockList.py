@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from smlib.smblueprint.smd3.smd import Smd
+from smlib.smblueprint.smd3.lazyblocklist import LazyBlockList
+from smlib.smblueprint.smdblock.blockpool import block_pool
+from smlib.utils.blockconfig import block_config
+from smlib.utils.vector import Vector
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type object: LazyBlockList
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.object = None
+        self.directory_output = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        self.directory_output = tempfile.mkdtemp(prefix="test_lazy")
+        self.positions = [(16, 16, 16), (48, 16, 16), (16, 80, 16), (300, 16, 16), (-300, -20, 16)]
+        smd = Smd()
+        for position in self.positions:
+            smd.add_block(block_pool(5), position)
+        smd.write(self.directory_output, "lazy")
+        smd.read(self.directory_output, lazy=True)
+        self.object = smd.get_block_list()
+        self.object._cache_size = 1
+
+    def tearDown(self):
+        self.object = None
+        shutil.rmtree(self.directory_output)
+
+
+class TestLazyBlockList(DefaultSetup):
+    def test_open(self):
+        self.assertIsInstance(self.object, LazyBlockList)
+        self.assertEqual(len(self.object._position_index_to_instance), 0)
+        self.assertEqual(len(self.object._segment_to_source), len(self.positions))
+
+    def test_cache_size(self):
+        for position in self.positions:
+            self.assertTrue(self.object.has_block_at(position))
+            self.assertEqual(len(self.object._position_index_to_instance), 1)
+        self.assertEqual(len(self.object), len(self.positions))
+        self.assertEqual(len(self.object._position_index_to_instance), 1)
+
+    def test_modified_segments_kept(self):
+        self.object[(17, 16, 16)] = block_pool(5)
+        self.object.pop((48, 16, 16))
+        for position in self.positions:
+            self.object.has_block_at(position)
+        self.assertTrue(self.object.has_block_at((17, 16, 16)))
+        self.assertFalse(self.object.has_block_at((48, 16, 16)))
+        self.assertEqual(len(self.object), len(self.positions))
+        self.assertEqual(self.object.search_all({5}), set(self.object.keys()))
+
+    def test_search_skips_segments(self):
+        self.assertEqual(len(self.object), len(self.positions))
+        decoded = []
+        decode = self.object._decode
+
+        def decode_counted(segment_position):
+            decoded.append(segment_position)
+            return decode(segment_position)
+        self.object._decode = decode_counted
+        self.assertIsNone(self.object.search(1))
+        self.assertEqual(self.object.search_all({2, 3}), set())
+        self.assertEqual(decoded, [])
+        self.assertEqual(len(self.object.search_all({5})), len(self.positions))
+
+    def test_move_positions(self):
+        self.object.move_positions((1, 0, 0))
+        self.assertTrue(self.object.has_block_at((301, 16, 16)))
+        self.assertFalse(self.object.has_block_at((300, 16, 16)))
+        self.assertEqual(len(self.object), len(self.positions))
+
+    def test_neighbourhood(self):
+        self.object[(17, 16, 16)] = block_pool(5)
+        self.assertEqual(self.object.get_neighbourhood((17, 16, 16)), (1 << 13) | (1 << 4))
+        self.object[(18, 16, 16)] = block_pool(5)
+        self.assertEqual(self.object.get_neighbourhood((17, 16, 16)) >> 22 & 1, 1)
+        self.object.pop((18, 16, 16))
+        self.assertFalse(self.object.has_block_at((18, 16, 16)))
+        self.assertEqual(self.object.get_neighbourhood((17, 16, 16)) >> 22 & 1, 0)
+        self.object.pop((16, 16, 16))
+        self.assertEqual(self.object.get_neighbourhood(Vector.get_index((17, 16, 16))), 1 << 13)
+
+    def test_map_states(self):
+        self.object.map_states({5: 598})
+        self.assertEqual(self.object.get_distinct_states(), {598})
+        self.assertEqual(len(self.object._segment_to_source), 0)
+        self.object.map_states({598: 0})
+        self.assertEqual(len(self.object), 0)
@@ -5,6 +5,7 @@ from smlib.utils.smbinarystream import SMBinaryStream
 from smlib.smblueprint.logic import Logic
 from smlib.smblueprint.smd3.smd import Smd
 from smlib.utils.blockconfig import block_config
+from smlib.utils.transform import Transform
 from unittests.testinput import blueprint_handler
 
 __author__ = 'Peter Hofmann'
@@ -172,6 +173,21 @@ class TestLogic(DefaultSetup):
         self.object.move_center(directory_vector, 0)
         self.assertDictEqual(expected_controller, self.object._controller_position_to_block_id_to_block_positions)
 
+    def test_apply_transform(self):
+        for directory_blueprint in self._blueprints:
+            self.object = Logic()
+            self.object.read(directory_blueprint)
+            self.object.move_center((3, -2, 5))
+            self.object.mirror(1)
+            self.object.tilt_turn(0)
+            self.object._clean_up()
+            expected = self.object._controller_position_to_block_id_to_block_positions
+            self.object = Logic()
+            self.object.read(directory_blueprint)
+            self.object.apply_transform(Transform().move_center((3, -2, 5)).mirror(1).tilt_turn(0))
+            self.object._clean_up()
+            self.assertDictEqual(expected, self.object._controller_position_to_block_id_to_block_positions)
+
     def test__update_groups(self):
         initial_set_of_positions0 = set()
         initial_set_of_positions0.add((16, 16, 16))
@@ -0,0 +1,75 @@
+import random
+from unittest import TestCase
+from smlib.utils.replace import Replace, ReplaceRules
+from smlib.utils.blocklist import BlockList
+from smlib.utils.chunkedblocklist import ChunkedBlockList
+from smlib.utils.blockconfig import block_config
+from smlib.smblueprint.smdblock.blockpool import block_pool
+
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type block_lists: list[BlockList]
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.block_lists = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        random.seed(0)
+        self.block_lists = [BlockList(), ChunkedBlockList()]
+        for _ in range(500):
+            position = tuple(random.randint(-40, 40) for _ in range(3))
+            # hull, standard armor, wedge, core
+            block = block_pool(random.choice((5, 598, 599, 1))).get_modified_block(rotations=random.randint(0, 3))
+            for block_list in self.block_lists:
+                block_list[position] = block
+
+    def tearDown(self):
+        self.block_lists = None
+
+
+class TestReplace(DefaultSetup):
+    def test_replace_hull(self):
+        wedge = dict((position, block) for position, block in self.block_lists[0].items() if block.get_id() == 599)
+        for block_list in self.block_lists:
+            Replace(block_list).replace_hull(1, hull_type=0)
+            self.assertNotIn(598, block_list.get_block_ids())
+            self.assertNotIn(599, block_list.get_block_ids())
+            self.assertIn(1, block_list.get_block_ids())
+            for position, block in wedge.items():
+                new_block = block_list[position]
+                self.assertEqual(new_block.get_id(), 293)
+                self.assertEqual(new_block.get_rotations(), block.get_rotations())
+        self.assertDictEqual(dict(self.block_lists[0].items()), dict(self.block_lists[1].items()))
+
+    def test_table_reused(self):
+        Replace(self.block_lists[0]).replace_hull(1, hull_type=0)
+        state_to_state = Replace._key_to_state_to_state[("hull", 1, 0)]
+        number_of_states = len(state_to_state)
+        self.assertEqual(number_of_states, len(self.block_lists[1].get_distinct_states()))
+        Replace(self.block_lists[1]).replace_hull(1, hull_type=0)
+        self.assertIs(Replace._key_to_state_to_state[("hull", 1, 0)], state_to_state)
+        self.assertEqual(len(state_to_state), number_of_states)
+        block_config.from_hard_coded()
+        Replace(self.block_lists[1]).replace_blocks(5, 2)
+        self.assertNotIn(("hull", 1, 0), Replace._key_to_state_to_state)
+        self.assertNotIn(5, self.block_lists[1].get_block_ids())
+
+    def test_replace_by_rules(self):
+        rules = ReplaceRules()
+        rules.from_string("598:5, hull h:a  # to advanced armor\ncolor grey:red")
+        self.assertEqual(len(rules), 3)
+        expected = self.block_lists[0].get_block_id_to_quantity()
+        for block_list in self.block_lists:
+            quantities = Replace(block_list).replace_by_rules(rules)
+            self.assertListEqual(quantities, [expected[598], expected[599], expected[5] + expected[598] + expected[599]])
+            # red standard armor and red advanced armor wedges
+            self.assertSetEqual(block_list.get_block_ids(), {1, 76, 313})
+        self.assertDictEqual(dict(self.block_lists[0].items()), dict(self.block_lists[1].items()))
+        self.assertRaises(AssertionError, rules.from_string, "hull x:a")
@@ -0,0 +1,104 @@
+import random
+from unittest import TestCase
+from smlib.utils.selection import Selection
+from smlib.utils.replace import Replace
+from smlib.utils.blocklist import BlockList
+from smlib.utils.chunkedblocklist import ChunkedBlockList
+from smlib.utils.vector import Vector
+from smlib.utils.blockconfig import block_config
+from smlib.utils.transform import Transform
+from smlib.smblueprint.smdblock.blockpool import block_pool
+from smlib.smblueprint.smd3.smd import Smd
+
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type block_lists: list[BlockList]
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.block_lists = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        random.seed(0)
+        self.block_lists = [BlockList(), ChunkedBlockList()]
+        for _ in range(1000):
+            position = tuple(random.randint(-40, 40) for _ in range(3))
+            # hull, standard armor, wedge
+            block = block_pool(random.choice((5, 598, 599))).get_modified_block(rotations=random.randint(0, 3))
+            for block_list in self.block_lists:
+                block_list[position] = block
+
+    def tearDown(self):
+        self.block_lists = None
+
+
+class TestSelection(DefaultSetup):
+    def test_from_strings(self):
+        selection = Selection.from_strings(box="5,-3,2:-1,4,0", chunks="0,0,0; -1,0,0", block_ids="5, 598")
+        self.assertListEqual(selection.get_boxes(), [((-1, 0, 0), (-1, 4, 2)), ((0, 0, 0), (5, 4, 2))])
+        self.assertSetEqual(selection.get_block_ids(), {5, 598})
+        self.assertTrue(selection.contains((0, 0, 0), 5))
+        self.assertFalse(selection.contains((0, 0, 0), 599))
+        self.assertFalse(selection.contains((6, 0, 0), 5))
+        self.assertIsNone(Selection().get_boxes())
+        self.assertRaises(AssertionError, Selection.from_strings, box="0,0,0")
+
+    def test_blocks_in_selection(self):
+        selections = [
+            Selection((-5, -33, -40), (40, 2, 31)),
+            Selection(chunks=[(0, 0, 0), (-1, -1, 0)], block_ids=[598, 599]),
+            Selection((-10, -10, -10), (10, 10, 10), chunks=[(-1, 0, -1)], predicate=lambda block_id: block_id != 5),
+            Selection(block_ids=[599]),
+        ]
+        for block_list in self.block_lists:
+            for selection in selections:
+                expected = set(
+                    Vector.get_index(position) for position, block in block_list.items()
+                    if selection.contains(position, block.get_id()))
+                result = [position_index for position_index, _ in block_list.blocks_in_selection(selection)]
+                self.assertEqual(len(result), len(expected))
+                self.assertSetEqual(set(result), expected)
+
+    def test_replace(self):
+        selection = Selection((-20, -20, -20), (0, 0, 0))
+        for block_list in self.block_lists:
+            blocks = dict(block_list.items())
+            Replace(block_list, selection).replace_blocks(598, 5)
+            for position, block in block_list.items():
+                if block.get_id() == 598:
+                    self.assertFalse(selection.contains_position(position))
+                elif blocks[position].get_id() == 598:
+                    self.assertTrue(selection.contains_position(position))
+                    self.assertEqual(block.get_id(), 5)
+                else:
+                    self.assertIs(block, blocks[position])
+
+    def test_remove_and_mirror(self):
+        selection = Selection((0, 0, 0), (31, 31, 31), block_ids=[598])
+        smd = Smd()
+        for position, block in self.block_lists[0].items():
+            smd.add_block(block, position)
+        blocks = dict(smd.get_block_list().items())
+        smd.remove_blocks({598, 599}, selection)
+        for position, block in blocks.items():
+            self.assertEqual(smd.has_block_at(position), not selection.contains(position, block.get_id()))
+        smd = Smd()
+        for position, block in blocks.items():
+            smd.add_block(block, position)
+        smd.apply_transform(Transform().mirror(0), selection)
+        mirrored_positions = set(
+            (32 - position[0], position[1], position[2]) for position, block in blocks.items()
+            if position[0] > 16 and selection.contains(position, block.get_id()))
+        for position, block in blocks.items():
+            if selection.contains(position, block.get_id()):
+                self.assertEqual(smd.has_block_at(position), position[0] >= 16 or position in mirrored_positions)
+            elif position not in mirrored_positions:
+                self.assertIs(smd.get_block_at_position(position), block)
+        for position in mirrored_positions:
+            self.assertEqual(smd.get_block_at_position(position).get_id(), 598)
@@ -1,7 +1,15 @@
+import os
+import shutil
+import tempfile
 from unittest import TestCase
+from smlib.smblueprint.smdblock.blockpool import block_pool
 from smlib.smblueprint.smd3.smd import Smd
+from smlib.smblueprint.smd3.smdsegment import SmdSegment, np
+from smlib.smblueprint.smd3.smdregion import SmdRegion
+from smlib.smblueprint.smd2.smdsegment import SmdSegment as SmdSegment2
 from unittests.testinput import blueprint_handler
 from smlib.utils.blockconfig import block_config
+from smlib.utils.transform import Transform
 
 __author__ = 'Peter Hofmann'
 
@@ -31,6 +39,228 @@ class TestSmd(DefaultSetup):
         for directory_blueprint in self._blueprints:
             self.object.read(directory_blueprint)
 
+    def test_read_vectorized(self):
+        if np is None:
+            self.skipTest("numpy not available")
+        for directory_blueprint in self._blueprints:
+            SmdSegment.vectorized = SmdSegment2.vectorized = False
+            try:
+                self.object.read(directory_blueprint)
+            finally:
+                SmdSegment.vectorized = SmdSegment2.vectorized = True
+            expected = dict(self.object.get_block_list().items())
+            self.object.read(directory_blueprint)
+            result = dict(self.object.get_block_list().items())
+            self.assertEqual(len(expected), len(result), directory_blueprint)
+            for position, block in expected.items():
+                self.assertEqual(block.get_int_24(), result[position].get_int_24())
+
+    def test_read_memory_mapped(self):
+        for directory_blueprint in self._blueprints:
+            SmdRegion.memory_mapped = False
+            try:
+                self.object.read(directory_blueprint)
+            finally:
+                SmdRegion.memory_mapped = True
+            expected = dict(self.object.get_block_list().items())
+            self.object.read(directory_blueprint)
+            result = dict(self.object.get_block_list().items())
+            self.assertEqual(len(expected), len(result), directory_blueprint)
+            for position, block in expected.items():
+                self.assertEqual(block.get_int_24(), result[position].get_int_24())
+
+    def test_read_lazy(self):
+        for directory_blueprint in self._blueprints:
+            self.object.read(directory_blueprint)
+            expected = dict(self.object.get_block_list().items())
+            self.object.read(directory_blueprint, lazy=True)
+            self.assertEqual(len(expected), self.object.get_number_of_blocks(), directory_blueprint)
+            for position, block in expected.items():
+                self.assertTrue(self.object.has_block_at(position))
+                self.assertEqual(block.get_int_24(), self.object.get_block_at_position(position).get_int_24())
+            self.assertEqual(len(expected), len(dict(self.object.get_block_list().items())))
+
+    def test_read_dense(self):
+        directory_output = tempfile.mkdtemp(prefix="test_smd")
+        try:
+            for directory_blueprint in self._blueprints:
+                file_paths = []
+                for dense in (False, True):
+                    directory_result = os.path.join(directory_output, str(dense))
+                    os.mkdir(directory_result)
+                    self.object = Smd()
+                    self.object.read(directory_blueprint, dense=dense)
+                    if not dense:
+                        expected = dict(self.object.get_block_list().items())
+                    self.assertEqual(expected, dict(self.object.get_block_list().items()), directory_blueprint)
+                    self.object.write(directory_result, "dense")
+                    directory_data = os.path.join(directory_result, "DATA")
+                    file_paths.append([os.path.join(directory_data, name) for name in sorted(os.listdir(directory_data))])
+                for file_path_expected, file_path in zip(*file_paths):
+                    with open(file_path_expected, "rb") as file_expected, open(file_path, "rb") as file_result:
+                        self.assertEqual(file_expected.read(), file_result.read(), directory_blueprint)
+                shutil.rmtree(os.path.join(directory_output, "False"))
+                shutil.rmtree(os.path.join(directory_output, "True"))
+        finally:
+            shutil.rmtree(directory_output)
+
+    def test_read_statistics(self):
+        for directory_blueprint in self._blueprints:
+            self.object.read(directory_blueprint)
+            expected_quantities = self.object.get_block_id_to_quantity()
+            expected_min_max = self.object.get_min_max_vector()
+            for vectorized in (False, True):
+                if vectorized and np is None:
+                    continue
+                SmdSegment.vectorized = vectorized
+                try:
+                    block_statistics = Smd().read_statistics(directory_blueprint)
+                finally:
+                    SmdSegment.vectorized = np is not None
+                self.assertDictEqual(expected_quantities, block_statistics.get_block_id_to_quantity(), directory_blueprint)
+                self.assertEqual(expected_min_max, block_statistics.get_min_max_vector(), directory_blueprint)
+                self.assertEqual(sum(expected_quantities.values()), len(block_statistics))
+
+    def test_read_parallel(self):
+        directory_output = tempfile.mkdtemp(prefix="test_smd")
+        try:
+            block = block_pool(5)
+            for position in [(16, 16, 16), (300, 16, 16), (-300, 16, 16), (16, 16, 600), (16, -900, 16)]:
+                self.object.add_block(block, position)
+            self.object.write(directory_output, "regions")
+            self.assertEqual(len(os.listdir(os.path.join(directory_output, "DATA"))), 5)
+            self.object.read(directory_output)
+            expected = sorted(self.object.get_block_list().keys())
+            self.object.read(directory_output, jobs=2)
+            self.assertListEqual(expected, sorted(self.object.get_block_list().keys()))
+            self.assertEqual(len(expected), 5)
+        finally:
+            shutil.rmtree(directory_output)
+
+    def test_write_threads(self):
+        directory_output = tempfile.mkdtemp(prefix="test_smd")
+        try:
+            for directory_blueprint in self._blueprints:
+                file_paths = []
+                for threads in (1, 4):
+                    directory_threads = os.path.join(directory_output, str(threads))
+                    os.mkdir(directory_threads)
+                    self.object = Smd()
+                    self.object.read(directory_blueprint)
+                    self.object.write(directory_threads, "threads", threads=threads)
+                    directory_data = os.path.join(directory_threads, "DATA")
+                    file_paths.append([os.path.join(directory_data, name) for name in sorted(os.listdir(directory_data))])
+                for file_path_expected, file_path in zip(*file_paths):
+                    with open(file_path_expected, "rb") as file_expected, open(file_path, "rb") as file_result:
+                        self.assertEqual(file_expected.read(), file_result.read(), directory_blueprint)
+                shutil.rmtree(os.path.join(directory_output, "1"))
+                shutil.rmtree(os.path.join(directory_output, "4"))
+        finally:
+            shutil.rmtree(directory_output)
+
+    def test_write_unmodified_segments(self):
+        directory_output = tempfile.mkdtemp(prefix="test_smd")
+        try:
+            directory_source = os.path.join(directory_output, "source")
+            for directory_blueprint in self._blueprints:
+                os.mkdir(directory_source)
+                self.object = Smd()
+                self.object.read(directory_blueprint)
+                self.object.write(directory_source, "source")
+                file_paths = []
+                for lazy in (False, True):
+                    directory_result = os.path.join(directory_output, str(lazy))
+                    os.mkdir(directory_result)
+                    self.object = Smd()
+                    self.object.read(directory_source, lazy=lazy)
+                    self.object.add_block(block_pool(5), (16, 17, 16))
+                    self.object.write(directory_result, "result")
+                    directory_data = os.path.join(directory_result, "DATA")
+                    file_paths.append([os.path.join(directory_data, name) for name in sorted(os.listdir(directory_data))])
+                self.assertEqual(len(file_paths[0]), len(file_paths[1]))
+                for file_path_expected, file_path in zip(*file_paths):
+                    with open(file_path_expected, "rb") as file_expected, open(file_path, "rb") as file_result:
+                        self.assertEqual(file_expected.read(), file_result.read(), directory_blueprint)
+                for directory in (directory_source, os.path.join(directory_output, "False"), os.path.join(directory_output, "True")):
+                    shutil.rmtree(directory)
+        finally:
+            shutil.rmtree(directory_output)
+
+    def test_transform(self):
+        directory_output = tempfile.mkdtemp(prefix="test_smd")
+        try:
+            directory_source = os.path.join(directory_output, "source")
+            directory_expected = os.path.join(directory_output, "expected")
+            directory_result = os.path.join(directory_output, "result")
+            for directory_blueprint in self._blueprints:
+                for directory in (directory_source, directory_expected, directory_result):
+                    os.mkdir(directory)
+                self.object = Smd()
+                self.object.read(directory_blueprint)
+                block_id = self.object.get_block_at_position((16, 16, 16)).get_id()
+                self.object.write(directory_source, "source")
+
+                self.object = Smd()
+                self.object.read(directory_source)
+                self.object.remove_blocks({block_id})
+                expected = (
+                    self.object.get_block_id_to_quantity(),
+                    self.object.get_min_max_vector()[0],
+                    self.object.get_min_max_vector()[1])
+                self.object.write(directory_expected, "result")
+
+                self.object = Smd()
+                result = self.object.transform(
+                    directory_source, directory_result, "result",
+                    [lambda block_list: block_list.remove_blocks({block_id})])
+                self.assertEqual(expected, result, directory_blueprint)
+                file_names = sorted(os.listdir(os.path.join(directory_expected, "DATA")))
+                self.assertListEqual(file_names, sorted(os.listdir(os.path.join(directory_result, "DATA"))))
+                for file_name in file_names:
+                    with open(os.path.join(directory_expected, "DATA", file_name), "rb") as file_expected:
+                        with open(os.path.join(directory_result, "DATA", file_name), "rb") as file_result:
+                            self.assertEqual(file_expected.read(), file_result.read(), directory_blueprint)
+                for directory in (directory_source, directory_expected, directory_result):
+                    shutil.rmtree(directory)
+        finally:
+            shutil.rmtree(directory_output)
+
+    def test_apply_transform(self):
+        for directory_blueprint in self._blueprints:
+            self.object = Smd()
+            self.object.read(directory_blueprint)
+            self.object.move_center((3, -2, 5))
+            self.object.mirror(0, reverse=True)
+            self.object.tilt_turn(2)
+            self.object.tilt_turn(4)
+            expected = dict((position, block.get_int_24()) for position, block in self.object.get_block_list().items())
+            self.object = Smd()
+            self.object.read(directory_blueprint)
+            self.object.apply_transform(
+                Transform().move_center((3, -2, 5)).mirror(0, reverse=True).tilt_turn(2).tilt_turn(4))
+            result = dict((position, block.get_int_24()) for position, block in self.object.get_block_list().items())
+            self.assertDictEqual(expected, result, directory_blueprint)
+
+    def test_encode_vectorized(self):
+        if np is None:
+            self.skipTest("numpy not available")
+        for segment_class, blocks_in_a_line, segment in (
+                (SmdSegment, 32, SmdSegment()),
+                (SmdSegment2, 16, SmdSegment2(version=2))):
+            segment.set_position((32, -64, 0))
+            for block_index in range(0, blocks_in_a_line ** 3, 7):
+                block = block_pool(598 + block_index % 5).get_modified_block(rotations=block_index % 4)
+                segment.add(segment.get_block_position_by_block_index(block_index), block)
+            for version in (2, 3):
+                segment._version = version
+                segment_class.vectorized = False
+                try:
+                    expected = segment._encode_block_data()
+                finally:
+                    segment_class.vectorized = True
+                self.assertEqual(len(expected), 3 * blocks_in_a_line ** 3)
+                self.assertEqual(expected, segment._encode_block_data())
+
     # def test_get_block_at_position(self):
     #     self.fail()
     # def test_get_region_position_of_position(self):
@@ -0,0 +1,106 @@
+import random
+from unittest import TestCase
+from smlib.utils.transform import Transform
+from smlib.utils.vector import Vector, np
+from smlib.utils.blockconfig import block_config
+from smlib.utils.blocklist import BlockList
+from smlib.utils.chunkedblocklist import ChunkedBlockList
+from smlib.smblueprint.smdblock.orientationtables import orientation_tables
+from smlib.smblueprint.smdblock.blockpool import block_pool
+from smlib.smblueprint.smd3.smd import Smd
+
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type object: Transform
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.object = None
+        self.positions = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        self.object = Transform()
+        random.seed(0)
+        self.positions = [tuple(random.randint(-100, 100) for _ in range(3)) for _ in range(200)]
+
+    def tearDown(self):
+        self.object = None
+        self.positions = None
+
+
+class TestTransform(DefaultSetup):
+    def test_identity(self):
+        self.assertFalse(self.object.is_moving_blocks())
+        self.assertFalse(self.object.has_mirror())
+        for position in self.positions:
+            self.assertEqual(self.object.get_position(position), position)
+        self.assertEqual(self.object.get_state(599 | (5 << 19)), 599 | (5 << 19))
+
+    def test_get_position(self):
+        self.object.move_center((1, 2, 3)).tilt_turn(0).tilt_turn(3).move_center((-5, 0, 7))
+        for position in self.positions:
+            expected = Vector.subtraction(position, (1, 2, 3))
+            expected = Vector.tilt_turn_position(expected, 0)
+            expected = Vector.tilt_turn_position(expected, 3)
+            expected = Vector.subtraction(expected, (-5, 0, 7))
+            self.assertEqual(self.object.get_position(position), expected)
+        self.assertEqual(self.object.get_move_offset(), (4, -2, -10))
+
+    def test_get_indexes(self):
+        self.object.move_center((1, 2, 3)).tilt_turn(5)
+        position_indexes = [Vector.get_index(position) for position in self.positions]
+        result = self.object.get_indexes(position_indexes)
+        if np is not None:
+            result = result.tolist()
+        self.assertListEqual(
+            result, [Vector.get_index(self.object.get_position(position)) for position in self.positions])
+
+    def test_get_state(self):
+        state = 599 | (75 << 11) | (5 << 19)
+        self.object.tilt_turn(2).tilt_turn(4)
+        expected = orientation_tables.turn_state(orientation_tables.turn_state(state, 2), 4)
+        self.assertEqual(self.object.get_state(state), expected)
+
+    def test_mirror(self):
+        self.object.move_center((2, 0, 0)).mirror(0).tilt_turn(2)
+        # the mirror plane is turned from the x axis to the z axis, and flipped
+        for position in self.positions:
+            moved = Vector.subtraction(position, (2, 0, 0))
+            expected_side = (moved[0] > 16) - (moved[0] < 16)
+            new_position = self.object.get_position(position)
+            self.assertEqual(self.object.get_side(new_position), expected_side)
+            expected = Vector.tilt_turn_position(Vector.mirror_position(moved, 0), 2)
+            self.assertEqual(self.object.get_mirrored_position(new_position), expected)
+        self.assertRaises(RuntimeError, self.object.mirror, 1)
+
+    def test_get_box(self):
+        self.object.move_center((3, -2, 5)).mirror(0, reverse=True).tilt_turn(2)
+        min_vector, max_vector = self.object.get_box((-100, -100, -100), (100, 100, 100))
+        for position in self.positions:
+            new_position = self.object.get_position(position)
+            positions = [new_position, self.object.get_mirrored_position(new_position)]
+            for new_position in positions:
+                self.assertTrue(all(low <= value <= high for value, low, high in zip(new_position, min_vector, max_vector)))
+
+    def test_out_of_range(self):
+        smd = Smd()
+        smd.add_block(block_pool(5), (32000, 16, 16))
+        self.assertRaises(AssertionError, smd.apply_transform, Transform().move_center((-1000, 0, 0)))
+        self.assertTrue(smd.has_block_at((32000, 16, 16)))
+        smd.add_block(block_pool(5), (-32760, 16, 16))
+        # mirrored copy at 32792
+        self.assertRaises(AssertionError, smd.apply_transform, Transform().mirror(0, reverse=True))
+        self.assertTrue(smd.has_block_at((-32760, 16, 16)))
+        smd.get_block_list().pop((-32760, 16, 16))
+        smd.apply_transform(Transform().move_center((1000, 0, 0)))
+        self.assertTrue(smd.has_block_at((31000, 16, 16)))
+        for block_list in (BlockList(), ChunkedBlockList()):
+            block_list[(-32000, 0, 0)] = block_pool(5)
+            self.assertRaises(AssertionError, block_list.move_positions, (-1000, 0, 0))
+            self.assertTrue(block_list.has_block_at((-32000, 0, 0)))
@@ -0,0 +1,96 @@
+import struct
+import random
+from unittest import TestCase
+from smlib.utils.vector import Vector, np
+from smlib.utils.blocklist import BlockList
+from smlib.utils.chunkedblocklist import ChunkedBlockList
+from smlib.utils.blockconfig import block_config
+from smlib.smblueprint.smdblock.blockpool import block_pool
+
+
+__author__ = 'Peter Hofmann'
+
+
+class DefaultSetup(TestCase):
+    """
+    @type coordinates: list[int]
+    """
+
+    def __init__(self, methodName='runTest'):
+        super(DefaultSetup, self).__init__(methodName)
+        self.coordinates = None
+
+    def setUp(self):
+        block_config.from_hard_coded()
+        random.seed(0)
+        # every int16 value, with other coordinates shuffled
+        self.coordinates = list(range(-32768, 32768))
+
+    def tearDown(self):
+        self.coordinates = None
+
+    def get_positions(self):
+        """
+        Each int16 value appears on every axis, combined with the extremes on the other axes
+
+        @rtype: list[(int, int, int)]
+        """
+        shuffled = list(self.coordinates)
+        random.shuffle(shuffled)
+        extremes = [-32768, -1, 0, 32767]
+        positions = []
+        for index, value in enumerate(self.coordinates):
+            positions.append((value, shuffled[index], extremes[index % 4]))
+            positions.append((extremes[index % 4], value, shuffled[index]))
+            positions.append((shuffled[index], extremes[index % 4], value))
+        return positions
+
+
+class TestVector(DefaultSetup):
+    def test_round_trip(self):
+        for position in self.get_positions():
+            position_index = Vector.get_index(position)
+            self.assertEqual(position_index, struct.unpack("<q", struct.pack("<hhhh", position[0], position[1], position[2], 0))[0])
+            self.assertEqual(position, Vector.get_position(position_index))
+
+    def test_round_trip_batch(self):
+        if np is None:
+            return
+        positions = self.get_positions()
+        position_indexes = Vector.get_indexes(np.array(positions))
+        self.assertEqual(position_indexes.dtype, np.int64)
+        self.assertListEqual([Vector.get_index(position) for position in positions], position_indexes.tolist())
+        self.assertListEqual([list(position) for position in positions], Vector.get_positions(position_indexes).tolist())
+
+    def test_out_of_range(self):
+        self.assertTrue(Vector.is_in_range((-32768, 32767, 0)))
+        self.assertFalse(Vector.is_in_range((40000, 0, 0)))
+        self.assertFalse(Vector.is_in_range((0, -25536 - 40000, 0)))
+        self.assertFalse(Vector.is_in_range((0, 0, 32768)))
+        self.assertFalse(Vector.is_in_range((0, 0, -32769)))
+        for block_list in (BlockList(), ChunkedBlockList()):
+            self.assertRaises(AssertionError, block_list.__setitem__, (40000, 0, 0), block_pool(5))
+            self.assertRaises(AssertionError, block_list.__setitem__, (0, -32769, 0), block_pool(5))
+            self.assertEqual(len(block_list), 0)
+        if np is None:
+            return
+        self.assertRaises(AssertionError, Vector.get_indexes, np.array([(0, 0, 0), (-32769, 0, 0)]))
+
+    def test_shift_position_index(self):
+        position_index = Vector.get_index((-1, 32767, 5))
+        self.assertEqual(Vector.shift_position_index(position_index, (1, -32767, -10)), Vector.get_index((0, 0, -5)))
+
+    def test_shift_position_indexes(self):
+        positions = self.get_positions()
+        offset = (32767, -1, -32768)
+        index_offset = Vector.get_index(offset)
+        # coordinates wrap around on their own
+        expected = [
+            Vector.get_index([((value + 0x8000) & 0xFFFF) - 0x8000 for value in Vector.addition(position, offset)])
+            for position in positions]
+        self.assertListEqual(
+            [Vector.shift_position_indexes(Vector.get_index(position), index_offset) for position in positions], expected)
+        if np is None:
+            return
+        position_indexes = Vector.shift_position_indexes(Vector.get_indexes(np.array(positions)), index_offset)
+        self.assertListEqual(position_indexes.tolist(), expected)